@@ -1,9 +1,12 @@
 from collections import Iterable
+from collections.abc import Sequence
 from decimal import Decimal
 
 from clickhouse_driver.errors import ServerException
-from dateutil import parser
-from django.http import JsonResponse
+from django.http import HttpResponse
+
+from hyperquant import codec
+from hyperquant.timestamps import parse_timestring
 
 """
 Common out API format is defined here.
@@ -157,6 +160,10 @@ class ParamName:
 
     _timestamp_names = (TIMESTAMP, FROM_TIME, TO_TIME)
     _decimal_names = (PRICE, FROM_PRICE, TO_PRICE, AMOUNT, FROM_AMOUNT, TO_AMOUNT)
+    # (For fixed-point mode)
+    _price_names = (PRICE, FROM_PRICE, TO_PRICE, PRICE_OPEN, PRICE_CLOSE, PRICE_HIGH, PRICE_LOW)
+    _amount_names = (AMOUNT, FROM_AMOUNT, TO_AMOUNT, AMOUNT_ORIGINAL, AMOUNT_EXECUTED,
+                     AMOUNT_AVAILABLE, AMOUNT_RESERVED, FEE, REBATE)
 
     @classmethod
     def is_timestamp(cls, name):
@@ -166,6 +173,14 @@ class ParamName:
     def is_decimal(cls, name):
         return name in cls._decimal_names
 
+    @classmethod
+    def is_price(cls, name):
+        return name in cls._price_names
+
+    @classmethod
+    def is_amount(cls, name):
+        return name in cls._amount_names
+
 
 class ParamValue:
     # todo remove sometimes
@@ -208,6 +223,24 @@ class Interval:
            HRS_1, HRS_2, HRS_4, HRS_6, HRS_8, HRS_12,
            DAY_1, DAY_3, WEEK_1, MONTH_1]
 
+    # (MONTH_1 has no fixed duration)
+    duration_sec_by_interval = {
+        MIN_1: 60,
+        MIN_3: 3 * 60,
+        MIN_5: 5 * 60,
+        MIN_15: 15 * 60,
+        MIN_30: 30 * 60,
+        HRS_1: 60 * 60,
+        HRS_2: 2 * 60 * 60,
+        HRS_4: 4 * 60 * 60,
+        HRS_6: 6 * 60 * 60,
+        HRS_8: 8 * 60 * 60,
+        HRS_12: 12 * 60 * 60,
+        DAY_1: 24 * 60 * 60,
+        DAY_3: 3 * 24 * 60 * 60,
+        WEEK_1: 7 * 24 * 60 * 60,
+    }
+
 
 class Direction:
     # (trade, order)
@@ -327,6 +360,62 @@ class ErrorCode:
         return cls.message_by_code[code].format_map(kwargs) if code in cls.message_by_code else default or "(no message: todo)"
 
 
+class FixedPointPrecision:
+    """
+    Precision of prices and amounts by symbol for fixed-point mode.
+
+    In fixed-point mode prices and amounts are stored as int: value * 10 ** precision.
+    That gives cheap exact arithmetic and compact storage. Values are converted
+    back to Decimal only at the edge (convert_items_*(), make_data_response()).
+
+        precision = FixedPointPrecision({"ETHBTC": (6, 3)}, default_precision=(8, 8))
+        precision.to_fixed_point("ETHBTC", ParamName.PRICE, "0.031702")  # 31702
+    """
+
+    def __init__(self, precision_by_symbol=None, default_precision=(8, 8)) -> None:
+        super().__init__()
+        # {symbol: (price_precision, amount_precision)}
+        self.precision_by_symbol = precision_by_symbol or {}
+        self.default_precision = default_precision
+
+    def get_precision(self, symbol):
+        # (price_precision, amount_precision)
+        return self.precision_by_symbol.get(symbol, self.default_precision)
+
+    def get_precision_for(self, symbol, name):
+        # None if name is neither price nor amount
+        if ParamName.is_price(name):
+            return self.get_precision(symbol)[0]
+        if ParamName.is_amount(name):
+            return self.get_precision(symbol)[1]
+        return None
+
+    def to_fixed_point(self, symbol, name, value):
+        precision = self.get_precision_for(symbol, name)
+        return to_fixed_point(value, precision) if precision is not None else value
+
+    def from_fixed_point(self, symbol, name, value):
+        precision = self.get_precision_for(symbol, name)
+        return from_fixed_point(value, precision) if precision is not None else value
+
+
+def to_fixed_point(value, precision):
+    # "0.0317025", 6 -> 31702 (rounded half to even)
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value * 10 ** precision
+    return int(Decimal(value if isinstance(value, (str, Decimal)) else str(value)).scaleb(precision)
+               .to_integral_value())
+
+
+def from_fixed_point(value, precision):
+    # 31702, 6 -> Decimal("0.031702")
+    if value is None or not isinstance(value, int) or isinstance(value, bool):
+        return value
+    return Decimal(value).scaleb(-precision)
+
+
 # For DB, REST API
 item_format_by_endpoint = {
     Endpoint.TRADE: [
@@ -392,7 +481,7 @@ def parse_timestamp(params, name):
     try:
         return float(time)
     except ValueError:
-        return parser.parse(time).timestamp()
+        return parse_timestring(time)
 
 
 def parse_decimal(params, name):
@@ -422,29 +511,41 @@ def sort_from_to_params(from_value, to_value):
 
 # Prepare response
 
-def make_data_response(data, item_format, is_convert_to_list=True):
+def make_json_response(data):
+    # (As JsonResponse, but encoded by the default codec)
+    return HttpResponse(codec.dumps_bytes(data), content_type="application/json")
+
+
+def make_data_response(data, item_format, is_convert_to_list=True, fixed_point_precision=None):
+    # fixed_point_precision - FixedPointPrecision if prices and amounts in data are fixed-point ints
     result = None
     if data:
         if isinstance(data, Exception):
             return make_error_response(exception=data)
 
-        if not isinstance(data, list) or not isinstance(data[0], list):
+        if not _is_items(data):
             # {"param1": "prop1", "param2": "prop2"} -> [{"param1": "prop1", "param2": "prop2"}]
             # ["prop1", "prop2"] -> [["prop1", "prop2"]]
+            # Trade() -> [Trade()]
+            # (Lists of items and batches such as TradeBatch are passed as is)
             data = [data]
 
         if isinstance(data[0], list):
             # [["prop1", "prop2"], ["prop1", "prop2"]] -> same
-            result = data if is_convert_to_list else convert_items_list_to_dict(data, item_format)
+            result = (convert_items_list_to_list(data, item_format, fixed_point_precision)
+                      if fixed_point_precision else data) if is_convert_to_list else \
+                convert_items_list_to_dict(data, item_format, fixed_point_precision)
         elif isinstance(data[0], dict):
             # [{"param1": "prop1", "param2": "prop2"}] -> [["prop1", "prop2"]]
-            result = convert_items_dict_to_list(data, item_format) if is_convert_to_list else data
+            result = convert_items_dict_to_list(data, item_format, fixed_point_precision) if is_convert_to_list else \
+                (convert_items_dict_to_dict(data, item_format, fixed_point_precision)
+                 if fixed_point_precision else data)
         # elif isinstance(data[0], DataObject):
         else:
-            result = convert_items_obj_to_list(data, item_format) if is_convert_to_list else \
-                convert_items_obj_to_dict(data, item_format)
+            result = convert_items_obj_to_list(data, item_format, fixed_point_precision) if is_convert_to_list else \
+                convert_items_obj_to_dict(data, item_format, fixed_point_precision)
 
-    return JsonResponse({
+    return make_json_response({
         "data": result if result else [],
     })
 
@@ -456,7 +557,7 @@ def make_error_response(error_code=None, exception=None, **kwargs):
         else:
             error_code = ErrorCode.APP_ERROR
 
-    return JsonResponse({"error": {
+    return make_json_response({"error": {
         "code": error_code,
         "message": ErrorCode.get_message_by_code(error_code, **kwargs)
     }})
@@ -468,7 +569,7 @@ def make_format_response(item_format):
         # ParamName.PLATFORM: Platform.name_by_id,
         ParamName.DIRECTION: Direction.name_by_value,
     }
-    return JsonResponse({
+    return make_json_response({
         "item_format": item_format,
         "values": {k: v for k, v in values.items() if k in item_format},
 
@@ -482,53 +583,98 @@ def make_format_response(item_format):
 # Utility:
 
 # Convert items
+# (fixed_point_precision - FixedPointPrecision to convert fixed-point prices and amounts back to Decimal)
 
-def convert_items_obj_to_list(item_or_items, item_format):
+def convert_items_obj_to_list(item_or_items, item_format, fixed_point_precision=None):
     if not item_or_items:
-        return item_or_items
-    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_obj_to_list)
+        # (Empty OrderBookSide - to empty list)
+        return [] if _is_sequence(item_or_items) else item_or_items
+    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_obj_to_list,
+                                           fixed_point_precision)
 
 
-def convert_items_dict_to_list(item_or_items, item_format):
+def convert_items_dict_to_list(item_or_items, item_format, fixed_point_precision=None):
     if not item_or_items:
         return item_or_items
-    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_dict_to_list)
+    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_dict_to_list,
+                                           fixed_point_precision)
 
 
-def convert_items_list_to_dict(item_or_items, item_format):
+def convert_items_list_to_dict(item_or_items, item_format, fixed_point_precision=None):
     if not item_or_items:
         return item_or_items
-    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_list_to_dict)
+    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_list_to_dict,
+                                           fixed_point_precision)
 
 
-def convert_items_obj_to_dict(item_or_items, item_format):
+def convert_items_obj_to_dict(item_or_items, item_format, fixed_point_precision=None):
     if not item_or_items:
+        # (Empty OrderBookSide - to empty list)
+        return [] if _is_sequence(item_or_items) else item_or_items
+    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_obj_to_dict,
+                                           fixed_point_precision)
+
+
+def convert_items_list_to_list(item_or_items, item_format, fixed_point_precision=None):
+    # Only converts fixed-point values
+    if not item_or_items or not fixed_point_precision:
         return item_or_items
-    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_obj_to_dict)
+    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_list_to_list,
+                                           fixed_point_precision)
 
 
-def _convert_item_or_items_with_fun(item_or_items, item_format, fun):
+def convert_items_dict_to_dict(item_or_items, item_format, fixed_point_precision=None):
+    # Only converts fixed-point values
+    if not item_or_items or not fixed_point_precision:
+        return item_or_items
+    return _convert_item_or_items_with_fun(item_or_items, item_format, _convert_items_dict_to_dict,
+                                           fixed_point_precision)
+
+
+def _convert_item_or_items_with_fun(item_or_items, item_format, fun, fixed_point_precision=None):
     # Input item - output item,
     # input items - output items
     if not item_format:
         raise Exception("item_format cannot be None!")
 
-    is_list = isinstance(item_or_items, (list, tuple))
-    if is_list:
-        for element in item_or_items:
-            if element:
-                # Check the first not None element is not an item
-                # (list, dict (iterable but not a str) or object (has __dict__))
-                if isinstance(element, str) or not isinstance(element, Iterable) and \
-                        not hasattr(element, "__dict__"):
-                    is_list = False
-                break
+    is_list = _is_items(item_or_items)
     items = item_or_items if is_list else [item_or_items]
     # Convert
-    result = fun(items, item_format) if items else []
+    if fixed_point_precision and items and fun in (_convert_items_obj_to_list, _convert_items_dict_to_list):
+        # (Missing properties are skipped in resulting lists, so that indexes may differ from item_format.
+        # Hence values are converted by name before flattening)
+        to_dict_fun = _convert_items_obj_to_dict if fun is _convert_items_obj_to_list else _convert_items_dict_to_dict
+        result = _convert_items_dict_to_list(
+            _convert_items_from_fixed_point(to_dict_fun(items, item_format), item_format, fixed_point_precision),
+            item_format)
+    else:
+        result = fun(items, item_format) if items else []
+        if fixed_point_precision and result:
+            result = _convert_items_from_fixed_point(result, item_format, fixed_point_precision)
     return result if is_list else result[0]
 
 
+def _is_sequence(value):
+    return isinstance(value, Sequence) and not isinstance(value, (str, bytes))
+
+
+def _is_item(value):
+    # List, dict (iterable but not a str) or object (has __dict__ or __slots__)
+    return not isinstance(value, str) and \
+        (isinstance(value, Iterable) or hasattr(value, "__dict__") or hasattr(value, "__slots__"))
+
+
+def _is_items(value):
+    # (Not only lists, but also sequences of items such as OrderBookSide and ItemBatch)
+    if not _is_sequence(value):
+        return False
+    # Check the first not None element is an item
+    for element in value:
+        if element:
+            return _is_item(element)
+    return True
+
+
 def _convert_items_obj_to_list(items, item_format):
     return [[getattr(item, p) for p in item_format if hasattr(item, p)] if item is not None else None
             for item in items] if items else []
@@ -548,3 +694,36 @@ def _convert_items_list_to_dict(items, item_format):
 def _convert_items_obj_to_dict(items, item_format):
     return [{p: getattr(item, p) for p in item_format if hasattr(item, p)} if item is not None else None
             for item in items] if items else []
+
+
+def _convert_items_list_to_list(items, item_format):
+    return [list(item) if item is not None else None for item in items] if items else []
+
+
+def _convert_items_dict_to_dict(items, item_format):
+    return [dict(item) if item is not None else None for item in items] if items else []
+
+
+def _convert_items_from_fixed_point(items, item_format, fixed_point_precision):
+    # Converts resulting lists or dicts in place
+    # (Note: lists are positional by item_format (as in convert_items_list_to_dict()),
+    # lists with skipped properties should be converted as dicts)
+    fixed_point_names = [(i, p) for i, p in enumerate(item_format)
+                         if ParamName.is_price(p) or ParamName.is_amount(p)]
+    if not fixed_point_names:
+        return items
+    symbol_index = item_format.index(ParamName.SYMBOL) if ParamName.SYMBOL in item_format else None
+    for item in items:
+        if item is None:
+            continue
+        if isinstance(item, dict):
+            symbol = item.get(ParamName.SYMBOL)
+            for i, p in fixed_point_names:
+                if p in item:
+                    item[p] = fixed_point_precision.from_fixed_point(symbol, p, item[p])
+        else:
+            symbol = item[symbol_index] if symbol_index is not None and symbol_index < len(item) else None
+            for i, p in fixed_point_names:
+                if i < len(item):
+                    item[i] = fixed_point_precision.from_fixed_point(symbol, p, item[i])
+    return items
@@ -0,0 +1,63 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import urlparse, parse_qs
+
+from hyperquant.api import Interval
+from hyperquant.clients.backfill import HistoryBackfill
+from hyperquant.clients.okex import OkexRESTClient
+
+"""
+Backfill benchmark: sequential paging (iter_candles()) vs concurrent shards (HistoryBackfill)
+against a local stub of OKEx "kline.do" with a fixed response latency.
+
+    python -m hyperquant.benchmarks.bench_backfill
+"""
+
+LATENCY_SEC = 0.2
+PAGE_LIMIT = 1000
+DAY_COUNT = 30
+FROM_TIME = 1546300800  # 2019-01-01
+TO_TIME = FROM_TIME + DAY_COUNT * 24 * 60 * 60 - 60
+
+
+class StubKlineHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        time.sleep(LATENCY_SEC)
+        since_ms = int(parse_qs(urlparse(self.path).query)["since"][0])
+        since_ms -= since_ms % 60000
+        data = [[since_ms + i * 60000, "0.0317", "0.0318", "0.0316", "0.03175", "98.9"] for i in range(PAGE_LIMIT)]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubKlineHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    client = OkexRESTClient()
+    client.converter.base_url = "http://127.0.0.1:%s/api/v{version}/" % server.server_port
+
+    print("%d days of 1m candles, %d ms latency" % (DAY_COUNT, LATENCY_SEC * 1000))
+    print("%-30s %10s %10s" % ("case", "candles", "sec"))
+    start = time.time()
+    count = sum(1 for _ in client.iter_candles("eth_btc", Interval.MIN_1, FROM_TIME, TO_TIME))
+    print("%-30s %10d %10.2f" % ("iter_candles()", count, time.time() - start))
+    for max_workers in (4, 16):
+        start = time.time()
+        backfill = HistoryBackfill(client, max_workers=max_workers)
+        count = sum(1 for _ in backfill.iter_candles("eth_btc", Interval.MIN_1, FROM_TIME, TO_TIME))
+        print("%-30s %10d %10.2f" % ("backfill max_workers=%s" % max_workers, count, time.time() - start))
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,74 @@
+import json
+import timeit
+import zlib
+
+from hyperquant import codec
+from hyperquant.clients.okex import inflate, Inflater
+
+"""
+JSON decoding benchmark for OKEx WS frames (deflated, as sent by the platform)
+and encoding of REST API responses for all available codecs.
+
+    python -m hyperquant.benchmarks.bench_codec
+"""
+
+FRAME_COUNT = 1000
+REPEAT_COUNT = 20
+
+
+def _deflate(message):
+    compress = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compress.compress(message.encode("utf-8")) + compress.flush()
+
+
+# (Recorded frame format of "deals" and "kline" channels)
+DEALS_MESSAGE = json.dumps([{"binary": 0, "channel": "ok_sub_spot_eth_btc_deals", "data": [
+    [str(1001726417 + i), "0.03170200", "0.192", "12:34:%02d" % (i % 60), "ask" if i % 2 else "bid"]
+    for i in range(20)]}])
+KLINE_MESSAGE = json.dumps([{"binary": 0, "channel": "ok_sub_spot_eth_btc_kline_1min", "data": [
+    [str(1548374520000 + i * 60000), "0.03170200", "0.03171100", "0.03169000", "0.03170500", "98.904574"]
+    for i in range(3)]}])
+FRAMES = [_deflate(DEALS_MESSAGE if i % 2 else KLINE_MESSAGE) for i in range(FRAME_COUNT)]
+
+RESPONSE_DATA = {"data": [[1, "ethbtc", 1548374520000 + i, str(71857648 + i), "0.2795", "1.195697", 1]
+                          for i in range(FRAME_COUNT)]}
+
+
+def _measure(fun, repeat_count=REPEAT_COUNT):
+    return min(timeit.repeat(fun, number=1, repeat=repeat_count)) * 1000
+
+
+def _inflate_with_decompress_object(data):
+    # (As before Inflater: new decompress object for each message)
+    decompress = zlib.decompressobj(-zlib.MAX_WBITS)
+    inflated = decompress.decompress(data)
+    inflated += decompress.flush()
+    return inflated
+
+
+def run():
+    print("%-40s %12s" % ("case", "ms"))
+    print("%-40s %12.3f" % ("inflate with decompressobj", _measure(
+        lambda: [_inflate_with_decompress_object(frame) for frame in FRAMES])))
+    print("%-40s %12.3f" % ("inflate only", _measure(
+        lambda: [inflate(frame) for frame in FRAMES])))
+    inflater = Inflater()
+    print("%-40s %12.3f" % ("Inflater.inflate only", _measure(
+        lambda: [inflater.inflate(frame) for frame in FRAMES])))
+    print("%-40s %12.3f" % ("inflate + decode('utf-8') + json.loads", _measure(
+        lambda: [json.loads(inflate(frame).decode("utf-8")) for frame in FRAMES])))
+    for name in codec.codec_class_by_name:
+        json_codec = codec.create_codec(name)
+        print("%-40s %12.3f" % ("inflate + %s.loads(bytes)" % name, _measure(
+            lambda: [json_codec.loads(inflate(frame)) for frame in FRAMES])))
+
+    print("%-40s %12.3f" % ("response json.dumps", _measure(
+        lambda: json.dumps(RESPONSE_DATA).encode("utf-8"))))
+    for name in codec.codec_class_by_name:
+        json_codec = codec.create_codec(name)
+        print("%-40s %12.3f" % ("response %s.dumps_bytes" % name, _measure(
+            lambda: json_codec.dumps_bytes(RESPONSE_DATA))))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,62 @@
+import tracemalloc
+
+from hyperquant.clients import Trade, MyTrade, Candle, Ticker, OrderBookItem, Order, Balance
+
+"""
+Memory benchmark for value objects.
+
+Compares bytes per item for current (__slots__-based) value objects and
+the same objects stored in a per-instance __dict__ (as it was before).
+
+    python -m hyperquant.benchmarks.bench_items_memory
+"""
+
+ITEM_COUNT = 100000
+
+
+def _get_slot_names(item_class):
+    return [name for cls in reversed(item_class.__mro__) for name in getattr(cls, "__slots__", ())]
+
+
+def _make_dict_based_class(item_class):
+    # The same fields, but stored in __dict__ of each instance
+    slot_names = _get_slot_names(item_class)
+
+    def __init__(self):
+        for name in slot_names:
+            setattr(self, name, None)
+
+    return type("Dict" + item_class.__name__, (), {"__init__": __init__})
+
+
+def _create_item(item_class):
+    item = item_class()
+    # (Set values like converter does)
+    for name in _get_slot_names(item_class):
+        setattr(item, name, None)
+    return item
+
+
+def measure_bytes_per_item(item_class, count=ITEM_COUNT):
+    tracemalloc.start()
+    snapshot_before, _ = tracemalloc.get_traced_memory()
+    items = [_create_item(item_class) for _ in range(count)]
+    snapshot_after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # (Exclude the list itself)
+    list_size = items.__sizeof__()
+    return (snapshot_after - snapshot_before - list_size) / count
+
+
+def run(count=ITEM_COUNT):
+    print("%-15s %12s %12s %8s" % ("class", "dict, B", "slots, B", "ratio"))
+    for item_class in [Trade, MyTrade, Candle, Ticker, OrderBookItem, Order, Balance]:
+        dict_bytes = measure_bytes_per_item(_make_dict_based_class(item_class), count)
+        slots_bytes = measure_bytes_per_item(item_class, count)
+        print("%-15s %12.1f %12.1f %8.2f" % (item_class.__name__, dict_bytes, slots_bytes,
+                                             dict_bytes / slots_bytes))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,69 @@
+import random
+import time
+
+from hyperquant.api import OrderBookDirection
+from hyperquant.clients import OrderBook, OrderBookSide
+from hyperquant.clients.orderbook import LocalOrderBook
+
+"""
+Benchmark for local order book: replays a synthetic stream of order book diffs
+(random, not recorded from a platform: 0-5 levels per side around moving mid price,
+~20% of levels are removals) and measures level updates per second.
+
+Note that a level update is O(log n) search plus O(n) array shift when a level
+is added or removed, so the result depends on DEPTH.
+
+    python -m hyperquant.benchmarks.bench_order_book
+"""
+
+TARGET_UPDATES_PER_SEC = 50000
+DIFF_COUNT = 50000
+DEPTH = 1000
+TICK = 0.01
+
+
+def generate_snapshot(mid_price=100.0, depth=DEPTH):
+    asks = OrderBookSide(OrderBookDirection.ASK, [mid_price + TICK * (i + 1) for i in range(depth)],
+                         [1.0 + i % 7 for i in range(depth)])
+    bids = OrderBookSide(OrderBookDirection.BID, [mid_price - TICK * (i + 1) for i in range(depth)],
+                         [1.0 + i % 5 for i in range(depth)])
+    return OrderBook(symbol="ETHBTC", item_id="0", asks=asks, bids=bids)
+
+
+def generate_diffs(count=DIFF_COUNT, mid_price=100.0, seed=1):
+    rand = random.Random(seed)
+    result = []
+    for i in range(count):
+        mid_price += rand.choice((-TICK, 0, TICK))
+        sides = []
+        for direction, sign in ((OrderBookDirection.ASK, 1), (OrderBookDirection.BID, -1)):
+            level_count = rand.randint(0, 5)
+            prices = [round(mid_price + sign * TICK * rand.randint(1, 50), 2) for _ in range(level_count)]
+            amounts = [0.0 if rand.random() < 0.2 else rand.randint(1, 100) / 10 for _ in range(level_count)]
+            sides.append(OrderBookSide(direction, prices, amounts))
+        result.append(OrderBook(symbol="ETHBTC", item_id=str(i + 1), asks=sides[0], bids=sides[1]))
+    return result
+
+
+def run():
+    order_book = LocalOrderBook(symbol="ETHBTC")
+    order_book.apply_snapshot(generate_snapshot())
+    diffs = generate_diffs()
+    update_count = sum(len(diff.asks) + len(diff.bids) for diff in diffs)
+
+    start_time = time.perf_counter()
+    for diff in diffs:
+        order_book.apply_diff(diff)
+    duration = time.perf_counter() - start_time
+
+    updates_per_sec = update_count / duration
+    print("synthetic diffs: %s level updates: %s time: %.3f s" % (len(diffs), update_count, duration))
+    print("diffs/sec: %.0f level updates/sec: %.0f (target: %s) %s" % (
+        len(diffs) / duration, updates_per_sec, TARGET_UPDATES_PER_SEC,
+        "OK" if updates_per_sec >= TARGET_UPDATES_PER_SEC else "SLOW"))
+    print("levels: %s/%s (snapshot depth: %s, adding/removing a level is O(depth))" % (
+        len(order_book.asks), len(order_book.bids), DEPTH))
+
+
+if __name__ == "__main__":
+    run()
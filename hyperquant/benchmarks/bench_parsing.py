@@ -0,0 +1,42 @@
+import timeit
+
+from hyperquant.clients import Candle, Trade
+from hyperquant.clients.okex import OkexRESTConverterV1
+
+"""
+Parsing benchmark for OKEx REST pages ("kline.do" and "trades.do", 1000 rows each).
+
+    python -m hyperquant.benchmarks.bench_parsing
+"""
+
+ROW_COUNT = 1000
+REPEAT_COUNT = 50
+
+CANDLES_DATA = [[1548374520000 + i * 60000, "0.00910763", "0.00911616", "0.00910763", "0.00911616", "98.904574"]
+                for i in range(ROW_COUNT)]
+TRADES_DATA = [{"date": 1548374520 + i, "date_ms": 1548374520000 + i * 1000, "amount": "1.195697",
+                "price": "0.2795", "type": "buy" if i % 2 else "sell", "tid": 71857648 + i}
+               for i in range(ROW_COUNT)]
+
+
+def _measure(fun, repeat_count=REPEAT_COUNT):
+    return min(timeit.repeat(fun, number=1, repeat=repeat_count)) * 1000
+
+
+def run():
+    converter = OkexRESTConverterV1()
+    lookup_by_class = converter.param_lookup_by_class
+
+    print("%-30s %12s" % ("case", "ms/page"))
+    for endpoint, item_class, data in [("kline.do", Candle, CANDLES_DATA), ("trades.do", Trade, TRADES_DATA)]:
+        lookup = lookup_by_class[item_class]
+        print("%-30s %12.3f" % (endpoint + " set up by lookup", _measure(
+            lambda: [converter._set_up_object_by_lookup(item_class(), lookup, item_data) for item_data in data])))
+        print("%-30s %12.3f" % (endpoint + " set up compiled", _measure(
+            lambda: [converter._create_and_set_up_object(item_class, item_data) for item_data in data])))
+        print("%-30s %12.3f" % (endpoint + " parse()", _measure(
+            lambda: converter.parse(endpoint, data))))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,93 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import requests
+
+from hyperquant.api import Interval
+from hyperquant.clients.okex import OkexRESTClient
+from hyperquant.clients.ratelimit import RateLimiter
+from hyperquant.clients.transport import HTTPTransport
+
+"""
+REST requests/sec against a local keep-alive server with concurrent multi-symbol fetching:
+a session per client with default pool sizes vs a shared HTTPTransport.
+
+    python -m hyperquant.benchmarks.bench_transport
+"""
+
+SYMBOL_COUNT = 2000
+MAX_WORKERS = 32
+CLIENT_COUNT = 2  # (public and private)
+
+RESPONSE_CONTENT = json.dumps([[1548374520000, "0.0317", "0.0318", "0.0316", "0.03175", "98.9"]]).encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE_CONTENT)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_CONTENT)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connection_count = 0
+
+    def process_request(self, request, client_address):
+        self.connection_count += 1
+        super().process_request(request, client_address)
+
+
+def _run_case(server, name, create_client):
+    clients = [create_client() for _ in range(CLIENT_COUNT)]
+    for client in clients:
+        client.converter.base_url = "http://127.0.0.1:%s/api/v{version}/" % server.server_port
+        client.max_workers = MAX_WORKERS
+    symbols = ["s%s_btc" % i for i in range(SYMBOL_COUNT // CLIENT_COUNT)]
+    server.connection_count = 0
+
+    start = time.time()
+    threads = [Thread(target=client.fetch_candles_for_symbols, args=(symbols, Interval.MIN_1)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.time() - start
+
+    print("%-40s %10.0f %12d" % (name, SYMBOL_COUNT / duration, server.connection_count))
+    for client in clients:
+        client.close()
+
+
+def run():
+    server = CountingServer(("127.0.0.1", 0), StubHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    print("%d requests, %d clients, %d workers each" % (SYMBOL_COUNT, CLIENT_COUNT, MAX_WORKERS))
+    print("%-40s %10s %12s" % ("case", "req/s", "connections"))
+
+    class SessionPerClient(HTTPTransport):
+        # (As it was before: requests.session() with default adapter)
+        def _create_session(self):
+            return requests.session()
+
+    _run_case(server, "session per client (default pool)",
+              lambda: OkexRESTClient(rate_limiter=RateLimiter(), transport=SessionPerClient()))
+    transport = HTTPTransport(pool_maxsize=MAX_WORKERS * CLIENT_COUNT)
+    _run_case(server, "shared HTTPTransport (pool_maxsize=%s)" % transport.pool_maxsize,
+              lambda: OkexRESTClient(rate_limiter=RateLimiter(), transport=transport))
+    transport.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run()
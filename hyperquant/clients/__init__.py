@@ -1,16 +1,25 @@
-import json
 import logging
 import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from operator import itemgetter
-from threading import Thread
+from threading import Lock, RLock, Thread, local
 from urllib.parse import urljoin, urlencode
 
-import requests
-from dateutil import parser
 from websocket import WebSocketApp
 
-from hyperquant.api import ParamName, ParamValue, ErrorCode, Endpoint, Platform, Sorting, OrderType
+from hyperquant.api import ParamName, ParamValue, ErrorCode, Endpoint, Platform, Sorting, OrderType, \
+    OrderBookDirection, Interval, to_fixed_point
+from hyperquant import codec
+from hyperquant.clients.coalescing import RequestCoalescer
+from hyperquant.clients.dispatch import Dispatcher, OverflowPolicy
+from hyperquant.clients.ratelimit import RateLimiter
+from hyperquant.clients.transport import HTTPTransport
+from hyperquant.timestamps import convert_timestamps_from_platform, TimeOfDayParser
 
 """
 API clients for various trading platforms: REST and WebSocket.
@@ -22,8 +31,13 @@ https://docs.google.com/document/d/1U3kuokpeNSzxSbXhXJ3XnNYbfZaK5nY3_tAL-Uk0wKQ
 
 # Value objects
 
+# (Note: Frequently created item classes (trades, candles, etc.) define __slots__ instead of
+# class attributes with default values to keep memory footprint small. All slots are set in
+# __init__(), so hasattr() and getattr() work for them as before, and unknown attributes
+# cannot be set by mistake.)
+
 class ValueObject:
-    pass
+    __slots__ = ()
 
 
 # WS
@@ -37,6 +51,10 @@ class Channel(ValueObject):
     channel_id = None
     channel = None
     symbol = None
+    # (For confirmations of subscribe commands) True - subscribed, False - unsubscribed
+    is_subscribed = None
+    # Error - if subscribing failed
+    error = None
 
 
 class Error(ValueObject):
@@ -48,17 +66,20 @@ class Error(ValueObject):
 
 
 class DataObject(ValueObject):
-    pass
+    __slots__ = ()
 
     is_milliseconds = False
 
 
 class ItemObject(DataObject):
     # (Note: Order is from abstract to concrete)
-    platform_id = None
-    symbol = None
-    timestamp = None  # Unix timestamp in milliseconds
-    item_id = None  # There is no item_id for candle, ticker, bookticker, only for trade, mytrade and order
+    __slots__ = (
+        "platform_id",
+        "symbol",
+        "timestamp",  # Unix timestamp in milliseconds
+        "item_id",  # There is no item_id for candle, ticker, bookticker, only for trade, mytrade and order
+        "is_milliseconds",
+    )
 
     def __init__(self, platform_id=None, symbol=None, timestamp=None, item_id=None, is_milliseconds=False) -> None:
         super().__init__()
@@ -88,12 +109,14 @@ class ItemObject(DataObject):
 
 
 class Trade(ItemObject):
-    # Trade data:
-    price = None
-    amount = None
+    __slots__ = (
+        # Trade data:
+        "price",
+        "amount",
 
-    # Not for all platforms or versions:
-    direction = None
+        # Not for all platforms or versions:
+        "direction",
+    )
 
     def __init__(self, platform_id=None, symbol=None, timestamp=None, item_id=None,
                  price=None, amount=None, direction=None, is_milliseconds=False) -> None:
@@ -104,13 +127,15 @@ class Trade(ItemObject):
 
 
 class MyTrade(Trade):
-    order_id = None
+    __slots__ = (
+        "order_id",
 
-    # Optional (not for all platforms):
-    fee = None  # Комиссия биржи  # must be always positive; 0 if not supported
-    rebate = None  # Возврат денег, скидка после покупки  # must be always positive; 0 if not supported
-    # fee_symbol = None  # Currency symbol, by default, it's the same as for price
-    # Note: volume = price * amount, total = volume - fee + rebate
+        # Optional (not for all platforms):
+        "fee",  # Комиссия биржи  # must be always positive; 0 if not supported
+        "rebate",  # Возврат денег, скидка после покупки  # must be always positive; 0 if not supported
+        # "fee_symbol",  # Currency symbol, by default, it's the same as for price
+        # Note: volume = price * amount, total = volume - fee + rebate
+    )
 
     def __init__(self, platform_id=None, symbol=None, timestamp=None, item_id=None, price=None, amount=None,
                  direction=None, order_id=None, fee=None, rebate=None, is_milliseconds=False) -> None:
@@ -121,19 +146,21 @@ class MyTrade(Trade):
 
 
 class Candle(ItemObject):
-    # platform_id = None
-    # symbol = None
-    # timestamp = None  # open_timestamp
-    interval = None
-
-    price_open = None
-    price_close = None
-    price_high = None
-    price_low = None
-    amount = None
-
-    # Optional
-    trades_count = None
+    # platform_id
+    # symbol
+    # timestamp  # open_timestamp
+    __slots__ = (
+        "interval",
+
+        "price_open",
+        "price_close",
+        "price_high",
+        "price_low",
+        "amount",
+
+        # Optional
+        "trades_count",
+    )
 
     def __init__(self, platform_id=None, symbol=None, timestamp=None, interval=None,
                  price_open=None, price_close=None, price_high=None, price_low=None,
@@ -149,11 +176,12 @@ class Candle(ItemObject):
 
 
 class Ticker(ItemObject):
-    # platform_id = None
-    # symbol = None
-    # timestamp = None
-
-    price = None
+    # platform_id
+    # symbol
+    # timestamp
+    __slots__ = (
+        "price",
+    )
 
     def __init__(self, platform_id=None, symbol=None, timestamp=None, price=None, is_milliseconds=False) -> None:
         super().__init__(platform_id, symbol, timestamp, None, is_milliseconds)
@@ -169,6 +197,7 @@ class Ticker(ItemObject):
 
 
 class OrderBook(ItemObject):
+    # (Parsed asks and bids are OrderBookSide instances)
     asks = None
     bids = None
 
@@ -178,18 +207,32 @@ class OrderBook(ItemObject):
         self.asks = asks
         self.bids = bids
 
+    @property
+    def best_ask(self):
+        # (price, amount)
+        return self.asks.best if self.asks else None
 
-class OrderBookItem(ItemObject):
-    # platform_id = None
-    # order_book_item_id = None  # item_id = None
-    # symbol = None
+    @property
+    def best_bid(self):
+        return self.bids.best if self.bids else None
 
-    price = None
-    amount = None
-    direction = None
+    @property
+    def spread(self):
+        return self.asks.best_price - self.bids.best_price if self.asks and self.bids else None
 
-    # Optional
-    order_count = None
+
+class OrderBookItem(ItemObject):
+    # platform_id
+    # order_book_item_id  # item_id
+    # symbol
+    __slots__ = (
+        "price",
+        "amount",
+        "direction",
+
+        # Optional
+        "order_count",
+    )
 
     def __init__(self, platform_id=None, symbol=None, timestamp=None, item_id=None, is_milliseconds=False,
                  price=None, amount=None, direction=None, order_count=None) -> None:
@@ -201,6 +244,151 @@ class OrderBookItem(ItemObject):
         self.order_count = order_count
 
 
+class OrderBookSide(ValueObject, Sequence):
+    """
+    Asks or bids of an order book stored as parallel arrays of prices and amounts
+    sorted from the best price (lowest for asks, highest for bids).
+    OrderBookItem objects are created only when levels are iterated or accessed by index,
+    so a side can be used as a sequence of items (as lists of OrderBookItem before).
+
+        order_book.asks.best  # (price, amount)
+        order_book.bids.top(10)  # [(price, amount), ...]
+        order_book.asks.get_cumulative_amount(price=3600)  # amount available up to the price
+    """
+
+    # (Prices are stored as keys: price for asks and -price for bids, so that keys
+    # are always ascending and the best level is always the first one)
+
+    platform_id = None
+    symbol = None
+    timestamp = None
+    is_milliseconds = False
+
+    def __init__(self, direction, prices=None, amounts=None, order_counts=None, is_sorted=False,
+                 platform_id=None, symbol=None, timestamp=None, is_milliseconds=False) -> None:
+        super().__init__()
+        self.direction = direction
+        self._sign = -1 if direction == OrderBookDirection.BID else 1
+        self.platform_id = platform_id
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.is_milliseconds = is_milliseconds
+
+        prices = prices or []
+        amounts = amounts or []
+        # (Optional, not for all platforms)
+        self.order_counts = order_counts
+        if not is_sorted and any(self._is_worse(prices[i], prices[i + 1]) for i in range(len(prices) - 1)):
+            indexes = sorted(range(len(prices)), key=lambda i: prices[i] * self._sign)
+            prices = [prices[i] for i in indexes]
+            amounts = [amounts[i] for i in indexes]
+            self.order_counts = [order_counts[i] for i in indexes] if order_counts else order_counts
+        self._keys = array("d", [price * self._sign for price in prices])
+        self._amounts = array("d", amounts)
+
+    def set_level(self, price, amount, order_count=None):
+        # Add, update or remove (if amount is 0) a level
+        # (Level is found by binary search in O(log n), updating amount is O(1), but adding
+        # or removing a level shifts the rest of arrays, which is O(n) memmove - cheap
+        # for books of up to thousands of levels, as most changes are near the best price)
+        key = price * self._sign
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            if amount:
+                self._amounts[index] = amount
+                if self.order_counts is not None:
+                    self.order_counts[index] = order_count
+            else:
+                del self._keys[index]
+                del self._amounts[index]
+                if self.order_counts is not None:
+                    del self.order_counts[index]
+        elif amount:
+            self._keys.insert(index, key)
+            self._amounts.insert(index, amount)
+            if self.order_counts is not None:
+                self.order_counts.insert(index, order_count)
+
+    def replace_levels(self, side):
+        # Replace all levels with levels of another side (snapshot)
+        self._keys = array("d", side._keys) if side else array("d")
+        self._amounts = array("d", side._amounts) if side else array("d")
+        self.order_counts = list(side.order_counts) if side and side.order_counts is not None else None
+
+    def _is_worse(self, price1, price2):
+        # True if price2 should be before price1
+        return (price2 - price1) * self._sign < 0
+
+    @property
+    def best(self):
+        return (self._keys[0] * self._sign, self._amounts[0]) if self._keys else None
+
+    @property
+    def best_price(self):
+        return self._keys[0] * self._sign if self._keys else None
+
+    def get_price(self, index):
+        return self._keys[index] * self._sign
+
+    def get_amount(self, index):
+        return self._amounts[index]
+
+    def top(self, count):
+        # [(price, amount), ...] for count best levels
+        sign = self._sign
+        return [(key * sign, amount) for key, amount in zip(self._keys[:count], self._amounts[:count])]
+
+    def get_cumulative_amounts(self, count=None):
+        # Amounts available for each of the best levels: [amount0, amount0 + amount1, ...]
+        result = []
+        total = 0
+        for amount in (self._amounts[:count] if count is not None else self._amounts):
+            total += amount
+            result.append(total)
+        return result
+
+    def get_cumulative_amount(self, price=None, count=None):
+        # Amount available for levels from the best to price (inclusive) or for count best levels
+        if price is not None:
+            count = bisect_right(self._keys, price * self._sign)
+        return sum(self._amounts[:count] if count is not None else self._amounts)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._create_item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Order book level index out of range")
+        return self._create_item(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._create_item(index)
+
+    def _create_item(self, index):
+        return OrderBookItem(self.platform_id, self.symbol, self.timestamp, None, self.is_milliseconds,
+                             self._keys[index] * self._sign, self._amounts[index], self.direction,
+                             self.order_counts[index] if self.order_counts else None)
+
+    def __eq__(self, o: object) -> bool:
+        if isinstance(o, OrderBookSide):
+            return self.direction == o.direction and self._keys == o._keys and self._amounts == o._amounts
+        # (Compared with lists of items as they were before)
+        if isinstance(o, (list, tuple)):
+            return list(self) == list(o)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return "[OrderBookSide-%s levels:%s best:%s]" % (
+            OrderBookDirection.name_by_value.get(self.direction), len(self), self.best)
+
+
 class Account(DataObject):
     platform_id = None
     timestamp = None
@@ -225,10 +413,12 @@ class Account(DataObject):
 
 class Balance(ValueObject):
     # Asset, currency
-    platform_id = None
-    symbol = None
-    amount_available = None
-    amount_reserved = None
+    __slots__ = (
+        "platform_id",
+        "symbol",
+        "amount_available",
+        "amount_reserved",
+    )
 
     def __init__(self, platform_id=None, symbol=None, amount_available=None, amount_reserved=None) -> None:
         super().__init__()
@@ -239,19 +429,21 @@ class Balance(ValueObject):
 
 
 class Order(ItemObject):
-    # platform_id = None
-    # item_id = None
-    # symbol = None
-    # timestamp = None  # (transact timestamp)
-    user_order_id = None
-
-    order_type = None  # limit and market
-    price = None
-    amount_original = None
-    amount_executed = None
-    direction = None
-
-    order_status = None  # open and close
+    # platform_id
+    # item_id
+    # symbol
+    # timestamp  # (transact timestamp)
+    __slots__ = (
+        "user_order_id",
+
+        "order_type",  # limit and market
+        "price",
+        "amount_original",
+        "amount_executed",
+        "direction",
+
+        "order_status",  # open and close
+    )
 
     def __init__(self, platform_id=None, symbol=None, timestamp=None, item_id=None, is_milliseconds=False,
                  user_order_id=None, order_type=None, price=None,
@@ -266,6 +458,139 @@ class Order(ItemObject):
         self.order_status = order_status
 
 
+# Batches (columnar mode)
+
+_NAN = float("nan")
+# (None in fixed-point int arrays)
+_FIXED_POINT_NONE = -2 ** 63
+
+
+class ItemBatch(DataObject, Sequence):
+    """
+    Container for a page of items of the same class stored by columns.
+
+    Numeric columns are backed by arrays, others - by lists. Item objects
+    are created only when a row is accessed, so a batch can be used
+    as a sequence of items (e.g. in api converters):
+
+        batch = client.fetch_candles("eth_btc", Interval.MIN_1)  # (with is_columnar=True)
+        total_amount = sum(batch.column(ParamName.AMOUNT))
+        last_candle = batch[-1]  # Candle instance
+
+    In fixed-point mode price and amount columns are int arrays ("q").
+    """
+
+    item_class = None
+    # {column_name: array_typecode or None (for list)}
+    typecode_by_column = None
+
+    # Common for all rows
+    platform_id = None
+    symbol = None
+
+    def __init__(self, platform_id=None, symbol=None, is_milliseconds=False, is_fixed_point=False) -> None:
+        super().__init__()
+        self.platform_id = platform_id
+        self.symbol = symbol
+        self.is_milliseconds = is_milliseconds
+        self.is_fixed_point = is_fixed_point
+
+        self.columns = {name: array(self.get_typecode(name)) if typecode else []
+                        for name, typecode in self.typecode_by_column.items()}
+
+    def get_typecode(self, name):
+        typecode = self.typecode_by_column[name]
+        if self.is_fixed_point and typecode == "d" and (ParamName.is_price(name) or ParamName.is_amount(name)):
+            return "q"
+        return typecode
+
+    def column(self, name):
+        return self.columns[name]
+
+    def extend_column(self, name, values):
+        # (None is stored as NaN in float arrays and as _FIXED_POINT_NONE in int arrays)
+        column = self.columns[name]
+        if isinstance(column, array):
+            none_value = _NAN if column.typecode == "d" else _FIXED_POINT_NONE
+            values = [value if value is not None else none_value for value in values]
+        column.extend(values)
+
+    def append_item(self, item):
+        for name, column in self.columns.items():
+            value = getattr(item, name)
+            if isinstance(column, array) and value is None:
+                value = _NAN if column.typecode == "d" else _FIXED_POINT_NONE
+            column.append(value)
+
+    def to_items(self):
+        return list(self)
+
+    def __len__(self) -> int:
+        return len(self.columns[ParamName.TIMESTAMP])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._create_item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Batch row index out of range")
+        return self._create_item(index)
+
+    def __iter__(self):
+        names = list(self.columns.keys())
+        for values in zip(*self.columns.values()):
+            yield self._create_item_by_values(zip(names, values))
+
+    def _create_item(self, index):
+        return self._create_item_by_values((name, column[index]) for name, column in self.columns.items())
+
+    def _create_item_by_values(self, name_value_pairs):
+        item = self.item_class(platform_id=self.platform_id, symbol=self.symbol,
+                               is_milliseconds=self.is_milliseconds)
+        for name, value in name_value_pairs:
+            # (NaN and _FIXED_POINT_NONE to None)
+            setattr(item, name, value if value == value and value != _FIXED_POINT_NONE else None)
+        if self.is_milliseconds and item.timestamp is not None:
+            item.timestamp = int(item.timestamp)
+        return item
+
+    def __repr__(self) -> str:
+        platform_name = Platform.get_platform_name_by_id(self.platform_id)
+        return "[%s-%s symbol:%s len:%s]" % (self.__class__.__name__, platform_name, self.symbol, len(self))
+
+
+class TradeBatch(ItemBatch):
+    item_class = Trade
+    typecode_by_column = {
+        ParamName.TIMESTAMP: "d",
+        ParamName.ITEM_ID: None,
+        ParamName.PRICE: "d",
+        ParamName.AMOUNT: "d",
+        ParamName.DIRECTION: None,
+    }
+
+
+class CandleBatch(ItemBatch):
+    item_class = Candle
+    typecode_by_column = {
+        ParamName.TIMESTAMP: "d",
+        ParamName.PRICE_OPEN: "d",
+        ParamName.PRICE_CLOSE: "d",
+        ParamName.PRICE_HIGH: "d",
+        ParamName.PRICE_LOW: "d",
+        ParamName.AMOUNT: "d",
+        ParamName.TRADES_COUNT: None,
+    }
+
+    interval = None
+
+    def _create_item_by_values(self, name_value_pairs):
+        item = super()._create_item_by_values(name_value_pairs)
+        item.interval = self.interval
+        return item
+
+
 # Base
 
 class ProtocolConverter:
@@ -283,6 +608,11 @@ class ProtocolConverter:
 
     # Settings:
     is_use_max_limit = False
+    # True - parse lists of items to batches (TradeBatch, CandleBatch) where possible
+    is_columnar = False
+    # FixedPointPrecision - parse prices and amounts to int (value * 10 ** precision) instead of float
+    # (Order book sides are not affected)
+    fixed_point_precision = None
 
     # Converting info:
     # Our endpoint to platform_endpoint
@@ -310,6 +640,13 @@ class ProtocolConverter:
     }
     # {Trade: {ParamName.ITEM_ID: "tid", ...}} - omitted properties won't be set
     param_lookup_by_class = None
+    # For columnar mode
+    batch_class_by_item_class = {
+        Trade: TradeBatch,
+        Candle: CandleBatch,
+    }
+    # Params of request which are set to parsed items (if items have such attributes)
+    context_param_names = [ParamName.SYMBOL, ParamName.INTERVAL]
 
     error_code_by_platform_error_code = None
     error_code_by_http_status = None
@@ -321,6 +658,8 @@ class ProtocolConverter:
     timestamp_platform_names = None  # ["startTime", "endTime"]
     # (If platform api is not consistent)
     timestamp_platform_names_by_endpoint = None  # {Endpoint.TRADE: ["start", "end"]}
+    # (If platform sends only time of day ("hh:mm:ss") in some timezone)
+    time_of_day_utc_offset_sec = None  # 8 * 3600 for UTC+8
     ITEM_TIMESTAMP_ATTR = ParamName.TIMESTAMP
 
     def __init__(self, platform_id=None, version=None):
@@ -329,36 +668,97 @@ class ProtocolConverter:
         if version is not None:
             self.version = version
 
+        # (Caches current day for all parsed time of day values)
+        self._time_of_day_parser = TimeOfDayParser(self.time_of_day_utc_offset_sec) \
+            if self.time_of_day_utc_offset_sec is not None else None
+        # Compiled by _compile_request_builder(): {(endpoint, version, base_url): build_request}
+        # (Per converter, not per class, as base_url can be changed for an instance)
+        self._request_builder_by_key = {}
+        # Compiled by _compile_object_factory(): {object_class: create_object}
+        # (Per converter, as param_lookup_by_class can be set for an instance. Note: lookups
+        # are frozen on first use, so change them before parsing, or copy() the converter)
+        self._object_factory_by_class = {}
+        # Compiled by _compile_post_process_plan(): {item_class: post_process_items}
+        # (Per converter too, as context_param_names and ITEM_TIMESTAMP_ATTR can be set for an instance)
+        self._post_process_plan_by_class = {}
+
         # Create logger
         platform_name = Platform.get_platform_name_by_id(self.platform_id)
         self.logger = logging.getLogger("%s.%s.v%s" % ("Converter", platform_name, self.version))
 
+    def copy(self):
+        # New converter with the same settings (set for this instance: is_columnar, etc.),
+        # but with its own state (time of day parser, compiled requests), e.g. for another thread
+        converter = self.__class__(self.platform_id, self.version)
+        for key, value in self.__dict__.items():
+            if not key.startswith("_") and key != "logger":
+                setattr(converter, key, value)
+        return converter
+
     # Convert to platform format
 
     def make_url_and_platform_params(self, endpoint=None, params=None, is_join_get_params=False, version=None):
-        # Apply version on base_url
         version = version or self.version
-        url = self.base_url.format(version=version) if self.base_url and version else self.base_url
-        # Prepare path and params
-        url_resources, platform_params = self.prepare_params(endpoint, params)
+        build_request = self._request_builder_by_key.get((endpoint, version, self.base_url))
+        if not build_request:
+            build_request = self._compile_request_builder(endpoint, version)
+            self._request_builder_by_key[(endpoint, version, self.base_url)] = build_request
+        url, platform_params = build_request(params)
 
         # Make resulting URL
         # url=ba://se_url/resou/rces?p=ar&am=s
-        if url_resources and url:
-            url = urljoin(url + "/", "/".join(url_resources))
         if platform_params and is_join_get_params:
             url = url + "?" + urlencode(platform_params)
         return url, platform_params
 
+    def _compile_request_builder(self, endpoint, version):
+        # Make a function which converts params to (url, platform_params) for endpoint
+        # (Lookups don't change, so base URL, platform endpoint, param names and value lookups
+        # are resolved once per endpoint instead of doing it for every request)
+        # (Note: changes of lookups made for an instance after its first request to endpoint
+        # are not seen by the compiled function, so set lookups in class or before requests)
+
+        # Apply version on base_url
+        base_url = self.base_url.format(version=version) if self.base_url and version else self.base_url
+
+        def join_url(platform_endpoint):
+            return urljoin(base_url + "/", platform_endpoint) if platform_endpoint and base_url else base_url
+
+        # (Subclasses which override the whole preparation are called as is)
+        if not self._is_method_default("prepare_params"):
+            def build_request(params):
+                url_resources, platform_params = self.prepare_params(endpoint, params)
+                return join_url("/".join(url_resources)), platform_params
+
+            return build_request
+
+        # Endpoint.TRADE -> "trades" (static URL) or "trades/{symbol}" (formatted with params)
+        platform_endpoint = self.endpoint_lookup.get(endpoint, endpoint) if self.endpoint_lookup else endpoint
+        is_endpoint_static = self._is_method_default("_get_platform_endpoint") and \
+            not callable(platform_endpoint) and "{" not in (platform_endpoint or "")
+        static_url = join_url(platform_endpoint) if is_endpoint_static else None
+        # (Filled on first use of a name)
+        translation_by_name = {}
+
+        def build_request(params):
+            # (The same as prepare_params(), but with cached translations and URL)
+            platform_params = self._convert_params_to_platform(params, translation_by_name)
+            self._convert_timestamp_values_to_platform(endpoint, platform_params)
+
+            if is_endpoint_static:
+                return static_url, platform_params
+            return join_url(self._get_platform_endpoint(endpoint, params)), platform_params
+
+        return build_request
+
+    def _is_method_default(self, name):
+        return getattr(self.__class__, name) is getattr(ProtocolConverter, name)
+
     def prepare_params(self, endpoint=None, params=None):
         # Override in subclasses if it is the only way to adopt client to platform
 
         # Convert our code's names to custom platform's names
-        platform_params = {self._get_platform_param_name(key): self._process_param_value(key, value)
-                           for key, value in params.items() if value is not None} if params else {}
-        # (Del not supported by platform params which defined in lookups as empty)
-        platform_params.pop("", "")
-        platform_params.pop(None, None)
+        platform_params = self._convert_params_to_platform(params)
         self._convert_timestamp_values_to_platform(endpoint, platform_params)
 
         # Endpoint.TRADE -> "trades/ETHBTC" or "trades"
@@ -369,6 +769,37 @@ class ProtocolConverter:
 
         return resources, platform_params
 
+    def _convert_params_to_platform(self, params, translation_by_name=None):
+        # Convert our code's names and values to custom platform's ones
+        # translation_by_name - {name: (platform_name, value_lookup)} to reuse between requests
+        platform_params = {}
+        if not params:
+            return platform_params
+        if translation_by_name is None:
+            translation_by_name = {}
+        value_lookup = self.param_value_lookup
+        process_value = None if self._is_method_default("_process_param_value") and \
+            self._is_method_default("_get_platform_param_value") else self._process_param_value
+
+        for name, value in params.items():
+            if value is None:
+                continue
+            translation = translation_by_name.get(name)
+            if not translation:
+                translation = translation_by_name[name] = (
+                    self._get_platform_param_name(name),
+                    value_lookup.get(name, value_lookup) if value_lookup else None)
+            platform_name, lookup = translation
+            # (Not supported by platform params are defined in lookups as empty)
+            if not platform_name:
+                continue
+            if process_value:
+                value = process_value(name, value)
+            elif lookup:
+                value = lookup.get(value, value)
+            platform_params[platform_name] = value
+        return platform_params
+
     def _process_param_value(self, name, value):
         # Convert values to platform values
         # if name in ParamValue.param_names:
@@ -403,7 +834,10 @@ class ProtocolConverter:
 
     # Convert from platform format
 
-    def parse(self, endpoint, data):
+    def parse(self, endpoint, data, context=None):
+        # context - params of request (symbol, interval, etc.) which are often not returned in response,
+        # so we have to set them to items by ourselves (see context_param_names)
+
         # if not endpoint or not data:
         #     self.logger.warning("Some argument is empty in parse(). endpoint: %s, data: %s", endpoint, data)
         #     return data
@@ -413,14 +847,34 @@ class ProtocolConverter:
 
         # (If list of items data, but not an item data as a list)
         if isinstance(data, list):  # and not isinstance(data[0], list):
-            result = [self._parse_item(endpoint, item_data) for item_data in data]
-            # (Skip empty)
-            result = [item for item in result if item]
-            return result
+            if self.is_columnar:
+                batch = self._parse_batch(endpoint, data, context)
+                if batch is not None:
+                    return batch
+            return self._parse_items(endpoint, data, context)
         else:
-            return self._parse_item(endpoint, data)
+            return self._parse_item(endpoint, data, context)
+
+    def _parse_items(self, endpoint, items_data, context=None):
+        if self.__class__._parse_item is not ProtocolConverter._parse_item:
+            # (Subclass parses each item in its own way)
+            result = [self._parse_item(endpoint, item_data, context) for item_data in items_data]
+            # (Skip empty)
+            return [item for item in result if item]
+
+        # Check item_class by endpoint
+        if not endpoint or not self.item_class_by_endpoint or endpoint not in self.item_class_by_endpoint:
+            self.logger.warning("Wrong endpoint: %s in parse_item().", endpoint)
+            return [item_data for item_data in items_data if item_data]
+        item_class = self.item_class_by_endpoint[endpoint]
+
+        # Create and set up items by items_data (using lookup to convert property names)
+        items = [self._create_and_set_up_object(item_class, item_data) for item_data in items_data]
+        # (Skip empty)
+        items = [item for item in items if item]
+        return self._post_process_items(items, context)
 
-    def _parse_item(self, endpoint, item_data):
+    def _parse_item(self, endpoint, item_data, context=None):
         # Check item_class by endpoint
         if not endpoint or not self.item_class_by_endpoint or endpoint not in self.item_class_by_endpoint:
             self.logger.warning("Wrong endpoint: %s in parse_item().", endpoint)
@@ -429,40 +883,168 @@ class ProtocolConverter:
 
         # Create and set up item by item_data (using lookup to convert property names)
         item = self._create_and_set_up_object(item_class, item_data)
-        item = self._post_process_item(item)
+        item = self._post_process_item(item, context)
         return item
 
-    def _post_process_item(self, item):
-        # Process parsed values (convert from platform)
-        # Set platform_id
-        if hasattr(item, ParamName.PLATFORM_ID):
-            item.platform_id = self.platform_id
-        # Stringify item_id
-        if hasattr(item, ParamName.ITEM_ID) and item.item_id is not None:
-            item.item_id = str(item.item_id)
-        # Convert timestamp
-        # (If API returns milliseconds or string date we must convert them to Unix timestamp (in seconds or ms))
-        # (Note: add here more timestamp attributes if you use another name in your VOs)
-        if hasattr(item, self.ITEM_TIMESTAMP_ATTR) and item.timestamp:
-            item.timestamp = self._convert_timestamp_from_platform(item.timestamp)
-            item.is_milliseconds = self.use_milliseconds
-        # Convert asks and bids to OrderBookItem type
-        if hasattr(item, ParamName.ASKS) and item.asks:
-            item.asks = [self._create_and_set_up_object(OrderBookItem, item_data)
-                         for item_data in item.asks]
-        if hasattr(item, ParamName.BIDS) and item.bids:
-            item.bids = [self._create_and_set_up_object(OrderBookItem, item_data)
-                         for item_data in item.bids]
-        # Convert items to Balance type
-        if hasattr(item, ParamName.BALANCES) and item.balances:
-            item.balances = [self._create_and_set_up_object(Balance, item_data)
-                             for item_data in item.balances]
-            # Set platform_id
-            for balance in item.balances:
-                self._post_process_item(balance)
+    def _parse_batch(self, endpoint, items_data, context=None):
+        # Returns None if items for endpoint cannot be parsed to a batch
+        item_class = self.item_class_by_endpoint.get(endpoint) if endpoint and self.item_class_by_endpoint else None
+        batch_class = self.batch_class_by_item_class.get(item_class) \
+            if item_class and self.batch_class_by_item_class else None
+        lookup = self.param_lookup_by_class.get(item_class) if batch_class and self.param_lookup_by_class else None
+        if not lookup:
+            return None
 
+        fixed_point_precision = self.fixed_point_precision
+        batch = batch_class(self.platform_id, None, self.use_milliseconds, bool(fixed_point_precision))
+        platform_key_by_name = self._get_platform_key_by_name(item_class)
+
+        # Symbol is common for all items in batch
+        if ParamName.SYMBOL in platform_key_by_name and items_data:
+            batch.symbol = self._get_batch_value(items_data[0], platform_key_by_name[ParamName.SYMBOL])
+        # Set symbol, interval, etc. from request params
+        # (Before values are converted, as symbol defines fixed-point precision)
+        if context:
+            for name in self.context_param_names or []:
+                if hasattr(batch, name) and context.get(name):
+                    setattr(batch, name, context[name])
+
+        for name in batch.columns:
+            if name not in platform_key_by_name:
+                batch.extend_column(name, [None] * len(items_data))
+                continue
+            platform_key = platform_key_by_name[name]
+            values = [self._get_batch_value(item_data, platform_key) for item_data in items_data]
+            # Process parsed values (convert from platform) as in _post_process_item()
+            if name == ParamName.ITEM_ID:
+                values = [str(value) if value is not None else None for value in values]
+            elif name == self.ITEM_TIMESTAMP_ATTR:
+                values = self._convert_timestamps_from_platform(values)
+            elif batch.get_typecode(name) == "q":
+                precision = fixed_point_precision.get_precision_for(batch.symbol, name)
+                values = [to_fixed_point(value, precision) for value in values]
+            elif batch.get_typecode(name) == "d":
+                values = [float(value) if value is not None else None for value in values]
+            batch.extend_column(name, values)
+        return batch
+
+    def _get_platform_key_by_name(self, object_class):
+        # {ParamName.PRICE: "price", ...} or {ParamName.PRICE: 0, ...}
+        lookup = self.param_lookup_by_class.get(object_class) if self.param_lookup_by_class else None
+        if not lookup:
+            raise Exception("There is no lookup for %s in %s" % (object_class, self.__class__))
+        # (Lookup is usually a dict, but can be a list when item_data is a list)
+        key_pair = lookup.items() if isinstance(lookup, dict) else enumerate(lookup)
+        return {key: platform_key for platform_key, key in key_pair if key}
+
+    def _create_order_book_side(self, direction, levels_data, order_book):
+        # Convert order book levels data to OrderBookSide without creating OrderBookItem for each level
+        platform_key_by_name = self._get_platform_key_by_name(OrderBookItem)
+        price_key = platform_key_by_name[ParamName.PRICE]
+        amount_key = platform_key_by_name[ParamName.AMOUNT]
+        order_count_key = platform_key_by_name.get("order_count")
+        prices = [float(level_data[price_key]) for level_data in levels_data]
+        amounts = [float(level_data[amount_key]) for level_data in levels_data]
+        order_counts = [level_data[order_count_key] for level_data in levels_data] \
+            if order_count_key is not None else None
+        return OrderBookSide(direction, prices, amounts, order_counts, False, order_book.platform_id,
+                             order_book.symbol, order_book.timestamp, order_book.is_milliseconds)
+
+    def _get_batch_value(self, item_data, platform_key):
+        if isinstance(item_data, dict):
+            return item_data.get(platform_key)
+        return item_data[platform_key]
+
+    def _post_process_item(self, item, context=None):
+        if item:
+            self._apply_post_process_plan([item], context)
         return item
 
+    def _post_process_items(self, items, context=None):
+        # Process parsed values (convert from platform) for all items of the same class in one pass
+        if not items:
+            return items
+        if not self._is_method_default("_post_process_item"):
+            # (Subclass processes each item in its own way)
+            result = [self._post_process_item(item, context) for item in items]
+            # (Skip empty)
+            return [item for item in result if item]
+        return self._apply_post_process_plan(items, context)
+
+    def _apply_post_process_plan(self, items, context=None):
+        post_process_items = self._post_process_plan_by_class.get(items[0].__class__)
+        if not post_process_items:
+            post_process_items = self._compile_post_process_plan(items[0].__class__)
+            self._post_process_plan_by_class[items[0].__class__] = post_process_items
+        post_process_items(self, items, context)
+        return items
+
+    def _compile_post_process_plan(self, item_class):
+        # Make a function which processes items of item_class
+        # (Check which steps are needed once for a class instead of checking it for every item)
+        is_platform_id = hasattr(item_class, ParamName.PLATFORM_ID)
+        is_item_id = hasattr(item_class, ParamName.ITEM_ID)
+        # (Note: add here more timestamp attributes if you use another name in your VOs)
+        timestamp_attr = self.ITEM_TIMESTAMP_ATTR
+        is_timestamp = hasattr(item_class, timestamp_attr)
+        is_asks = hasattr(item_class, ParamName.ASKS)
+        is_bids = hasattr(item_class, ParamName.BIDS)
+        is_balances = hasattr(item_class, ParamName.BALANCES)
+        context_param_names = [name for name in self.context_param_names if hasattr(item_class, name)] \
+            if self.context_param_names else []
+        # [(name, is_price)]
+        fixed_point_names = [(name, ParamName.is_price(name))
+                             for name in ParamName._price_names + ParamName._amount_names if hasattr(item_class, name)]
+
+        def post_process_items(converter, items, context):
+            platform_id = converter.platform_id
+            use_milliseconds = converter.use_milliseconds
+            fixed_point_precision = converter.fixed_point_precision if fixed_point_names else None
+            context_values = [(name, context[name]) for name in context_param_names if context.get(name)] \
+                if context else None
+            # (If API returns milliseconds or string date we must convert them to Unix timestamp
+            # (in seconds or ms). All timestamps of a page are converted at once)
+            timestamps = converter._convert_timestamps_from_platform(
+                [getattr(item, timestamp_attr) for item in items]) if is_timestamp else None
+
+            for index, item in enumerate(items):
+                # Set platform_id
+                if is_platform_id:
+                    item.platform_id = platform_id
+                # Stringify item_id
+                if is_item_id and item.item_id is not None:
+                    item.item_id = str(item.item_id)
+                # Set converted timestamp
+                if is_timestamp and timestamps[index]:
+                    setattr(item, timestamp_attr, timestamps[index])
+                    item.is_milliseconds = use_milliseconds
+                # Convert items to Balance type
+                if is_balances and item.balances:
+                    item.balances = [converter._create_and_set_up_object(Balance, item_data)
+                                     for item_data in item.balances]
+                    # Set platform_id
+                    converter._post_process_items(item.balances)
+                # Set symbol, interval, etc. from request params
+                if context_values:
+                    for name, value in context_values:
+                        setattr(item, name, value)
+                # Convert prices and amounts to fixed-point ints (with precision by symbol)
+                if fixed_point_precision:
+                    price_precision, amount_precision = fixed_point_precision.get_precision(item.symbol)
+                    for name, is_price in fixed_point_names:
+                        value = getattr(item, name)
+                        if value is not None:
+                            setattr(item, name, to_fixed_point(value, price_precision if is_price
+                                                               else amount_precision))
+                # Convert asks and bids to OrderBookSide type (arrays instead of OrderBookItem for each level)
+                # (After symbol and timestamp are set as they are used for OrderBookItem views)
+                if is_asks and item.asks:
+                    item.asks = converter._create_order_book_side(OrderBookDirection.ASK, item.asks, item)
+                if is_bids and item.bids:
+                    item.bids = converter._create_order_book_side(OrderBookDirection.BID, item.bids, item)
+
+        return post_process_items
+
     def parse_error(self, error_data=None, response=None):
         # (error_data=None and response!=None when REST API returns 404 and html response)
         if response and response.ok:
@@ -476,6 +1058,10 @@ class ProtocolConverter:
             result.code = response.status_code
         result.code = self.error_code_by_platform_error_code.get(result.code, result.code) \
             if self.error_code_by_platform_error_code else result.code
+        # (HTTP status like 429 or 418 defines error better than any code in response)
+        if response is not None and self.error_code_by_http_status and \
+                response.status_code in self.error_code_by_http_status:
+            result.code = self.error_code_by_http_status[response.status_code]
         result.message = ErrorCode.get_message_by_code(result.code) + response_message
         return result
 
@@ -483,12 +1069,67 @@ class ProtocolConverter:
         if not object_class or not data:
             return None
 
-        obj = object_class()
+        create_object = self._object_factory_by_class.get(object_class)
+        if not create_object:
+            create_object = self._compile_object_factory(object_class)
+            self._object_factory_by_class[object_class] = create_object
+        return create_object(data)
+
+    def _compile_object_factory(self, object_class):
+        # Make a function which creates and sets up object of object_class by data
+        # (Lookup doesn't change, so we can do most of the work once per converter
+        # and object class instead of doing it for every item)
         lookup = self.param_lookup_by_class.get(object_class) if self.param_lookup_by_class else None
         if not lookup:
             # self.logger.error("There is no lookup for %s in %s", object_class, self.__class__)
             raise Exception("There is no lookup for %s in %s" % (object_class, self.__class__))
         # (Lookup is usually a dict, but can be a list when item_data is a list)
+        key_pair = lookup.items() if isinstance(lookup, dict) else enumerate(lookup)
+        key_pair = [(platform_key, key) for platform_key, key in key_pair if key]
+        if not key_pair or not all(key.isidentifier() for platform_key, key in key_pair):
+            return lambda data: self._set_up_object_by_lookup(object_class(), lookup, data)
+
+        # Values are extracted all at once: by keys for dict or by indexes for list
+        # (If some key is missing, slow path is used: only present keys are set)
+        get_values = itemgetter(*[platform_key for platform_key, key in key_pair])
+        # Slotted objects are created without __init__() call (default values are set directly)
+        default_by_name = self._get_default_value_by_slot_name(object_class)
+        names = [key for platform_key, key in key_pair]
+        lines = ["def create_object(data):",
+                 "    try:",
+                 "        values = get_values(data)",
+                 "    except (KeyError, IndexError, TypeError):",
+                 "        return set_up_object_by_lookup(object_class(), lookup, data)"]
+        if default_by_name is None:
+            lines.append("    obj = object_class()")
+        else:
+            lines.append("    obj = new(object_class)")
+            lines += ["    obj.%s = %s" % (name, repr(value) if value is None or isinstance(value, (bool, int, str))
+                                         else "default_by_name[%r]" % name)
+                      for name, value in default_by_name.items() if name not in names]
+        # (itemgetter returns a value, not a tuple, for a single key)
+        lines += ["    %s = values" % ", ".join("obj." + name for name in names),
+                  "    return obj"]
+        namespace = {"get_values": get_values, "object_class": object_class, "new": object_class.__new__,
+                     "lookup": lookup, "default_by_name": default_by_name,
+                     "set_up_object_by_lookup": self._set_up_object_by_lookup}
+        exec("\n".join(lines), namespace)
+        return namespace["create_object"]
+
+    @staticmethod
+    def _get_default_value_by_slot_name(object_class):
+        # Returns None if the object cannot be created without __init__()
+        if any("__dict__" in vars(cls) for cls in object_class.__mro__ if cls is not object):
+            return None
+        slot_names = [name for cls in reversed(object_class.__mro__) for name in vars(cls).get("__slots__", ())]
+        # (Take values set by __init__() with default arguments)
+        prototype = object_class()
+        if not all(hasattr(prototype, name) for name in slot_names):
+            return None
+        return {name: getattr(prototype, name) for name in slot_names}
+
+    @staticmethod
+    def _set_up_object_by_lookup(obj, lookup, data):
         key_pair = lookup.items() if isinstance(lookup, dict) else enumerate(lookup)
         for platform_key, key in key_pair:
             if key and (not isinstance(data, dict) or platform_key in data):
@@ -521,7 +1162,8 @@ class ProtocolConverter:
             timestamp /= 1000
 
         if self.is_source_in_milliseconds:
-            timestamp *= 1000
+            # (Platforms expect int milliseconds, not "1546300800000.0")
+            timestamp = int(round(timestamp * 1000))
         elif self.is_source_in_timestring:
             dt = datetime.utcfromtimestamp(timestamp)
             timestamp = dt.isoformat()
@@ -530,16 +1172,13 @@ class ProtocolConverter:
     def _convert_timestamp_from_platform(self, timestamp):
         if not timestamp:
             return timestamp
-        if self.is_source_in_milliseconds:
-            timestamp /= 1000
-            # if int(timestamp) == timestamp:
-            #     timestamp = int(timestamp)
-        elif self.is_source_in_timestring:
-            timestamp = parser.parse(timestamp).timestamp()
+        return self._convert_timestamps_from_platform([timestamp])[0]
 
-        if self.use_milliseconds:
-            timestamp = int(timestamp * 1000)
-        return timestamp
+    def _convert_timestamps_from_platform(self, timestamps):
+        # (Convert all timestamps of a page at once)
+        return convert_timestamps_from_platform(timestamps, self.is_source_in_milliseconds,
+                                                self.is_source_in_timestring, self.use_milliseconds,
+                                                self._time_of_day_parser)
 
 
 class BaseClient:
@@ -574,6 +1213,22 @@ class BaseClient:
     def use_milliseconds(self, value):
         self.converter.use_milliseconds = value
 
+    @property
+    def is_columnar(self):
+        return self.converter.is_columnar
+
+    @is_columnar.setter
+    def is_columnar(self, value):
+        self.converter.is_columnar = value
+
+    @property
+    def fixed_point_precision(self):
+        return self.converter.fixed_point_precision
+
+    @fixed_point_precision.setter
+    def fixed_point_precision(self, value):
+        self.converter.fixed_point_precision = value
+
     def __init__(self, version=None, **kwargs) -> None:
         super().__init__()
 
@@ -655,6 +1310,10 @@ class RESTConverter(ProtocolConverter):
     # endpoint -> platform_endpoint
     endpoint_lookup = None
     max_limit_by_endpoint = None
+    # Endpoints which don't support FROM_TIME and TO_TIME (history is requested only by item)
+    endpoints_without_time_params = None  # {Endpoint.TRADE_HISTORY}
+    # Request weights for rate limiter (1 by default)
+    weight_by_endpoint = None  # {Endpoint.ORDER_BOOK: 5}
 
     @property
     def default_sorting(self):
@@ -701,8 +1360,11 @@ class RESTConverter(ProtocolConverter):
         # (from_item <-> to_item)
         # is_from_newer_than_to = getattr(from_item, self.ITEM_TIMESTAMP_ATTR, 0) > \
         #                         getattr(to_item, self.ITEM_TIMESTAMP_ATTR, 0)
-        is_from_newer_than_to = (from_item.timestamp or 0) > (to_item.timestamp or 0)
-        if from_item and to_item and is_from_newer_than_to:
+        # (Items can be given as ids, and to_item can be not given (e.g. when paging by item))
+        is_from_newer_than_to = from_item and to_item and \
+            (getattr(from_item, self.ITEM_TIMESTAMP_ATTR, None) or 0) > \
+            (getattr(to_item, self.ITEM_TIMESTAMP_ATTR, None) or 0)
+        if is_from_newer_than_to:
             params[ParamName.FROM_ITEM] = to_item
             params[ParamName.TO_ITEM] = from_item
 
@@ -727,15 +1389,8 @@ class RESTConverter(ProtocolConverter):
             return result
 
         # (Symbol and interval are often not returned in response, so we have to set it here)
-        # symbol = params.get(ParamName.SYMBOL) if params else None
-        # if symbol:
-        #     if isinstance(result, list):
-        #         for item in result:
-        #             if hasattr(item, ParamName.SYMBOL):
-        #                 item.symbol = symbol
-        #     else:
-        #         if hasattr(result, ParamName.SYMBOL):
-        #             result.symbol = symbol
+        # (Usually they are already set from request params in parse(), see
+        # ProtocolConverter.context_param_names, and this is only for parse() called without params)
         self._propagate_param_to_result(ParamName.SYMBOL, params, result)
         self._propagate_param_to_result(ParamName.INTERVAL, params, result)
 
@@ -745,6 +1400,9 @@ class RESTConverter(ProtocolConverter):
         value = params.get(param_name) if params else None
         if value:
             if isinstance(result, list):
+                # (Skip the second pass if values were set in parse())
+                if result and getattr(result[0], param_name, value) == value:
+                    return
                 for item in result:
                     if hasattr(item, param_name):
                         setattr(item, param_name, value)
@@ -758,12 +1416,34 @@ class BaseRESTClient(BaseClient):
     _log_prefix = "RESTClient"
 
     default_converter_class = RESTConverter
+    # Platform's rate limit (None - no pacing, only delays after rate limit errors)
+    rate_limit_per_sec = None
+    rate_limit_capacity = None
+    # True - identical concurrent public GET requests are sent once and share the result
+    is_coalescing = False
 
     # State:
-    delay_before_next_request_sec = 0
+    # (Shared by all clients of a platform if created by clients.utils)
+    rate_limiter = None
+    # (Shared by all clients if created by clients.utils)
+    transport = None
+    _is_own_transport = False
+    # ResponseCache for idempotent reads (None - no caching)
+    cache = None
+    # (Requests in flight, used if is_coalescing)
+    coalescer = None
 
     session = None
-    _last_response_for_debugging = None
+    # (Per thread, as requests can be sent from many threads at once, see PlatformRESTClient._fan_out())
+    _local = None
+
+    @property
+    def _last_response_for_debugging(self):
+        return getattr(self._local, "last_response", None)
+
+    @_last_response_for_debugging.setter
+    def _last_response_for_debugging(self, value):
+        self._local.last_response = value
 
     @property
     def headers(self):
@@ -772,18 +1452,67 @@ class BaseRESTClient(BaseClient):
             "User-Agent": "client/python",
         }
 
-    def __init__(self, version=None, **kwargs) -> None:
+    def __init__(self, version=None, rate_limiter=None, transport=None, cache=None, **kwargs) -> None:
         super().__init__(version, **kwargs)
 
-        self.session = requests.session()
+        self._local = local()
+        self.rate_limiter = rate_limiter or self.create_rate_limiter()
+        self.transport = transport
+        self.cache = cache
+        self.coalescer = RequestCoalescer()
+        self.session = self._create_session()
+
+    @classmethod
+    def create_rate_limiter(cls):
+        return RateLimiter(cls.rate_limit_per_sec, cls.rate_limit_capacity,
+                           Platform.get_platform_name_by_id(cls.platform_id))
+
+    def _create_session(self):
+        if not self.transport:
+            self.transport = HTTPTransport()
+            self._is_own_transport = True
+        return self.transport.session
 
     def close(self):
-        if self.session:
-            self.session.close()
+        # (Shared transport is closed by its owner)
+        if self._is_own_transport:
+            self.transport.close()
 
     def _send(self, method, endpoint, params=None, version=None, **kwargs):
-        converter = self.get_or_create_converter(version)
         # Prepare
+        request = self._prepare_request(method, endpoint, params, version, **kwargs)
+        if not request:
+            return None
+        converter, params, url, request_kwargs = request
+
+        # Get from cache
+        cache_key = self._get_cache_key(converter, method, endpoint, url, request_kwargs)
+        content = self.cache.get(cache_key) if cache_key else None
+        if content is not None:
+            return self._parse_content(converter, method, endpoint, params, content)
+
+        # Send (or wait for the same request in flight)
+        coalescing_key = self._get_coalescing_key(converter, method, endpoint, url, request_kwargs)
+        if coalescing_key:
+            return self.coalescer.call(coalescing_key, self._send_request, converter, method, endpoint, params,
+                                       url, request_kwargs, cache_key)
+        return self._send_request(converter, method, endpoint, params, url, request_kwargs, cache_key)
+
+    def _send_request(self, converter, method, endpoint, params, url, request_kwargs, cache_key=None):
+        self._wait_for_rate_limit(converter, endpoint)
+        self.logger.info("Send: %s %s %s", method, url, request_kwargs.get("params", request_kwargs.get("data")))
+        response = self.session.request(method, url, **request_kwargs)
+
+        # Parse
+        result = self._parse_response(converter, method, endpoint, params, response)
+        if cache_key and response.ok:
+            self._put_to_cache(cache_key, converter, endpoint, params, response.content, result)
+        return result
+
+    def _prepare_request(self, method, endpoint, params=None, version=None, **kwargs):
+        # Returns (converter, params, url, request_kwargs) or None
+        # (Common for sync and async clients, so they use the same converters)
+        converter = self.get_or_create_converter(version)
         params = dict(**kwargs, **(params or {}))
         params = converter.preprocess_params(endpoint, params)
         url, platform_params = converter.make_url_and_platform_params(endpoint, params, version=version)
@@ -791,31 +1520,210 @@ class BaseRESTClient(BaseClient):
         if not url:
             return None
 
-        # Send
-        kwargs = {"headers": self.headers}
+        request_kwargs = {"headers": self.headers}
         params_name = "params" if method.lower() == "get" else "data"
-        kwargs[params_name] = platform_params
-        self.logger.info("Send: %s %s %s", method, url, platform_params)
-        response = self.session.request(method, url, **kwargs)
+        request_kwargs[params_name] = platform_params
+        return converter, params, url, request_kwargs
 
-        # Parse
+    def _wait_for_rate_limit(self, converter, endpoint):
+        self.rate_limiter.acquire(self._get_request_weight(converter, endpoint))
+
+    def _get_request_weight(self, converter, endpoint):
+        return converter.weight_by_endpoint.get(endpoint, 1) if converter.weight_by_endpoint else 1
+
+    def _parse_response(self, converter, method, endpoint, params, response):
+        # (response - requests.Response or an object with the same ok, status_code, reason,
+        # headers and content attributes)
         self._last_response_for_debugging = response
         if response.ok:
-            result = converter.parse(endpoint, response.json())
-            result = converter.post_process_result(method, endpoint, params, result)
+            result = self._parse_content(converter, method, endpoint, params, response.content)
         else:
             is_json = "json" in response.headers.get("content-type", "")
-            result = converter.parse_error(response.json() if is_json else None, response)
+            result = converter.parse_error(codec.loads(response.content) if is_json else None, response)
         self.logger.info("Response: %s Parsed result: %s %s", response,
                          len(result) if isinstance(result, list) else "",
                          str(result)[:100] + " ... " + str(result)[-100:])
-        self._on_response(response, result)
+        # (Delay is returned, not stored in client, as responses can be handled in many threads at once)
+        delay_before_next_request_sec = self._on_response(response, result)
+        if delay_before_next_request_sec:
+            self.rate_limiter.penalize(delay_before_next_request_sec)
 
         # Return parsed value objects or Error instance
         return result
 
+    def _parse_content(self, converter, method, endpoint, params, content):
+        # (Decode bytes directly, without making str)
+        result = converter.parse(endpoint, codec.loads(content), params)
+        return converter.post_process_result(method, endpoint, params, result)
+
     def _on_response(self, response, result):
-        pass
+        # Returns delay in seconds before next request to platform (e.g. after rate limit errors)
+        return 0
+
+    # Cache
+
+    def _get_cache_key(self, converter, method, endpoint, url, request_kwargs):
+        # Returns None if request shouldn't be cached
+        # (Only public reads)
+        if self.cache is None or method.upper() != "GET" or endpoint in converter.secured_endpoints or \
+                not self.cache.is_cached_endpoint(self._get_cache_endpoint(converter, endpoint)):
+            return None
+        return self._get_request_key(url, request_kwargs)
+
+    def _get_request_key(self, url, request_kwargs):
+        platform_params = request_kwargs.get("params")
+        return url + "?" + urlencode(sorted(platform_params.items())) if platform_params else url
+
+    # Coalescing
+
+    def _get_coalescing_key(self, converter, method, endpoint, url, request_kwargs):
+        # Returns None if request shouldn't be coalesced
+        # (Only public reads: they are idempotent, while secured ones are signed with nonce anyway)
+        if not self.is_coalescing or method.upper() != "GET" or endpoint in converter.secured_endpoints:
+            return None
+        return self._get_request_key(url, request_kwargs)
+
+    def _get_cache_endpoint(self, converter, endpoint):
+        # (Some clients send platform endpoints, so they are converted back to ours)
+        if self.cache.get_ttl(endpoint) or not converter.endpoint_lookup:
+            return endpoint
+        return next((our_endpoint for our_endpoint, platform_endpoint in converter.endpoint_lookup.items()
+                     if platform_endpoint == endpoint), endpoint)
+
+    def _put_to_cache(self, cache_key, converter, endpoint, params, content, result):
+        if isinstance(result, Error):
+            return
+        endpoint = self._get_cache_endpoint(converter, endpoint)
+        # (Closed candles never change)
+        ttl_sec = None if endpoint == Endpoint.CANDLE and \
+            self._is_closed_candles(result, params, converter.use_milliseconds) else self.cache.get_ttl(endpoint)
+        self.cache.put(cache_key, content, ttl_sec)
+
+    def _is_closed_candles(self, candles, params, is_milliseconds=False):
+        # (Only a page with explicit end time in the past never changes: without it the same
+        # request returns newer candles later (e.g. if page is not full))
+        to_time = params.get(ParamName.TO_TIME) if params else None
+        if to_time is None or (to_time / 1000 if is_milliseconds else to_time) > time.time():
+            return False
+        if not candles or not isinstance(candles, (list, ItemBatch)):
+            return False
+        last_candle = candles[-1] if candles[-1].timestamp >= candles[0].timestamp else candles[0]
+        interval = getattr(last_candle, ParamName.INTERVAL, None) or params.get(ParamName.INTERVAL)
+        duration_sec = Interval.duration_sec_by_interval.get(interval)
+        if not duration_sec or last_candle.timestamp is None:
+            return False
+        timestamp_sec = last_candle.timestamp / 1000 if last_candle.is_milliseconds else last_candle.timestamp
+        return timestamp_sec + duration_sec <= time.time()
+
+
+class HistoryPaginator:
+    """
+    Position of paging through history in [from_time, to_time] range.
+
+    Pages are requested starting from the last item of previous page (including),
+    so boundary duplicates are dropped here. Only items with the last timestamp
+    are kept for that, so memory doesn't depend on range length.
+
+    When paging by time, if there are more items with the same timestamp than fit
+    in a page, the next page can't be requested. Error is returned in that case
+    (if page_limit is known) instead of finishing silently.
+
+        paginator = HistoryPaginator(from_time, to_time)
+        while not paginator.is_finished:
+            from_item, from_time = paginator.get_page_params()
+            items = paginator.process_page(fetch_page(from_item, from_time))
+    """
+
+    def __init__(self, from_time=None, to_time=None, from_item=None, is_paging_by_item=True,
+                 item_duration=None, is_to_time_included=True, page_limit=None, is_time_supported=True) -> None:
+        super().__init__()
+        # (Without time params a page can be requested only by item: from_time is then
+        # only a filter of items, and it cannot be the start of paging)
+        if not is_time_supported and from_time is not None and not (is_paging_by_item and from_item is not None):
+            raise Exception("History cannot be requested by time as platform doesn't support time params "
+                            "for the endpoint. Use from_item instead.")
+        self.min_time = from_time
+        self.to_time = to_time
+        # (False - range is [from_time, to_time), e.g. for shards of a bigger range)
+        self.is_to_time_included = is_to_time_included
+        # (Paging by item if platform supports from_item param and items have item_id, otherwise - by time)
+        self.is_paging_by_item = is_paging_by_item
+        # (Interval duration for candles: no next page is requested if the last candle of the range is received)
+        self.item_duration = item_duration
+        # (Max items in a page, to detect that paging by time is stuck)
+        self.page_limit = page_limit
+
+        # State:
+        self.from_time = from_time
+        self.from_item = from_item
+        self.is_finished = False
+        self._last_timestamp = None
+        self._last_timestamp_items = set()
+
+    @property
+    def _is_item_cursor(self):
+        # (Item without item_id (e.g. candle) cannot be used as from_item)
+        return self.is_paging_by_item and self.from_item is not None and \
+            (not isinstance(self.from_item, ItemObject) or self.from_item.item_id is not None)
+
+    def get_page_params(self):
+        # (from_item, from_time) for next page
+        if self._is_item_cursor:
+            return self.from_item, None
+        return None, self.from_time
+
+    def process_page(self, page):
+        # Returns new items of the page in ascending order (or Error as is) and moves to the next page
+        if not page or isinstance(page, Error):
+            self.is_finished = True
+            return page or []
+
+        # (Descending pages are reversed first, and sorting is stable,
+        # so items with same timestamp keep platform's order)
+        if (page[0].timestamp or 0) > (page[-1].timestamp or 0):
+            page = page[::-1]
+        result = []
+        for item in sorted(page, key=lambda item: item.timestamp or 0):
+            timestamp = item.timestamp
+            if timestamp is None or (self.min_time is not None and timestamp < self.min_time):
+                continue
+            if self._last_timestamp is not None and (timestamp < self._last_timestamp or
+                                                     item in self._last_timestamp_items):
+                continue
+            if self._is_after_range(timestamp):
+                self.is_finished = True
+                break
+            if timestamp != self._last_timestamp:
+                self._last_timestamp = timestamp
+                self._last_timestamp_items = set()
+            self._last_timestamp_items.add(item)
+            result.append(item)
+
+        if result:
+            self.from_item = result[-1]
+            self.from_time = result[-1].timestamp
+            if self.item_duration and self._is_after_range(self.from_time + self.item_duration):
+                self.is_finished = True
+        else:
+            # (No new items)
+            self.is_finished = True
+            if self.page_limit and len(page) >= self.page_limit and not self._is_item_cursor and \
+                    not self._is_after_range(page[-1].timestamp or 0):
+                # (Full page of already received items with the same timestamp)
+                return self._create_stuck_error()
+        return result
+
+    def _create_stuck_error(self):
+        error = Error()
+        error.code = ErrorCode.APP_ERROR
+        error.message = "%s (More than %s items with timestamp: %s, so the next page cannot be requested by time)" % (
+            ErrorCode.get_message_by_code(ErrorCode.APP_ERROR), self.page_limit, self.from_time)
+        return error
+
+    def _is_after_range(self, timestamp):
+        if self.to_time is None:
+            return False
+        return timestamp > self.to_time if self.is_to_time_included else timestamp >= self.to_time
 
 
 class PlatformRESTClient(BaseRESTClient):
@@ -826,6 +1734,11 @@ class PlatformRESTClient(BaseRESTClient):
     Закомментированные методы скорее всего не понадобятся, но на всякий случай они добавлены,
     чтобы потом не возвращаться и не думать заново.
     """
+    # Settings:
+    # Max number of concurrent requests in *_for_symbols() methods
+    max_workers = 8
+
+    # State:
     _server_time_diff_s = None
 
     def ping(self, version=None, **kwargs):
@@ -836,19 +1749,23 @@ class PlatformRESTClient(BaseRESTClient):
         endpoint = Endpoint.SERVER_TIME
 
         if not force_from_server and self._server_time_diff_s is not None:
-            # (Calculate using time difference with server taken from previous call)
-            result = self._server_time_diff_s + time.time()
-            return int(result * 1000) if self.use_milliseconds else result
+            return self._get_server_timestamp_by_time_diff()
 
         time_before = time.time()
 
         result = self._send("GET", endpoint, version=version, **kwargs)
-        if isinstance(result, Error):
-            return result
+        self._update_server_time_diff(result, time_before)
+        return result
 
-        # (Update time diff)
+    def _get_server_timestamp_by_time_diff(self):
+        # (Calculate using time difference with server taken from previous call)
+        result = self._server_time_diff_s + time.time()
+        return int(result * 1000) if self.use_milliseconds else result
+
+    def _update_server_time_diff(self, result, time_before):
+        if result is None or isinstance(result, Error):
+            return
         self._server_time_diff_s = (result / 1000 if self.use_milliseconds else result) - time_before
-        return result
 
     def get_symbols(self, version=None, **kwargs):
         endpoint = Endpoint.SYMBOLS
@@ -902,6 +1819,24 @@ class PlatformRESTClient(BaseRESTClient):
                                   sorting, is_use_max_limit, from_time, to_time,
                                   version, **kwargs)
 
+    def iter_trades_history(self, symbol, from_time=None, to_time=None, from_item=None, version=None, **kwargs):
+        # Iterate all trades in [from_time, to_time] in ascending order page by page (requested with max limit).
+        # Yields Error and stops if platform returns it.
+        # (Raises if trades can be requested only by item, but from_time is given without from_item)
+        is_time_supported = self._is_from_time_supported(Endpoint.TRADE_HISTORY, version)
+
+        def fetch_page(from_item, from_time):
+            # (If time params are not supported, to_time is checked only by paginator)
+            return self.fetch_trades_history(symbol, from_item=from_item, sorting=Sorting.ASCENDING,
+                                             is_use_max_limit=True, from_time=from_time,
+                                             to_time=to_time if is_time_supported else None,
+                                             version=version, **kwargs)
+
+        paginator = HistoryPaginator(from_time, to_time, from_item, self._is_from_item_supported(version),
+                                     page_limit=self._get_max_limit(Endpoint.TRADE_HISTORY, version),
+                                     is_time_supported=is_time_supported)
+        return self._iter_pages(fetch_page, paginator)
+
     # Candle
 
     def fetch_candles(self, symbol, interval, limit=None, from_time=None, to_time=None,
@@ -919,6 +1854,49 @@ class PlatformRESTClient(BaseRESTClient):
         result = self._send("GET", endpoint, params, version, **kwargs)
         return result
 
+    def iter_candles(self, symbol, interval, from_time=None, to_time=None, version=None, **kwargs):
+        # Same as iter_trades_history() (candles are always paged by time)
+
+        def fetch_page(from_item, from_time):
+            return self.fetch_candles(symbol, interval, from_time=from_time, to_time=to_time,
+                                      is_use_max_limit=True, version=version, **kwargs)
+
+        item_duration = Interval.duration_sec_by_interval.get(interval)
+        if item_duration and self.use_milliseconds:
+            item_duration *= 1000
+        paginator = HistoryPaginator(from_time, to_time, is_paging_by_item=False, item_duration=item_duration,
+                                     page_limit=self._get_max_limit(Endpoint.CANDLE, version))
+        return self._iter_pages(fetch_page, paginator)
+
+    def _is_from_item_supported(self, version=None):
+        param_name_lookup = self.get_or_create_converter(version).param_name_lookup
+        return bool(param_name_lookup and param_name_lookup.get(ParamName.FROM_ITEM))
+
+    def _get_max_limit(self, endpoint, version=None):
+        max_limit_by_endpoint = self.get_or_create_converter(version).max_limit_by_endpoint
+        return max_limit_by_endpoint.get(endpoint) if max_limit_by_endpoint else None
+
+    def _is_from_time_supported(self, endpoint, version=None):
+        endpoints_without_time_params = self.get_or_create_converter(version).endpoints_without_time_params
+        return not endpoints_without_time_params or endpoint not in endpoints_without_time_params
+
+    def _iter_pages(self, fetch_page, paginator):
+        # Next page is requested in background while items of current page are consumed
+        # (so not more than 2 pages are in memory at once)
+        executor = ThreadPoolExecutor(1, thread_name_prefix=self.__class__.__name__)
+        try:
+            future = executor.submit(fetch_page, *paginator.get_page_params())
+            while future:
+                items = paginator.process_page(future.result())
+                future = executor.submit(fetch_page, *paginator.get_page_params()) \
+                    if not paginator.is_finished else None
+                if isinstance(items, Error):
+                    yield items
+                    return
+                yield from items
+        finally:
+            executor.shutdown(wait=False)
+
     # Ticker
 
     def fetch_ticker(self, symbol=None, version=None, **kwargs):
@@ -938,12 +1916,13 @@ class PlatformRESTClient(BaseRESTClient):
         # }
 
         result = self._send("GET", endpoint, None, version, **kwargs)
+        return self._filter_by_symbols(result, symbols)
 
-        if symbols:
+    def _filter_by_symbols(self, result, symbols):
+        if symbols and isinstance(result, list):
             # Filter result for symbols defined
-            symbols = [symbol.upper() if symbol else symbol for symbol in symbols]
+            symbols = {symbol.upper() if symbol else symbol for symbol in symbols}
             return [item for item in result if item.symbol in symbols]
-
         return result
 
     # Order Book
@@ -965,6 +1944,65 @@ class PlatformRESTClient(BaseRESTClient):
     #     # Fetch L2/L3 order book (with all orders enlisted) for a particular market trading symbol.
     #     pass
 
+    # Multi-symbol
+    # (Return {symbol: result}, where result is the same as for the single-symbol method or Error)
+
+    def fetch_trades_for_symbols(self, symbols, limit=None, max_workers=None, version=None, **kwargs):
+        return self._fan_out(self.fetch_trades, symbols, max_workers, limit=limit, version=version, **kwargs)
+
+    def fetch_candles_for_symbols(self, symbols, interval, limit=None, from_time=None, to_time=None,
+                                  is_use_max_limit=False, max_workers=None, version=None, **kwargs):
+        return self._fan_out(self.fetch_candles, symbols, max_workers, interval=interval, limit=limit,
+                             from_time=from_time, to_time=to_time, is_use_max_limit=is_use_max_limit,
+                             version=version, **kwargs)
+
+    def fetch_order_books_for_symbols(self, symbols, limit=None, is_use_max_limit=False, max_workers=None,
+                                      version=None, **kwargs):
+        return self._fan_out(self.fetch_order_book, symbols, max_workers, limit=limit,
+                             is_use_max_limit=is_use_max_limit, version=version, **kwargs)
+
+    def _fan_out(self, fun, symbols, max_workers=None, **kwargs):
+        # Call fun(symbol, **kwargs) for each symbol concurrently (not more than max_workers at once)
+        # (Duplicates are requested once)
+        # (All threads send requests with the same self.session: it's the pooled session of HTTPTransport,
+        # which keeps a connection per thread (see HTTPTransport.pool_maxsize). State of each request
+        # (last response, delay after rate limit errors) is not shared between threads)
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        max_workers = min(max_workers or self.max_workers, len(symbols))
+        with ThreadPoolExecutor(max_workers, thread_name_prefix=self.__class__.__name__) as executor:
+            future_by_symbol = {symbol: executor.submit(self._call_for_item, fun, symbol, **kwargs)
+                                for symbol in symbols}
+        return {symbol: future.result() for symbol, future in future_by_symbol.items()}
+
+    def _pipeline(self, fun, items, max_workers=None):
+        # Call fun(item) for each item concurrently and return results in items' order
+        # (Unlike _fan_out(), items are not deduplicated)
+        items = list(items)
+        if not items:
+            return []
+        max_workers = min(max_workers or self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers, thread_name_prefix=self.__class__.__name__) as executor:
+            futures = [executor.submit(self._call_for_item, fun, item) for item in items]
+        return [future.result() for future in futures]
+
+    def _call_for_item(self, fun, item, **kwargs):
+        # (Requests are paced by rate_limiter in _send())
+        try:
+            return fun(item, **kwargs)
+        except Exception as exc:
+            # (One failed symbol or order shouldn't break the others)
+            self.logger.exception("Error while calling %s for: %s", getattr(fun, "__name__", fun), item)
+            return self._create_error_by_exception(exc)
+
+    def _create_error_by_exception(self, exc):
+        error = Error()
+        error.code = ErrorCode.APP_ERROR
+        error.message = "%s (%s: %s)" % (ErrorCode.get_message_by_code(ErrorCode.APP_ERROR),
+                                         exc.__class__.__name__, exc)
+        return error
+
 
 class PrivatePlatformRESTClient(PlatformRESTClient):
 
@@ -1055,6 +2093,66 @@ class PrivatePlatformRESTClient(PlatformRESTClient):
         result = self._send("GET", endpoint, params, version or "3", **kwargs)
         return result
 
+    # Orders (batch)
+    # (Each returns [Order or Error, ...] in the order of given orders)
+
+    def create_orders(self, orders, is_test=False, max_workers=None, version=None, **kwargs):
+        # orders - [Order, ...] with symbol, order_type, direction, price and amount_original set
+        orders = list(orders)
+        result = self._create_orders_batch(orders, is_test, version, **kwargs)
+        if result is not None:
+            return result
+        return self._create_orders_one_by_one(orders, is_test, max_workers, version, **kwargs)
+
+    def cancel_orders(self, orders, symbol=None, max_workers=None, version=None, **kwargs):
+        # orders - [Order or order_id, ...]
+        # (symbol - for order ids, orders have their own symbols)
+        orders = list(orders)
+        result = self._cancel_orders_batch(orders, symbol, version, **kwargs)
+        if result is not None:
+            return result
+        return self._cancel_orders_one_by_one(orders, symbol, max_workers, version, **kwargs)
+
+    def cancel_all(self, symbol=None, max_workers=None, version=None, **kwargs):
+        # Cancel all open orders (of symbol or of all symbols)
+        # Returns [Order or Error, ...] or Error if open orders cannot be fetched
+        orders = self.fetch_orders(symbol, is_open=True, version=version, **kwargs)
+        if isinstance(orders, Error):
+            return orders
+        return self.cancel_orders(orders or [], symbol, max_workers, version, **kwargs)
+
+    def check_orders(self, orders, symbol=None, max_workers=None, version=None, **kwargs):
+        # orders - [Order or order_id, ...]
+        return self._pipeline(
+            lambda order: self.check_order(*self._get_order_id_and_symbol(order, symbol), version, **kwargs),
+            orders, max_workers)
+
+    def _create_orders_batch(self, orders, is_test=False, version=None, **kwargs):
+        # Override for platforms with batch endpoint to send all orders in one request
+        # (Returns [Order or Error, ...] for orders, or Error for all of them.
+        # None - not supported, so orders are sent one by one concurrently)
+        return None
+
+    def _cancel_orders_batch(self, orders, symbol=None, version=None, **kwargs):
+        # (Same as _create_orders_batch())
+        return None
+
+    def _create_orders_one_by_one(self, orders, is_test=False, max_workers=None, version=None, **kwargs):
+        return self._pipeline(
+            lambda order: self.create_order(order.symbol, order.order_type, order.direction, order.price,
+                                            order.amount_original, is_test, version, **kwargs),
+            orders, max_workers)
+
+    def _cancel_orders_one_by_one(self, orders, symbol=None, max_workers=None, version=None, **kwargs):
+        return self._pipeline(
+            lambda order: self.cancel_order(*self._get_order_id_and_symbol(order, symbol), version, **kwargs),
+            orders, max_workers)
+
+    def _get_order_id_and_symbol(self, order, symbol=None):
+        if isinstance(order, Order):
+            return order.item_id, order.symbol or symbol
+        return order, symbol
+
 
 # WebSocket
 
@@ -1113,7 +2211,7 @@ class WSConverter(ProtocolConverter):
         channel = self._get_platform_endpoint(endpoint, {ParamName.SYMBOL: symbol, **params})
         return channel
 
-    def parse(self, endpoint, data):
+    def parse(self, endpoint, data, context=None):
         # (Get endpoint from event type)
         if not endpoint and data and isinstance(data, dict) and self.event_type_param:
             event_type = data.get(self.event_type_param, endpoint)
@@ -1123,7 +2221,7 @@ class WSConverter(ProtocolConverter):
             #     self.logger.error("Cannot find event type by name: %s in data: %s", self.event_type_param, data)
             # self.logger.debug("Endpoint: %s by name: %s in data: %s", endpoint, self.event_type_param, data)
 
-        return super().parse(endpoint, data)
+        return super().parse(endpoint, data, context)
 
 
 class WSClient(BaseClient):
@@ -1144,6 +2242,21 @@ class WSClient(BaseClient):
     is_auto_reconnect = True
     reconnect_delay_sec = 3
     reconnect_count = 3
+    # Max subscriptions in one subscribe or unsubscribe command (None - all in one command)
+    max_subscriptions_per_command = None
+    # (None - commands are not throttled)
+    commands_per_sec = None
+    # Max subscriptions (sum of their weights, see _get_subscription_weight()) per connection.
+    # Subscriptions over it are sent to additional connections (shards) and their items
+    # are passed to the same callbacks (None - all subscriptions in one connection)
+    max_subscriptions_per_connection = None
+    # Items are handled (on_data_item and on_data are called) in dispatch_worker_count threads
+    # instead of the socket thread, so slow callbacks don't stall the connection. Items of a symbol
+    # are always handled by the same thread in order (None - callbacks are called in socket thread)
+    dispatch_worker_count = None
+    # (Max queued items per worker and what to do when it's exceeded, see OverflowPolicy)
+    dispatch_queue_size = 10000
+    dispatch_overflow_policy = OverflowPolicy.BLOCK
 
     on_connect = None
     on_data = None
@@ -1161,6 +2274,13 @@ class WSClient(BaseClient):
     failed_subscriptions = None
     is_subscribed_with_url = False
 
+    # (Throttles commands with commands_per_sec)
+    command_rate_limiter = None
+    # (Throttled commands are sent by a sender thread, which exits when the queue is empty)
+    _command_queue = None
+    _command_thread = None
+    _command_lock = None
+
     # Connection
     is_started = False
     _is_reconnecting = True
@@ -1168,6 +2288,16 @@ class WSClient(BaseClient):
     ws = None
     thread = None
     _data_buffer = None
+    # Sharding
+    # (Clients of the same class, each with its own connection and part of current_subscriptions)
+    shards = None
+    _shard_by_subscription = None
+    # (Shards call callbacks from their socket threads, so calls are serialized with the lock
+    # as if there was one connection)
+    _shard_lock = None
+    # Dispatching
+    # (Created if dispatch_worker_count is set. See its get_metrics() for queue size and lag)
+    dispatcher = None
 
     @property
     def url(self):
@@ -1179,6 +2309,8 @@ class WSClient(BaseClient):
 
     @property
     def is_connected(self):
+        if self.shards:
+            return all(shard.is_connected for shard in self.shards)
         return self.ws.sock.connected if self.ws and self.ws.sock else False
 
     def __init__(self, api_key=None, api_secret=None, version=None, **kwargs) -> None:
@@ -1188,6 +2320,16 @@ class WSClient(BaseClient):
 
         # (For convenience)
         self.IS_SUBSCRIPTION_COMMAND_SUPPORTED = self.converter.IS_SUBSCRIPTION_COMMAND_SUPPORTED
+        self.command_rate_limiter = RateLimiter(self.commands_per_sec,
+                                                name=Platform.get_platform_name_by_id(self.platform_id))
+        self._command_queue = deque()
+        self._command_lock = Lock()
+        if self.dispatch_worker_count:
+            self.dispatcher = Dispatcher(self._handle_items, self.dispatch_worker_count, self.dispatch_queue_size,
+                                         self.dispatch_overflow_policy,
+                                         partition_key_fun=self._get_partition_key,
+                                         conflation_key_fun=self._get_conflation_key,
+                                         name=Platform.get_platform_name_by_id(self.platform_id))
 
     # Subscription
 
@@ -1271,20 +2413,31 @@ class WSClient(BaseClient):
 
             subscriptions = self.converter.generate_subscriptions(endpoints, symbols, **params)
 
-            self.current_subscriptions = self.current_subscriptions.difference(subscriptions)
-            self.failed_subscriptions = self.failed_subscriptions.difference(subscriptions)
-            self.pending_subscriptions = self.pending_subscriptions.difference(subscriptions)
-            self.successful_subscriptions = self.successful_subscriptions.difference(subscriptions)
+            self.current_subscriptions = (self.current_subscriptions or set()).difference(subscriptions)
+            self.failed_subscriptions = (self.failed_subscriptions or set()).difference(subscriptions)
+            self.pending_subscriptions = (self.pending_subscriptions or set()).difference(subscriptions)
+            self.successful_subscriptions = (self.successful_subscriptions or set()).difference(subscriptions)
 
         self._unsubscribe(subscriptions.intersection(subscribed))
 
     def resubscribe(self):
         self.logger.debug("Resubscribe all current subscriptions")
-        # Unsubscribe & subscribe all
-        if self.IS_SUBSCRIPTION_COMMAND_SUPPORTED:
-            # Send unsubscribe all and subscribe all back again not interrupting a connection
-            self.unsubscribe()
-            self.subscribe()
+        if self.shards:
+            for shard in self.shards:
+                shard.resubscribe()
+        elif self.IS_SUBSCRIPTION_COMMAND_SUPPORTED:
+            # Send only the difference between current and subscribed (pending or confirmed) subscriptions
+            # not interrupting a connection (channels which are subscribed already have no gap)
+            subscribed = self._get_subscribed()
+            current_subscriptions = self.current_subscriptions or set()
+            if subscribed - current_subscriptions:
+                self.pending_subscriptions = (self.pending_subscriptions or set()).intersection(current_subscriptions)
+                self.successful_subscriptions = (self.successful_subscriptions or set()).intersection(
+                    current_subscriptions)
+                self._unsubscribe(subscribed - current_subscriptions)
+            if current_subscriptions - subscribed:
+                # (Failed ones are retried)
+                self._subscribe(current_subscriptions - subscribed)
         else:
             # Platforms which subscribe in WS URL need reconnection
             self.reconnect()
@@ -1293,29 +2446,205 @@ class WSClient(BaseClient):
         # Call subscribe command with "subscriptions" param or reconnect with
         # "self.current_subscriptions" in URL - depending on platform
         self.logger.debug(" Subscribe to subscriptions: %s", subscriptions)
-        if not self.is_started or not self.IS_SUBSCRIPTION_COMMAND_SUPPORTED:
+        if self.max_subscriptions_per_connection:
+            self._update_shards()
+        elif not self.is_started or not self.IS_SUBSCRIPTION_COMMAND_SUPPORTED:
             # Connect on first subscribe() or reconnect on the further ones
             self.reconnect()
         else:
-            self._send_subscribe(subscriptions)
+            # (Only not subscribed yet)
+            subscriptions = subscriptions - self._get_subscribed()
+            if subscriptions:
+                self.pending_subscriptions = (self.pending_subscriptions or set()).union(subscriptions)
+                self._send_subscribe(subscriptions)
 
     def _unsubscribe(self, subscriptions):
         # Call unsubscribe command with "subscriptions" param or reconnect with
         # "self.current_subscriptions" in URL - depending on platform
         self.logger.debug(" Subscribe from subscriptions: %s", subscriptions)
-        if not self.is_started or not self.IS_SUBSCRIPTION_COMMAND_SUPPORTED:
+        if self.max_subscriptions_per_connection:
+            self._update_shards()
+        elif not self.is_started or not self.IS_SUBSCRIPTION_COMMAND_SUPPORTED:
             self.reconnect()
         else:
             self._send_unsubscribe(subscriptions)
 
     def _send_subscribe(self, subscriptions):
         # Implement in subclass
+        # (Use _send_in_batches() if platform accepts many subscriptions in one command)
         pass
 
     def _send_unsubscribe(self, subscriptions):
         # Implement in subclass
         pass
 
+    def _send_in_batches(self, make_command, subscriptions):
+        # Send make_command(batch) for each max_subscriptions_per_command subscriptions
+        subscriptions = sorted(subscriptions)
+        batch_size = self.max_subscriptions_per_command or len(subscriptions) or 1
+        for index in range(0, len(subscriptions), batch_size):
+            self._send_command(make_command(subscriptions[index:index + batch_size]))
+
+    def _send_command(self, data):
+        # (Throttled, so that many subscription changes at once don't flood the socket.
+        # Queued to sender thread, so that the caller (e.g. socket thread in _on_open()) is not blocked)
+        if not self.command_rate_limiter.rate_per_sec:
+            self._send(data)
+            return
+        with self._command_lock:
+            self._command_queue.append(data)
+            if not self._command_thread:
+                self._command_thread = Thread(target=self._send_queued_commands,
+                                              name="%s-commands" % self.__class__.__name__)
+                self._command_thread.daemon = True
+                self._command_thread.start()
+
+    def _send_queued_commands(self):
+        while True:
+            with self._command_lock:
+                if not self._command_queue:
+                    self._command_thread = None
+                    return
+                data = self._command_queue.popleft()
+            self.command_rate_limiter.acquire()
+            try:
+                self._send(data)
+            except Exception:
+                self.logger.exception("Error while sending command: %s", data)
+
+    def _get_subscribed(self):
+        # Subscriptions sent to platform (and not failed)
+        return (self.pending_subscriptions or set()).union(self.successful_subscriptions or set())
+
+    def _on_channel(self, channel):
+        # Update subscription sets by confirmation from platform
+        subscription = channel.channel
+        if not subscription:
+            self.logger.warning("Confirmation without channel: %s", channel.error)
+            return
+        if self.pending_subscriptions:
+            self.pending_subscriptions.discard(subscription)
+        if channel.error:
+            self.logger.warning("Subscription failed: %s error: %s", subscription, channel.error)
+            self.failed_subscriptions = (self.failed_subscriptions or set()).union([subscription])
+        elif channel.is_subscribed:
+            self.successful_subscriptions = (self.successful_subscriptions or set()).union([subscription])
+            if self.failed_subscriptions:
+                self.failed_subscriptions.discard(subscription)
+
+    # Sharding
+
+    def _update_shards(self):
+        # Assign current subscriptions to shards: new ones - to the least loaded shards,
+        # removed ones - from their shards, and close shards which are not needed anymore
+        if self.shards is None:
+            self.shards = []
+            self._shard_by_subscription = {}
+        if not self._shard_lock:
+            self._shard_lock = RLock()
+        current_subscriptions = self.current_subscriptions or set()
+        # (Shards put their items to this client's dispatcher, and this client isn't connected by itself)
+        if self.dispatcher and current_subscriptions:
+            self.dispatcher.start()
+        added_by_shard = {}
+        removed_by_shard = {}
+
+        for subscription in list(self._shard_by_subscription):
+            if subscription not in current_subscriptions:
+                shard = self._shard_by_subscription.pop(subscription)
+                removed_by_shard.setdefault(shard, set()).add(subscription)
+        for subscription in sorted(current_subscriptions.difference(self._shard_by_subscription)):
+            shard = self._get_shard_for(subscription) or self._create_shard()
+            self._shard_by_subscription[subscription] = shard
+            added_by_shard.setdefault(shard, set()).add(subscription)
+        self._drain_least_loaded_shard(added_by_shard, removed_by_shard)
+
+        # Apply changes
+        # (New subscriptions first, so moved ones have no gap)
+        for shard, subscriptions in added_by_shard.items():
+            shard.current_subscriptions = self._get_shard_subscriptions(shard)
+            if subscriptions:
+                shard._subscribe(subscriptions)
+        for shard, subscriptions in removed_by_shard.items():
+            shard.current_subscriptions = self._get_shard_subscriptions(shard)
+            if subscriptions and shard.current_subscriptions:
+                shard._unsubscribe(subscriptions)
+        for shard in [shard for shard in self.shards if not self._get_shard_subscriptions(shard)]:
+            self.shards.remove(shard)
+            shard.close()
+        self.logger.debug("Shards: %s subscriptions: %s", len(self.shards), len(self._shard_by_subscription))
+
+    def _drain_least_loaded_shard(self, added_by_shard, removed_by_shard):
+        # Rebalance after removing: move subscriptions of the least loaded shard to others if they fit
+        if len(self.shards) < 2:
+            return
+        loads = {shard: self._get_load(self._get_shard_subscriptions(shard)) for shard in self.shards}
+        least_loaded_shard = min(self.shards, key=loads.get)
+        room = sum(self.max_subscriptions_per_connection - load
+                   for shard, load in loads.items() if shard is not least_loaded_shard)
+        if loads[least_loaded_shard] > room:
+            return
+
+        for subscription in sorted(self._get_shard_subscriptions(least_loaded_shard)):
+            shard = self._get_shard_for(subscription, least_loaded_shard)
+            if not shard:
+                # (Doesn't fit because of weights)
+                break
+            self._shard_by_subscription[subscription] = shard
+            added_by_shard.setdefault(shard, set()).add(subscription)
+            if subscription in added_by_shard.get(least_loaded_shard, ()):
+                added_by_shard[least_loaded_shard].remove(subscription)
+            else:
+                removed_by_shard.setdefault(least_loaded_shard, set()).add(subscription)
+
+    def _get_shard_for(self, subscription, except_shard=None):
+        # The least loaded shard with room for subscription or None
+        weight = self._get_subscription_weight(subscription)
+        loads = [(self._get_load(self._get_shard_subscriptions(shard)), index)
+                 for index, shard in enumerate(self.shards) if shard is not except_shard]
+        load, index = min(loads, default=(None, None))
+        return self.shards[index] if index is not None and \
+            load + weight <= self.max_subscriptions_per_connection else None
+
+    def _get_shard_subscriptions(self, shard):
+        return {subscription for subscription, subscription_shard in self._shard_by_subscription.items()
+                if subscription_shard is shard}
+
+    def _get_load(self, subscriptions):
+        return sum(self._get_subscription_weight(subscription) for subscription in subscriptions)
+
+    def _get_subscription_weight(self, subscription):
+        # Override to size shards by expected message rate (e.g. order book channels are heavier than trades)
+        return 1
+
+    def _create_shard(self):
+        shard = self.__class__(self._api_key, self._api_secret, self.version, max_subscriptions_per_connection=None,
+                               dispatch_worker_count=None)
+        # (With all its settings (is_columnar, etc.), but not shared, as converter
+        # is not thread-safe and each shard parses in its own thread)
+        shard.converter = self.converter.copy()
+        # (One stream of items for all shards)
+        shard.on_connect = lambda: self._call_from_shard(self.on_connect)
+        # (With dispatcher, on_data is called by its workers)
+        shard.on_data = lambda items: self._call_from_shard(self.on_data, items) if not self.dispatcher else None
+        shard.on_data_item = self._on_shard_item_received
+        shard.on_disconnect = lambda: self._call_from_shard(self.on_disconnect)
+        self.shards.append(shard)
+        return shard
+
+    def _call_from_shard(self, callback, *args):
+        if callback:
+            with self._shard_lock:
+                callback(*args)
+
+    def _on_shard_item_received(self, item):
+        # (Dispatcher is thread-safe by itself)
+        if self.dispatcher:
+            self.on_item_received(item)
+            return
+        with self._shard_lock:
+            self.on_item_received(item)
+
     # Connection
 
     def connect(self, version=None):
@@ -1324,6 +2653,11 @@ class WSClient(BaseClient):
             self.logger.warning("Please subscribe before connect.")
             return
 
+        # (Each shard connects by itself)
+        if self.max_subscriptions_per_connection:
+            self._update_shards()
+            return
+
         # Do nothing if was called before
         if self.ws and self.is_started:
             self.logger.warning("WebSocket is already started.")
@@ -1353,18 +2687,31 @@ class WSClient(BaseClient):
         self.connect()
 
     def close(self):
-        if not self.is_started:
-            # Nothing to close
-            return
-
-        self.logger.debug("Close WebSocket")
-        # (If called directly or from _on_close())
-        self.is_started = False
-        if self.is_connected:
-            # (If called directly)
-            self.ws.close()
-
-        super().close()
+        if self.shards:
+            for shard in self.shards:
+                shard.close()
+            self.shards = None
+            self._shard_by_subscription = None
+
+        # (Commands are for this connection, current subscriptions are sent again on reconnect)
+        if self._command_queue:
+            with self._command_lock:
+                self._command_queue.clear()
+
+        if self.is_started:
+            self.logger.debug("Close WebSocket")
+            # (If called directly or from _on_close())
+            self.is_started = False
+            if self.is_connected:
+                # (If called directly)
+                self.ws.close()
+
+            super().close()
+
+        # (After sockets are closed, as items put after stop() are dropped.
+        # Queued items are handled before workers exit)
+        if self.dispatcher:
+            self.dispatcher.stop()
 
     def _on_open(self):
         self.logger.debug("On open. %s", "Connected." if self.is_connected else "NOT CONNECTED. It's impossible!")
@@ -1373,19 +2720,27 @@ class WSClient(BaseClient):
         self._is_reconnecting = False
         self._reconnect_tries = 0
 
+        # (Before any item is received)
+        if self.dispatcher:
+            self.dispatcher.start()
+
         if self.on_connect:
             self.on_connect()
 
         # Subscribe by command on connect
-        if self.IS_SUBSCRIPTION_COMMAND_SUPPORTED and not self.is_subscribed_with_url:
-            self.subscribe()
+        # (Exactly current subscriptions, as shards have only a part of subscribe() params' ones)
+        self.successful_subscriptions = set()
+        self.failed_subscriptions = set()
+        if self.IS_SUBSCRIPTION_COMMAND_SUPPORTED and not self.is_subscribed_with_url and self.current_subscriptions:
+            self.pending_subscriptions = set(self.current_subscriptions)
+            self._send_subscribe(self.current_subscriptions)
 
     def _on_message(self, message):
         self.logger.debug("On message: %s", message[:200])
-        # str -> json
+        # str or bytes -> json
         try:
-            data = json.loads(message)
-        except json.JSONDecodeError:
+            data = codec.loads(message)
+        except ValueError:
             self.logger.error("Wrong JSON is received! Skipped. message: %s", message)
             return
 
@@ -1410,10 +2765,39 @@ class WSClient(BaseClient):
         return self.converter.parse(endpoint, data)
 
     def on_item_received(self, item):
+        if isinstance(item, Channel):
+            self._on_channel(item)
         # To skip empty and unparsed data
         if self.on_data_item and isinstance(item, DataObject):
+            if self.dispatcher:
+                self.dispatcher.put(item)
+                return
             self.on_data_item(item)
-            self._data_buffer.append(item)
+            # (None for items from shards)
+            if self._data_buffer is not None:
+                self._data_buffer.append(item)
+
+    # Dispatching
+
+    def _handle_items(self, items):
+        # (Called in dispatcher's worker with all items queued for it since previous call)
+        if self.on_data_item:
+            for item in items:
+                self.on_data_item(item)
+        if self.on_data:
+            self.on_data(items)
+
+    def _get_partition_key(self, item):
+        return getattr(item, "symbol", None)
+
+    def _get_conflation_key(self, item):
+        # Items which are replaced by newer ones with the same key for OverflowPolicy.CONFLATE
+        # (Not trades and not order books, which can be diffs)
+        if isinstance(item, Ticker):
+            return Ticker, item.symbol
+        if isinstance(item, Candle):
+            return Candle, item.symbol, item.interval, item.timestamp
+        return None
 
     def _on_error(self, error_exc):
         self.logger.exception("On error exception from websockets: %s", error_exc)
@@ -1441,7 +2825,7 @@ class WSClient(BaseClient):
         if not data:
             return
 
-        message = json.dumps(data)
+        message = codec.dumps(data)
         self.logger.debug("Send message: %s", message)
         self.ws.send(message)
 
@@ -0,0 +1,457 @@
+import asyncio
+import inspect
+import time
+
+import aiohttp
+
+from hyperquant import codec
+from hyperquant.api import Endpoint
+from hyperquant.clients import PlatformRESTClient, PrivatePlatformRESTClient, Error, WSClient, DataObject
+
+"""
+Asyncio clients: REST and WebSocket.
+
+All the converting logic is the same as in sync clients: requests are prepared and
+responses are parsed by the same RESTConverter methods. Only sending is replaced, so
+any platform client can be made async by adding AsyncRESTClientMixin before it:
+
+    class AsyncOkexRESTClient(AsyncRESTClientMixin, OkexRESTClient):
+        pass
+
+    async with AsyncOkexRESTClient() as client:
+        trades_list = await asyncio.gather(*[client.fetch_trades(symbol) for symbol in symbols])
+        async for candle in client.iter_candles(symbol, Interval.MIN_1, from_time, to_time):
+            ...
+
+(All public fetch_*() and order methods become coroutines, as _send() is a coroutine function.)
+
+WebSocket clients are made async in the same way with AsyncWSClientMixin. Instead of
+a thread per connection, each client runs its connection as a task, so connections
+of all clients (of all platforms) are multiplexed on one event loop:
+
+    class AsyncOkexWSClient(AsyncWSClientMixin, OkexWSClient):
+        pass
+
+    async with AsyncOkexWSClient() as client:
+        client.subscribe([Endpoint.TRADE], ["eth_btc", "ltc_btc"])
+        async for trade in client.iter_items():
+            ...
+
+(subscribe(), unsubscribe() and callbacks (on_data_item, etc.) are the same as in
+WSClient, but they should be called in the event loop.)
+"""
+
+
+class AsyncResponse:
+    """
+    Read aiohttp response with the attributes of requests.Response
+    used in parsing (so that converters work with both of them).
+    """
+
+    def __init__(self, url, status_code, reason, headers, content) -> None:
+        super().__init__()
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def __repr__(self) -> str:
+        return "<AsyncResponse [%s]>" % self.status_code
+
+
+class AsyncRESTClientMixin:
+    # Settings:
+    # (None - aiohttp's default)
+    timeout_sec = None
+
+    # State:
+    # (aiohttp.ClientSession is created on first request as it needs running event loop)
+    session = None
+
+    def _create_session(self):
+        return None
+
+    def _get_or_create_session(self):
+        if not self.session or self.session.closed:
+            timeout = aiohttp.ClientTimeout(total=self.timeout_sec) if self.timeout_sec else None
+            self.session = aiohttp.ClientSession(timeout=timeout) if timeout else aiohttp.ClientSession()
+        return self.session
+
+    async def _send(self, method, endpoint, params=None, version=None, **kwargs):
+        # Prepare
+        request = self._prepare_request(method, endpoint, params, version, **kwargs)
+        if not request:
+            return None
+        converter, params, url, request_kwargs = request
+        for name in ("params", "data"):
+            if request_kwargs.get(name):
+                request_kwargs[name] = self._prepare_platform_params(request_kwargs[name])
+
+        # Get from cache
+        cache_key = self._get_cache_key(converter, method, endpoint, url, request_kwargs)
+        content = self.cache.get(cache_key) if cache_key else None
+        if content is not None:
+            return self._parse_content(converter, method, endpoint, params, content)
+
+        # Send (or wait for the same request in flight)
+        coalescing_key = self._get_coalescing_key(converter, method, endpoint, url, request_kwargs)
+        if coalescing_key:
+            return await self.coalescer.call_async(coalescing_key, self._send_request, converter, method,
+                                                   endpoint, params, url, request_kwargs, cache_key)
+        return await self._send_request(converter, method, endpoint, params, url, request_kwargs, cache_key)
+
+    async def _send_request(self, converter, method, endpoint, params, url, request_kwargs, cache_key=None):
+        await self.rate_limiter.acquire_async(self._get_request_weight(converter, endpoint))
+        self.logger.info("Send: %s %s %s", method, url, request_kwargs.get("params", request_kwargs.get("data")))
+        session = self._get_or_create_session()
+        async with session.request(method, url, **request_kwargs) as response:
+            content = await response.read()
+            response = AsyncResponse(str(response.url), response.status, response.reason, response.headers, content)
+
+        # Parse
+        result = self._parse_response(converter, method, endpoint, params, response)
+        if cache_key and response.ok:
+            self._put_to_cache(cache_key, converter, endpoint, params, response.content, result)
+        return result
+
+    def _prepare_platform_params(self, platform_params):
+        # (aiohttp accepts only str, int and float values, while requests converts any value with str())
+        return {key: value if isinstance(value, (str, int, float)) and not isinstance(value, bool) else str(value)
+                for key, value in platform_params.items()}
+
+    # Methods which process results of _send()
+
+    async def get_server_timestamp(self, force_from_server=False, version=None, **kwargs):
+        if not force_from_server and self._server_time_diff_s is not None:
+            return self._get_server_timestamp_by_time_diff()
+
+        time_before = time.time()
+
+        result = await self._send("GET", Endpoint.SERVER_TIME, version=version, **kwargs)
+        self._update_server_time_diff(result, time_before)
+        return result
+
+    async def fetch_tickers(self, symbols=None, version=None, **kwargs):
+        result = await self._send("GET", Endpoint.TICKER, None, version, **kwargs)
+        return self._filter_by_symbols(result, symbols)
+
+    async def _iter_pages(self, fetch_page, paginator):
+        # (Same as sync, but with a task instead of a thread for prefetching,
+        # so iter_trades_history() and iter_candles() return async iterators)
+        task = asyncio.ensure_future(fetch_page(*paginator.get_page_params()))
+        try:
+            while task:
+                items = paginator.process_page(await task)
+                task = asyncio.ensure_future(fetch_page(*paginator.get_page_params())) \
+                    if not paginator.is_finished else None
+                if isinstance(items, Error):
+                    yield items
+                    return
+                for item in items:
+                    yield item
+        finally:
+            if task and not task.done():
+                task.cancel()
+
+    async def _fan_out(self, fun, symbols, max_workers=None, **kwargs):
+        # (Same as sync, but with tasks instead of threads)
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        semaphore = asyncio.Semaphore(min(max_workers or self.max_workers, len(symbols)))
+
+        async def call_for_symbol(symbol):
+            async with semaphore:
+                return await self._call_for_item(fun, symbol, **kwargs)
+
+        results = await asyncio.gather(*[call_for_symbol(symbol) for symbol in symbols])
+        return dict(zip(symbols, results))
+
+    async def _pipeline(self, fun, items, max_workers=None):
+        # (Same as sync, but with tasks instead of threads)
+        items = list(items)
+        if not items:
+            return []
+        semaphore = asyncio.Semaphore(min(max_workers or self.max_workers, len(items)))
+
+        async def call_for_item(item):
+            async with semaphore:
+                return await self._call_for_item(fun, item)
+
+        return await asyncio.gather(*[call_for_item(item) for item in items])
+
+    async def _call_for_item(self, fun, item, **kwargs):
+        try:
+            return await fun(item, **kwargs)
+        except Exception as exc:
+            self.logger.exception("Error while calling %s for: %s", getattr(fun, "__name__", fun), item)
+            return self._create_error_by_exception(exc)
+
+    # Orders (batch, for private clients)
+    # (Batch hooks of platform clients send with _send(), so they return coroutines here)
+
+    async def create_orders(self, orders, is_test=False, max_workers=None, version=None, **kwargs):
+        orders = list(orders)
+        result = await _await_if_needed(self._create_orders_batch(orders, is_test, version, **kwargs))
+        if result is not None:
+            return result
+        return await self._create_orders_one_by_one(orders, is_test, max_workers, version, **kwargs)
+
+    async def cancel_orders(self, orders, symbol=None, max_workers=None, version=None, **kwargs):
+        orders = list(orders)
+        result = await _await_if_needed(self._cancel_orders_batch(orders, symbol, version, **kwargs))
+        if result is not None:
+            return result
+        return await self._cancel_orders_one_by_one(orders, symbol, max_workers, version, **kwargs)
+
+    async def cancel_all(self, symbol=None, max_workers=None, version=None, **kwargs):
+        orders = await self.fetch_orders(symbol, is_open=True, version=version, **kwargs)
+        if isinstance(orders, Error):
+            return orders
+        return await self.cancel_orders(orders or [], symbol, max_workers, version, **kwargs)
+
+    # Close
+
+    def close(self):
+        # (Session can be closed only in event loop, use aclose() or "async with" if possible)
+        if self.session and not self.session.closed:
+            try:
+                asyncio.get_running_loop().create_task(self.session.close())
+            except RuntimeError:
+                self.logger.warning("Session is not closed as there is no running event loop. Use aclose().")
+
+    async def aclose(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+class AsyncPlatformRESTClient(AsyncRESTClientMixin, PlatformRESTClient):
+    pass
+
+
+class AsyncPrivatePlatformRESTClient(AsyncRESTClientMixin, PrivatePlatformRESTClient):
+    pass
+
+
+# WebSocket
+
+class AsyncWSConnection:
+    """
+    aiohttp WebSocket with send() and close() of websocket.WebSocketApp
+    (used by WSClient and platform clients for commands). Messages are sent
+    in order by write_forever() task, so send() doesn't block.
+    """
+
+    def __init__(self, ws) -> None:
+        super().__init__()
+        self.ws = ws
+        self._send_queue = asyncio.Queue()
+
+    @property
+    def connected(self):
+        return not self.ws.closed
+
+    def send(self, data, rate_limiter=None):
+        # (rate_limiter - to throttle sending of the message)
+        self._send_queue.put_nowait((data, rate_limiter))
+
+    def close(self):
+        asyncio.ensure_future(self.ws.close())
+
+    async def write_forever(self):
+        while True:
+            data, rate_limiter = await self._send_queue.get()
+            if rate_limiter:
+                await rate_limiter.acquire_async()
+            if isinstance(data, bytes):
+                await self.ws.send_bytes(data)
+            else:
+                await self.ws.send_str(data)
+
+
+class AsyncWSClientMixin:
+    # Settings:
+    # (Ping interval, None - no pings)
+    heartbeat_sec = 30
+    # Max items buffered for each iter_items() consumer (the oldest are dropped for slow ones, 0 - no limit)
+    items_queue_size = 10000
+
+    # State:
+    # (aiohttp.ClientSession is created on connect as it needs running event loop)
+    session = None
+    _task = None
+    _items_queues = None
+    dropped_items_count = 0
+
+    @property
+    def is_connected(self):
+        return self.ws.connected if self.ws else False
+
+    def connect(self, version=None):
+        # Check ready
+        if not self.current_subscriptions:
+            self.logger.warning("Please subscribe before connect.")
+            return
+
+        # (Each shard connects by itself)
+        if self.max_subscriptions_per_connection:
+            self._update_shards()
+            return
+
+        # Do nothing if was called before
+        if self.is_started and self._task and not self._task.done():
+            self.logger.warning("WebSocket is already started.")
+            return
+
+        # Connect
+        # (Raises RuntimeError if called not in event loop)
+        loop = asyncio.get_running_loop()
+        self.logger.debug("Start WebSocket with url: %s" % self.url)
+        self.is_started = True
+        self._task = loop.create_task(self._run())
+
+    def close(self):
+        task = self._task
+        super().close()
+        # (Task finishes by itself if close() is called from it, e.g. on reconnect)
+        if task and not task.done() and task is not _get_current_task():
+            task.cancel()
+
+    async def aclose(self):
+        if self.shards:
+            await asyncio.gather(*[shard.aclose() for shard in self.shards])
+        task = self._task
+        self.close()
+        if task and task is not _get_current_task():
+            await asyncio.gather(task, return_exceptions=True)
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self._close_items_queues()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    def _get_or_create_session(self):
+        if not self.session or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def _run(self):
+        # Connect, receive messages and reconnect until closed
+        # (After reconnect() a new task is started, and this one finishes)
+        while self.is_started and self._task is _get_current_task():
+            writer = None
+            try:
+                session = self._get_or_create_session()
+                async with session.ws_connect(self.url, headers=self._get_ws_headers(),
+                                              heartbeat=self.heartbeat_sec) as ws:
+                    self.ws = AsyncWSConnection(ws)
+                    writer = asyncio.ensure_future(self.ws.write_forever())
+                    self._on_open()
+                    async for message in ws:
+                        if message.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                            self._on_message(message.data)
+                        elif message.type == aiohttp.WSMsgType.ERROR:
+                            self._on_error(ws.exception())
+            except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as exc:
+                self._on_error(exc)
+            finally:
+                if writer:
+                    writer.cancel()
+
+            self.logger.info("On WebSocket close")
+            if self.on_disconnect:
+                self.on_disconnect()
+
+            # Reconnect
+            if not self.is_started or self._task is not _get_current_task():
+                break
+            if not self.is_auto_reconnect or self._reconnect_tries >= self.reconnect_count:
+                self.logger.error("WebSocket is closed. Reconnect tries: %s", self._reconnect_tries)
+                self.is_started = False
+                self._close_items_queues()
+                break
+            self._reconnect_tries += 1
+            await asyncio.sleep(self.reconnect_delay_sec)
+
+    def _send_command(self, data):
+        # (Throttled by writer task, so the event loop is not blocked)
+        message = codec.dumps(data)
+        self.logger.debug("Send message: %s", message)
+        self.ws.send(message, self.command_rate_limiter)
+
+    def _get_ws_headers(self):
+        # (WSClient.headers are a list of "Name: value" for websocket-client)
+        headers = self.headers
+        if not headers or isinstance(headers, dict):
+            return headers or None
+        return dict((part.strip() for part in header.split(":", 1)) for header in headers)
+
+    # Items
+
+    async def iter_items(self):
+        # Async iterator of parsed items of all subscriptions (until the client is closed)
+        queue = asyncio.Queue(self.items_queue_size)
+        if self._items_queues is None:
+            self._items_queues = []
+        self._items_queues.append(queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            self._items_queues.remove(queue)
+
+    def on_item_received(self, item):
+        super().on_item_received(item)
+        if self._items_queues and isinstance(item, DataObject):
+            for queue in self._items_queues:
+                self._put_to_queue(queue, item)
+
+    def _put_to_queue(self, queue, item):
+        if queue.full():
+            # (Slow consumer shouldn't stall the connection)
+            queue.get_nowait()
+            self.dropped_items_count += 1
+        queue.put_nowait(item)
+
+    def _close_items_queues(self):
+        for queue in self._items_queues or []:
+            self._put_to_queue(queue, None)
+
+
+class AsyncWSClient(AsyncWSClientMixin, WSClient):
+    pass
+
+
+def _get_current_task():
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        # (Not in event loop)
+        return None
+
+
+async def _await_if_needed(result):
+    # (Hooks which are not overridden return their results as is)
+    return await result if inspect.isawaitable(result) else result
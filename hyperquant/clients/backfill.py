@@ -0,0 +1,159 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from hyperquant.api import Endpoint, Interval, Sorting
+from hyperquant.clients import Error, HistoryPaginator
+
+"""
+Concurrent history backfill for REST clients.
+
+The [from_time, to_time] range is split into shards [from_time, from_time + duration),
+which are fetched concurrently (each shard is paged by itself), and their items are yielded
+as a stream in timestamp order:
+
+    backfill = HistoryBackfill(rest_client, max_workers=8)
+    for candle in backfill.iter_candles("eth_btc", Interval.MIN_1, from_time, to_time):
+        save(candle)
+
+Only a window of shards (2 * max_workers) is requested ahead, so memory doesn't
+depend on range length. Failed shards are retried individually. If a shard fails
+retry_count times, its Error is yielded and the iteration stops.
+"""
+
+DEFAULT_MAX_LIMIT = 1000
+
+
+class HistoryBackfill:
+    # Settings:
+    max_workers = 8
+    # Shards requested ahead = max_workers * window_factor
+    window_factor = 2
+    retry_count = 3
+    retry_delay_sec = 1
+    # (None - max limit for endpoint from converter)
+    max_limit = None
+    # (For trades, as their count in a time range is unknown)
+    trades_shard_duration_sec = 60 * 60
+
+    def __init__(self, rest_client, max_workers=None, retry_count=None) -> None:
+        super().__init__()
+        self.rest_client = rest_client
+        if max_workers is not None:
+            self.max_workers = max_workers
+        if retry_count is not None:
+            self.retry_count = retry_count
+
+        self.logger = logging.getLogger("%s.%s" % ("Backfill", rest_client.__class__.__name__))
+
+    def iter_candles(self, symbol, interval, from_time, to_time, version=None, **kwargs):
+        # Shard contains max_limit candles, so it's usually fetched with 1 request
+        max_limit = self._get_max_limit(Endpoint.CANDLE, version)
+        if interval not in Interval.duration_sec_by_interval:
+            raise Exception("Interval %s is not supported for backfill" % interval)
+        item_duration = Interval.duration_sec_by_interval[interval] * self._time_unit_per_sec
+        shard_duration = max_limit * item_duration
+
+        def fetch_page(from_item, from_time, to_time):
+            return self.rest_client.fetch_candles(symbol, interval, from_time=from_time, to_time=to_time,
+                                                  is_use_max_limit=True, version=version, **kwargs)
+
+        return self._iter_shards(fetch_page, from_time, to_time, shard_duration, False, item_duration, max_limit)
+
+    def iter_trades(self, symbol, from_time, to_time, shard_duration_sec=None, version=None, **kwargs):
+        # (Shards are requested by time, so the platform should support time params for trades)
+        if not self.rest_client._is_from_time_supported(Endpoint.TRADE_HISTORY, version):
+            raise Exception("Trades of %s cannot be requested by time, so they cannot be backfilled by shards" %
+                            self.rest_client.__class__.__name__)
+        shard_duration = (shard_duration_sec or self.trades_shard_duration_sec) * self._time_unit_per_sec
+
+        def fetch_page(from_item, from_time, to_time):
+            return self.rest_client.fetch_trades_history(symbol, from_item=from_item, sorting=Sorting.ASCENDING,
+                                                          is_use_max_limit=True, from_time=from_time,
+                                                          to_time=to_time, version=version, **kwargs)
+
+        return self._iter_shards(fetch_page, from_time, to_time, shard_duration,
+                                 self.rest_client._is_from_item_supported(version),
+                                 page_limit=self._get_max_limit(Endpoint.TRADE_HISTORY, version))
+
+    @property
+    def _time_unit_per_sec(self):
+        return 1000 if self.rest_client.use_milliseconds else 1
+
+    def _get_max_limit(self, endpoint, version=None):
+        if self.max_limit:
+            return self.max_limit
+        max_limit_by_endpoint = self.rest_client.get_or_create_converter(version).max_limit_by_endpoint
+        return max_limit_by_endpoint.get(endpoint, DEFAULT_MAX_LIMIT) if max_limit_by_endpoint else DEFAULT_MAX_LIMIT
+
+    def _split_to_shards(self, from_time, to_time, shard_duration):
+        # [(from_time, to_time, is_to_time_included), ...] without gaps and intersections:
+        # [from_time, to_time) for all shards except the last one, which is [from_time, to_time]
+        # (Timestamps can be fractional, so the next shard can't start from to_time + 1)
+        shard_from_time = from_time
+        while shard_from_time + shard_duration < to_time:
+            yield shard_from_time, shard_from_time + shard_duration, False
+            shard_from_time += shard_duration
+        yield shard_from_time, to_time, True
+
+    def _iter_shards(self, fetch_page, from_time, to_time, shard_duration, is_paging_by_item, item_duration=None,
+                     page_limit=None):
+        window_size = self.max_workers * self.window_factor
+        shards = self._split_to_shards(from_time, to_time, shard_duration)
+        executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="Backfill")
+        futures = deque()
+        try:
+            for shard in shards:
+                futures.append(executor.submit(self._fetch_shard, fetch_page, shard, is_paging_by_item,
+                                               item_duration, page_limit))
+                if len(futures) < window_size:
+                    continue
+                # (Shards don't intersect, so items are in timestamp order if shards are yielded in order)
+                items = futures.popleft().result()
+                if isinstance(items, Error):
+                    yield items
+                    return
+                yield from items
+
+            while futures:
+                items = futures.popleft().result()
+                if isinstance(items, Error):
+                    yield items
+                    return
+                yield from items
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _fetch_shard(self, fetch_page, shard, is_paging_by_item, item_duration=None, page_limit=None):
+        # Returns all items of the shard or Error (if all tries failed)
+        from_time, to_time, is_to_time_included = shard
+        result = None
+        for try_index in range(self.retry_count + 1):
+            if try_index:
+                self.logger.warning("Retry %s for shard: %s - %s. Error: %s", try_index, from_time, to_time, result)
+                time.sleep(self.retry_delay_sec * try_index)
+            try:
+                paginator = HistoryPaginator(from_time, to_time, is_paging_by_item=is_paging_by_item,
+                                             item_duration=item_duration, is_to_time_included=is_to_time_included,
+                                             page_limit=page_limit)
+                result = self._fetch_all_pages(fetch_page, paginator)
+            except Exception as exc:
+                self.logger.exception("Error while fetching shard: %s - %s", from_time, to_time)
+                result = self.rest_client._create_error_by_exception(exc)
+            if not isinstance(result, Error):
+                return result
+        return result
+
+    def _fetch_all_pages(self, fetch_page, paginator):
+        result = []
+        # (Requests are paced by client's rate_limiter)
+        while not paginator.is_finished:
+            from_item, from_time = paginator.get_page_params()
+            items = paginator.process_page(fetch_page(from_item, from_time, paginator.to_time))
+            if isinstance(items, Error):
+                return items
+            result += items
+        return result
@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from hyperquant.api import Endpoint
+
+"""
+TTL/LRU cache of REST responses for idempotent reads.
+
+Raw response content is cached (so memory cap is exact) by request: method, URL and
+platform params (as made by make_url_and_platform_params()). On hit, content is parsed
+again, so each call returns new value objects, as without cache:
+
+    rest_client.cache = ResponseCache(max_size_bytes=32 * 1024 * 1024)
+    rest_client.get_symbols()  # Request
+    rest_client.get_symbols()  # From cache during ttl_sec_by_endpoint[Endpoint.SYMBOLS]
+
+Pages of closed candles never change, so they are cached without TTL (until evicted).
+"""
+
+
+class ResponseCache:
+    # Settings:
+    max_size_bytes = 64 * 1024 * 1024
+    # (Endpoints not listed here are not cached)
+    ttl_sec_by_endpoint = {
+        Endpoint.SYMBOLS: 60 * 60,
+        Endpoint.CANDLE: 5,
+        Endpoint.ORDER_BOOK: 1,
+        Endpoint.TICKER: 1,
+    }
+
+    def __init__(self, max_size_bytes=None, ttl_sec_by_endpoint=None) -> None:
+        super().__init__()
+        if max_size_bytes is not None:
+            self.max_size_bytes = max_size_bytes
+        if ttl_sec_by_endpoint is not None:
+            self.ttl_sec_by_endpoint = ttl_sec_by_endpoint
+
+        # State:
+        self._lock = Lock()
+        # {key: (content, expire_at or None)} (the last is the most recently used)
+        self._entry_by_key = OrderedDict()
+        self.size_bytes = 0
+
+        # Metrics:
+        self.hit_count = 0
+        self.miss_count = 0
+        self.eviction_count = 0
+
+    def get_ttl(self, endpoint):
+        return self.ttl_sec_by_endpoint.get(endpoint) if self.ttl_sec_by_endpoint else None
+
+    def is_cached_endpoint(self, endpoint):
+        return bool(self.get_ttl(endpoint))
+
+    def get(self, key):
+        # Returns content or None
+        with self._lock:
+            entry = self._entry_by_key.get(key)
+            if entry and entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if not entry:
+                self.miss_count += 1
+                return None
+            self._entry_by_key.move_to_end(key)
+            self.hit_count += 1
+            return entry[0]
+
+    def put(self, key, content, ttl_sec=None):
+        # ttl_sec=None - for immutable content (is removed only when evicted)
+        size = len(content)
+        if size > self.max_size_bytes:
+            return
+        with self._lock:
+            if key in self._entry_by_key:
+                self._remove(key)
+            self._entry_by_key[key] = (content, time.monotonic() + ttl_sec if ttl_sec is not None else None)
+            self.size_bytes += size
+            # Evict least recently used
+            while self.size_bytes > self.max_size_bytes:
+                self._remove(next(iter(self._entry_by_key)))
+                self.eviction_count += 1
+
+    def _remove(self, key):
+        content, _ = self._entry_by_key.pop(key)
+        self.size_bytes -= len(content)
+
+    def clear(self):
+        with self._lock:
+            self._entry_by_key.clear()
+            self.size_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entry_by_key)
+
+    def get_metrics(self):
+        return {
+            "count": len(self),
+            "size_bytes": self.size_bytes,
+            "hit_count": self.hit_count,
+            "miss_count": self.miss_count,
+            "eviction_count": self.eviction_count,
+        }
@@ -0,0 +1,204 @@
+import logging
+from datetime import datetime, timezone
+
+from hyperquant.api import Interval
+from hyperquant.clients import Candle, Trade
+
+"""
+Candles built locally from the stream of trades.
+
+    builder = CandleBuilder(on_candle=save_candle)
+    builder.attach(ws_client)  # ws_client subscribed to Endpoint.TRADE
+    ...
+    builder.get_open_candle("ETHBTC", Interval.HRS_1)
+"""
+
+# 1970-01-01 is Thursday, and weeks start on Monday
+_WEEK_OFFSET_SEC = 4 * 24 * 60 * 60
+
+
+def get_interval_start(timestamp_sec, interval):
+    # Start of the interval's bucket which includes timestamp (in seconds)
+    if interval == Interval.MONTH_1:
+        dt = datetime.fromtimestamp(timestamp_sec, timezone.utc)
+        return int(datetime(dt.year, dt.month, 1, tzinfo=timezone.utc).timestamp())
+    duration = Interval.duration_sec_by_interval[interval]
+    offset = _WEEK_OFFSET_SEC if interval == Interval.WEEK_1 else 0
+    return int(timestamp_sec - (timestamp_sec - offset) % duration)
+
+
+def get_interval_end(start_sec, interval):
+    if interval == Interval.MONTH_1:
+        dt = datetime.fromtimestamp(start_sec, timezone.utc)
+        year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+        return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+    return start_sec + Interval.duration_sec_by_interval[interval]
+
+
+class CandleBuilder:
+    """
+    Builds OHLCV candles for intervals from trades.
+
+    Trades are aggregated to 1 minute candles, and closed 1 minute candles are
+    rolled up into candles of all the higher intervals. A candle is closed (and
+    passed to on_candle callback) when the first trade of the next bucket comes
+    or on flush(). Trades older than the current 1 minute candle are skipped.
+    """
+
+    # Settings:
+    intervals = Interval.ALL
+    on_candle = None  # on_candle(candle) - for closed candles
+
+    # State:
+    skipped_trades_count = 0
+
+    def __init__(self, intervals=None, on_candle=None) -> None:
+        super().__init__()
+        if intervals is not None:
+            self.intervals = intervals
+        if on_candle is not None:
+            self.on_candle = on_candle
+        self.higher_intervals = [interval for interval in self.intervals if interval != Interval.MIN_1]
+
+        self.logger = logging.getLogger("CandleBuilder")
+
+        # {(platform_id, symbol): 1 minute candle}
+        self._minute_candle_by_key = {}
+        # {(platform_id, symbol): {interval: candle from closed 1 minute candles}}
+        self._candle_by_interval_by_key = {}
+        # (Unit of timestamps for candles: the same as for trades)
+        self._is_milliseconds_by_key = {}
+
+    def attach(self, ws_client):
+        # Build candles from trades received by ws_client
+        prev_on_data_item = ws_client.on_data_item
+
+        def on_data_item(item):
+            if isinstance(item, Trade):
+                self.add_trade(item)
+            if prev_on_data_item:
+                prev_on_data_item(item)
+
+        ws_client.on_data_item = on_data_item
+
+    def add_trade(self, trade):
+        key = (trade.platform_id, trade.symbol)
+        timestamp_sec = trade.timestamp / 1000 if trade.is_milliseconds else trade.timestamp
+        price = self._to_number(trade.price)
+        amount = self._to_number(trade.amount)
+        self._is_milliseconds_by_key[key] = trade.is_milliseconds
+
+        minute_candle = self._minute_candle_by_key.get(key)
+        if minute_candle:
+            minute_start = self._get_timestamp_sec(minute_candle)
+            if timestamp_sec < minute_start:
+                self.skipped_trades_count += 1
+                self.logger.debug("Skip trade older than current candle: %s", trade)
+                return
+            if timestamp_sec >= minute_start + 60:
+                self._close_minute_candle(key)
+                minute_candle = None
+        # Close higher interval candles which ended before the trade
+        self._close_candles(key, timestamp_sec)
+
+        if not minute_candle:
+            start = get_interval_start(timestamp_sec, Interval.MIN_1)
+            self._minute_candle_by_key[key] = Candle(
+                trade.platform_id, trade.symbol, self._make_timestamp(key, start), Interval.MIN_1,
+                price, price, price, price, amount, 1, trade.is_milliseconds)
+            return
+
+        if price > minute_candle.price_high:
+            minute_candle.price_high = price
+        if price < minute_candle.price_low:
+            minute_candle.price_low = price
+        minute_candle.price_close = price
+        minute_candle.amount += amount
+        minute_candle.trades_count += 1
+
+    def flush(self, timestamp=None):
+        # Close all candles which ended before timestamp (in seconds, current time by default)
+        # (Call periodically to get candles closed if no trades come)
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc).timestamp()
+        for key, minute_candle in list(self._minute_candle_by_key.items()):
+            if minute_candle and self._get_timestamp_sec(minute_candle) + 60 <= timestamp:
+                self._close_minute_candle(key)
+        for key in list(self._candle_by_interval_by_key.keys()):
+            self._close_candles(key, timestamp)
+
+    def get_open_candle(self, symbol, interval, platform_id=None):
+        # Current candle including current 1 minute candle (a new instance)
+        key = (platform_id, symbol)
+        if platform_id is None:
+            key = next((key for key in self._minute_candle_by_key if key[1] == symbol), key)
+        minute_candle = self._minute_candle_by_key.get(key)
+        if interval == Interval.MIN_1:
+            return self._copy(minute_candle) if minute_candle else None
+
+        candle = self._candle_by_interval_by_key.get(key, {}).get(interval)
+        candle = self._copy(candle) if candle else None
+        if minute_candle:
+            start = get_interval_start(self._get_timestamp_sec(minute_candle), interval)
+            if not candle:
+                candle = self._copy(minute_candle, interval, self._make_timestamp(key, start))
+            elif self._get_timestamp_sec(candle) == start:
+                self._merge(candle, minute_candle)
+        return candle
+
+    def _close_minute_candle(self, key):
+        minute_candle = self._minute_candle_by_key.pop(key)
+        if Interval.MIN_1 in self.intervals:
+            self._emit(minute_candle)
+
+        # Roll up
+        candle_by_interval = self._candle_by_interval_by_key.setdefault(key, {})
+        minute_start = self._get_timestamp_sec(minute_candle)
+        for interval in self.higher_intervals:
+            start = get_interval_start(minute_start, interval)
+            candle = candle_by_interval.get(interval)
+            if candle and self._get_timestamp_sec(candle) != start:
+                self._emit(candle_by_interval.pop(interval))
+                candle = None
+            if candle:
+                self._merge(candle, minute_candle)
+            else:
+                candle_by_interval[interval] = self._copy(minute_candle, interval, self._make_timestamp(key, start))
+
+    def _close_candles(self, key, timestamp_sec):
+        candle_by_interval = self._candle_by_interval_by_key.get(key)
+        if not candle_by_interval:
+            return
+        # (From lower intervals to higher)
+        for interval in self.higher_intervals:
+            candle = candle_by_interval.get(interval)
+            if candle and get_interval_end(self._get_timestamp_sec(candle), interval) <= timestamp_sec:
+                self._emit(candle_by_interval.pop(interval))
+
+    def _emit(self, candle):
+        if self.on_candle:
+            self.on_candle(candle)
+
+    def _merge(self, candle, other):
+        if other.price_high > candle.price_high:
+            candle.price_high = other.price_high
+        if other.price_low < candle.price_low:
+            candle.price_low = other.price_low
+        candle.price_close = other.price_close
+        candle.amount += other.amount
+        candle.trades_count += other.trades_count
+
+    def _copy(self, candle, interval=None, timestamp=None):
+        return Candle(candle.platform_id, candle.symbol, timestamp if timestamp is not None else candle.timestamp,
+                      interval or candle.interval, candle.price_open, candle.price_close, candle.price_high,
+                      candle.price_low, candle.amount, candle.trades_count, candle.is_milliseconds)
+
+    def _get_timestamp_sec(self, candle):
+        return candle.timestamp // 1000 if candle.is_milliseconds else candle.timestamp
+
+    def _make_timestamp(self, key, timestamp_sec):
+        return timestamp_sec * 1000 if self._is_milliseconds_by_key.get(key) else timestamp_sec
+
+    def _to_number(self, value):
+        # (Strings are converted to float, other types (float, Decimal, int) are kept)
+        return float(value) if isinstance(value, str) else value
@@ -0,0 +1,97 @@
+import asyncio
+from threading import Event, Lock
+
+"""
+Single-flight coalescing of identical concurrent calls.
+
+While a call for a key is in flight, callers with the same key don't make
+their own calls, but wait for the first one and get its result (or exception).
+Nothing is kept after the call is finished, so the next caller makes a new call:
+
+    coalescer = RequestCoalescer()
+    result = coalescer.call(key, fun, *args)  # in threads
+    result = await coalescer.call_async(key, coroutine_fun, *args)  # in coroutines
+
+(Note: the result is the same object for all waiting callers, so it shouldn't be modified.)
+
+In coroutines, the call runs in its own task, so cancelling of any caller (even the first one)
+doesn't cancel the call for the others.
+"""
+
+
+class _Call:
+    __slots__ = ("event", "result", "exception")
+
+    def __init__(self) -> None:
+        self.event = Event()
+        self.result = None
+        self.exception = None
+
+
+class RequestCoalescer:
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = Lock()
+        self._call_by_key = {}
+        # {(loop_id, key): asyncio.Task}
+        self._task_by_key = {}
+
+        # Metrics:
+        self.call_count = 0
+        self.coalesced_count = 0
+
+    def call(self, key, fun, *args):
+        with self._lock:
+            call = self._call_by_key.get(key)
+            is_first = call is None
+            if is_first:
+                call = self._call_by_key[key] = _Call()
+                self.call_count += 1
+            else:
+                self.coalesced_count += 1
+
+        if not is_first:
+            call.event.wait()
+            if call.exception:
+                raise call.exception
+            return call.result
+
+        try:
+            call.result = fun(*args)
+        except Exception as exc:
+            call.exception = exc
+            raise
+        finally:
+            with self._lock:
+                del self._call_by_key[key]
+            call.event.set()
+        return call.result
+
+    async def call_async(self, key, coroutine_fun, *args):
+        loop = asyncio.get_running_loop()
+        # (Tasks can be awaited only in their loop)
+        key = (id(loop), key)
+        with self._lock:
+            task = self._task_by_key.get(key)
+            if task is None:
+                task = self._task_by_key[key] = loop.create_task(self._run_async(key, coroutine_fun, *args))
+                self.call_count += 1
+            else:
+                self.coalesced_count += 1
+
+        # (Cancelling of a caller shouldn't cancel the call)
+        return await asyncio.shield(task)
+
+    async def _run_async(self, key, coroutine_fun, *args):
+        try:
+            return await coroutine_fun(*args)
+        finally:
+            with self._lock:
+                del self._task_by_key[key]
+
+    def get_metrics(self):
+        return {
+            "call_count": self.call_count,
+            "coalesced_count": self.coalesced_count,
+        }
@@ -0,0 +1,199 @@
+import logging
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
+
+"""
+Bounded queue with a pool of worker threads between a producer (e.g. WS socket thread)
+and slow consumers.
+
+Items are hash-partitioned by key over workers, each worker with its own queue,
+so items with the same key (symbol) are handled in the order they were put.
+Worker takes all queued items at once and passes them to handler as a list:
+
+    dispatcher = Dispatcher(handler, worker_count=4, max_queue_size=1000,
+                            overflow_policy=OverflowPolicy.DROP_OLDEST,
+                            partition_key_fun=lambda item: item.symbol)
+    dispatcher.start()
+    dispatcher.put(item)  # Returns immediately (unless the queue is full and policy is BLOCK)
+    dispatcher.stop()  # Workers exit after all queued items are handled
+
+Items put while the dispatcher is not started are dropped (and counted), as there
+may be no workers to handle them.
+"""
+
+
+class OverflowPolicy:
+    # What put() does if the queue of item's worker is full
+    # Wait until the worker takes items (producer is slowed down to consumer's speed)
+    BLOCK = "block"
+    # Remove the oldest queued item
+    DROP_OLDEST = "drop_oldest"
+    # Replace the queued item with the same conflation key (keeping its place in the queue),
+    # items without key or with key not in the queue - as DROP_OLDEST
+    CONFLATE = "conflate"
+
+
+class _Partition:
+    __slots__ = ("queue", "condition", "entry_by_conflation_key", "thread")
+
+    def __init__(self, lock) -> None:
+        # [[item, put_at, conflation_key], ...]
+        self.queue = deque()
+        self.condition = Condition(lock)
+        self.entry_by_conflation_key = {}
+        self.thread = None
+
+
+class Dispatcher:
+    # Settings:
+    worker_count = 1
+    # (Per worker)
+    max_queue_size = 10000
+    overflow_policy = OverflowPolicy.BLOCK
+
+    def __init__(self, handler, worker_count=None, max_queue_size=None, overflow_policy=None,
+                 partition_key_fun=None, conflation_key_fun=None, name=None) -> None:
+        # handler(items) - called in worker threads
+        # partition_key_fun(item) - items with the same key are handled by the same worker in order
+        # conflation_key_fun(item) - for CONFLATE policy (None - item is never replaced)
+        super().__init__()
+        self.handler = handler
+        if worker_count:
+            self.worker_count = worker_count
+        if max_queue_size:
+            self.max_queue_size = max_queue_size
+        if overflow_policy:
+            self.overflow_policy = overflow_policy
+        self.partition_key_fun = partition_key_fun
+        self.conflation_key_fun = conflation_key_fun
+        self.name = name
+
+        # State:
+        # (One lock for all partitions: put() and taking items are short)
+        self._lock = Lock()
+        self._partitions = [_Partition(self._lock) for _ in range(self.worker_count)]
+        self.is_started = False
+
+        # Metrics:
+        self.put_count = 0
+        self.handled_count = 0
+        self.dropped_count = 0
+        self.conflated_count = 0
+        self.blocked_count = 0
+        self.error_count = 0
+        # (Time from put() to handling)
+        self.max_lag_sec = 0
+
+        self.logger = logging.getLogger("%s.%s" % ("Dispatcher", name))
+
+    @property
+    def queue_size(self):
+        return sum(len(partition.queue) for partition in self._partitions)
+
+    @property
+    def lag_sec(self):
+        # How long the oldest queued item is waiting
+        with self._lock:
+            put_ats = [partition.queue[0][1] for partition in self._partitions if partition.queue]
+        return time.monotonic() - min(put_ats) if put_ats else 0
+
+    def start(self):
+        with self._lock:
+            self.is_started = True
+            for index, partition in enumerate(self._partitions):
+                # (Worker which is still handling its last items after stop() just continues,
+                # so there is never two workers for a partition)
+                if not partition.thread:
+                    partition.thread = Thread(target=self._run, args=(partition,),
+                                              name="%s-%s" % (self.name or "Dispatcher", index))
+                    partition.thread.daemon = True
+                    partition.thread.start()
+
+    def stop(self):
+        with self._lock:
+            self.is_started = False
+            for partition in self._partitions:
+                partition.condition.notify_all()
+
+    def put(self, item):
+        partition = self._partitions[hash(self.partition_key_fun(item)) % len(self._partitions)
+                                     if self.partition_key_fun and len(self._partitions) > 1 else 0]
+        conflation_key = self.conflation_key_fun(item) \
+            if self.conflation_key_fun and self.overflow_policy == OverflowPolicy.CONFLATE else None
+        with self._lock:
+            self.put_count += 1
+            if not self.is_started:
+                self._drop()
+                return
+            if conflation_key is not None:
+                entry = partition.entry_by_conflation_key.get(conflation_key)
+                if entry:
+                    entry[0] = item
+                    self.conflated_count += 1
+                    return
+
+            if len(partition.queue) >= self.max_queue_size:
+                if self.overflow_policy == OverflowPolicy.BLOCK:
+                    self.blocked_count += 1
+                    # (stop() wakes up, so that producer doesn't wait for workers which may exit)
+                    while len(partition.queue) >= self.max_queue_size and self.is_started:
+                        partition.condition.wait()
+                    if not self.is_started:
+                        self._drop()
+                        return
+                else:
+                    self._remove_entry(partition, partition.queue.popleft())
+                    self._drop()
+
+            entry = [item, time.monotonic(), conflation_key]
+            partition.queue.append(entry)
+            if conflation_key is not None:
+                partition.entry_by_conflation_key[conflation_key] = entry
+            partition.condition.notify_all()
+
+    def _drop(self):
+        self.dropped_count += 1
+        if self.dropped_count == 1 or not self.dropped_count % 1000:
+            self.logger.warning("Queue is full or dispatcher is stopped. Dropped items: %s", self.dropped_count)
+
+    def _remove_entry(self, partition, entry):
+        if entry[2] is not None and partition.entry_by_conflation_key.get(entry[2]) is entry:
+            del partition.entry_by_conflation_key[entry[2]]
+
+    def _run(self, partition):
+        while True:
+            with self._lock:
+                while not partition.queue:
+                    if not self.is_started:
+                        partition.thread = None
+                        return
+                    partition.condition.wait()
+                entries = list(partition.queue)
+                partition.queue.clear()
+                partition.entry_by_conflation_key.clear()
+                # (Wake up blocked put())
+                partition.condition.notify_all()
+
+            lag_sec = time.monotonic() - entries[0][1]
+            try:
+                self.handler([entry[0] for entry in entries])
+            except Exception:
+                self.error_count += 1
+                self.logger.exception("Error while handling items")
+            with self._lock:
+                self.handled_count += len(entries)
+                self.max_lag_sec = max(self.max_lag_sec, lag_sec)
+
+    def get_metrics(self):
+        return {
+            "queue_size": self.queue_size,
+            "lag_sec": self.lag_sec,
+            "max_lag_sec": self.max_lag_sec,
+            "put_count": self.put_count,
+            "handled_count": self.handled_count,
+            "dropped_count": self.dropped_count,
+            "conflated_count": self.conflated_count,
+            "blocked_count": self.blocked_count,
+            "error_count": self.error_count,
+        }
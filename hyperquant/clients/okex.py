@@ -1,11 +1,22 @@
+import time
 import zlib
 import re
-import datetime
 
 from hyperquant.api import Platform, Sorting, Interval, Direction, OrderType
 from hyperquant.clients import WSClient, Endpoint, Trade, Error, ErrorCode, \
     ParamName, WSConverter, RESTConverter, PrivatePlatformRESTClient, MyTrade, Candle, Ticker, OrderBookItem, Order, \
-    OrderBook, Account, Balance
+    OrderBook, Account, Balance, Channel
+
+try:
+    import aiohttp
+except ImportError:
+    # (Async clients are optional)
+    aiohttp = None
+if aiohttp:
+    # (Not in try, so that errors in aio module itself are not hidden)
+    from hyperquant.clients.aio import AsyncRESTClientMixin, AsyncWSClientMixin
+else:
+    AsyncRESTClientMixin = AsyncWSClientMixin = None
 
 
 # REST
@@ -30,12 +41,13 @@ class OkexRESTConverterV1(RESTConverter):
     param_name_lookup = {
         ParamName.SYMBOL: "symbol",
         ParamName.LIMIT: "size",
-#        ParamName.IS_USE_MAX_LIMIT: None,
+        ParamName.IS_USE_MAX_LIMIT: None,
         ParamName.INTERVAL: "type",
         ParamName.FROM_ITEM: "since",
 #        ParamName.TO_ITEM: None,
         ParamName.FROM_TIME: "since",
-#        ParamName.TO_TIME: None,
+        # (Not supported: ranges are checked by time of items)
+        ParamName.TO_TIME: None,
         ParamName.PRICE: "price",
         ParamName.AMOUNT: "amount",
     }
@@ -71,6 +83,14 @@ class OkexRESTConverterV1(RESTConverter):
         Endpoint.TRADE_HISTORY: 1000,
         Endpoint.ORDER_BOOK: 1000,
         Endpoint.CANDLE: 1000,
+        # (OkexRESTClient.fetch_trades_history() requests by platform endpoint)
+        endpoint_lookup[Endpoint.TRADE]: 1000,
+    }
+    # (For "trades.do" "since" is trade id, not a timestamp)
+    endpoints_without_time_params = {
+        Endpoint.TRADE,
+        Endpoint.TRADE_HISTORY,
+        endpoint_lookup[Endpoint.TRADE],
     }
 
     # For parsing
@@ -119,6 +139,10 @@ class OkexRESTConverterV1(RESTConverter):
     is_source_in_milliseconds = True
 
     # timestamp_platform_names = [ParamName.TIMESTAMP]
+    # (For "trades.do" "since" is trade id, not a timestamp)
+    timestamp_platform_names_by_endpoint = {
+        endpoint_lookup[Endpoint.CANDLE]: ["since"],
+    }
 
     def _process_param_value(self, name, value):
         if name == ParamName.FROM_ITEM: #or name == ParamName.TO_ITEM:
@@ -134,9 +158,9 @@ class OkexRESTClient(PrivatePlatformRESTClient):
     _converter_class_by_version = {
         "1": OkexRESTConverterV1,
     }
-
-    # State:
-    ratelimit_error_in_row_count = 0
+    # (20 requests per 2 seconds)
+    rate_limit_per_sec = 10
+    rate_limit_capacity = 20
 
     @property
     def headers(self):
@@ -146,18 +170,14 @@ class OkexRESTClient(PrivatePlatformRESTClient):
         return result
 
     def _on_response(self, response, result):
-        self.delay_before_next_request_sec = 0
         if isinstance(result, Error):
+            # (Errors in a row are counted by rate_limiter, which is shared by threads and clients)
             if result.code == ErrorCode.RATE_LIMIT:
-                self.ratelimit_error_in_row_count += 1
-                self.delay_before_next_request_sec = 60 * 2 * self.ratelimit_error_in_row_count  # some number - change
+                return 60 * 2 * self.rate_limiter.add_error()  # some number - change
             elif result.code == ErrorCode.IP_BAN:
-                self.ratelimit_error_in_row_count += 1
-                self.delay_before_next_request_sec = 60 * 5 * self.ratelimit_error_in_row_count  # some number - change
-            else:
-                self.ratelimit_error_in_row_count = 0
-        else:
-            self.ratelimit_error_in_row_count = 0
+                return 60 * 5 * self.rate_limiter.add_error()  # some number - change
+        self.rate_limiter.reset_errors()
+        return 0
 
     
     def fetch_trades_history(self, symbol, limit=None, from_item=None, to_item=None,
@@ -180,6 +200,11 @@ class OkexRESTClient(PrivatePlatformRESTClient):
         result = self._send("GET", endpoint, params, version, **kwargs)
         return result
 
+
+if AsyncRESTClientMixin:
+    class AsyncOkexRESTClient(AsyncRESTClientMixin, OkexRESTClient):
+        pass
+
     
 # WebSocket
 
@@ -191,8 +216,9 @@ class OkexWSConverterV1(WSConverter):
 
     supported_endpoints = [Endpoint.TRADE, Endpoint.CANDLE]
     symbol_endpoints = [Endpoint.TRADE, Endpoint.CANDLE]
-    #supported_symbols = ['ltc_btc', 'eth_btc', 'etc_btc', 'bch_btc', 'btc_usdt', 'eth_usdt', 'ltc_usdt', 'etc_usdt', 'bch_usdt', 'etc_eth', 'bt1_btc', 'bt2_btc', 'btg_btc', 'qtum_btc', 'hsr_btc', 'neo_btc', 'gas_btc', 'qtum_usdt', 'hsr_usdt', 'neo_usdt', 'gas_usdt']
-    supported_symbols = ['ltc_btc', 'eth_btc']
+    # (Default symbols if none are given. Subscriptions over
+    # OkexWSClient.max_subscriptions_per_connection go to additional connections)
+    supported_symbols = ['ltc_btc', 'eth_btc', 'etc_btc', 'bch_btc', 'btc_usdt', 'eth_usdt', 'ltc_usdt', 'etc_usdt', 'bch_usdt', 'etc_eth', 'bt1_btc', 'bt2_btc', 'btg_btc', 'qtum_btc', 'hsr_btc', 'neo_btc', 'gas_btc', 'qtum_usdt', 'hsr_usdt', 'neo_usdt', 'gas_usdt']
     interval_endpoints= {Endpoint.CANDLE}
     supported_intervals=[Interval.MIN_1, Interval.MIN_3, Interval.MIN_5, Interval.MIN_15, Interval.MIN_30, Interval.HRS_1, Interval.HRS_2, Interval.HRS_4, Interval.HRS_6, Interval.HRS_8, Interval.HRS_12, Interval.DAY_1, Interval.WEEK_1]
     subscribed_interval=None
@@ -239,6 +265,11 @@ class OkexWSConverterV1(WSConverter):
         "deals": Endpoint.TRADE,
         "kline": Endpoint.CANDLE,
     }
+    # Confirmations of commands: {"channel": "addChannel", "data": {"result": true, "channel": "ok_sub_..."}}
+    is_subscribed_by_command_channel = {
+        "addChannel": True,
+        "delChannel": False,
+    }
 	
 	#https://github.com/okcoin-okex/API-docs-OKEx.com/blob/master/API-For-Spot-EN/Error%20Code%20For%20Spot.md
     error_code_by_platform_error_code = {
@@ -248,6 +279,8 @@ class OkexWSConverterV1(WSConverter):
 
     # For converting time
     is_source_in_milliseconds = True
+    # ('Deals' channel returns only time of day ("hh:mm:ss") in Beijing time instead of timestamp)
+    time_of_day_utc_offset_sec = 8 * 3600
 
     def generate_subscriptions(self, endpoints, symbols, **params):
         #handle interval parameter
@@ -261,9 +294,28 @@ class OkexWSConverterV1(WSConverter):
         #self.logger.debug("gen_subscr_end: %s", params)
         return super().generate_subscriptions(endpoints,symbols, **params)
 
-    def _parse_item(self, endpoint, item_data):
+    def _parse_item(self, endpoint, item_data, context=None):
+        if item_data.get("channel") in self.is_subscribed_by_command_channel:
+            return self._parse_channel(item_data)
         [endpoint,symbol] = self.get_endpoint_type_and_symbol(item_data['channel'])
-        return super()._parse_item(endpoint, item_data['data'][0]+[symbol])
+        if self.is_columnar:
+            # All the rows of a message to one batch
+            batch = self._parse_batch(endpoint, [row + [symbol] for row in item_data['data']], context)
+            if batch is not None:
+                return batch
+        return super()._parse_item(endpoint, item_data['data'][0]+[symbol], context)
+
+    def _parse_channel(self, item_data):
+        data = item_data.get("data") or {}
+        channel = Channel()
+        channel.channel = data.get("channel")
+        channel.is_subscribed = self.is_subscribed_by_command_channel[item_data["channel"]]
+        if not data.get("result"):
+            error = Error()
+            error.code = self.error_code_by_platform_error_code.get(data.get("error_code"), data.get("error_code"))
+            error.message = ErrorCode.get_message_by_code(error.code)
+            channel.error = error
+        return channel
 
     # returns endpoint type without symbols and params
     def get_endpoint_type_and_symbol(self, endpoint):
@@ -271,53 +323,94 @@ class OkexWSConverterV1(WSConverter):
         ep_groups= ep_regex.match(endpoint).groupdict()
         return [self.endpoint_by_event_type[ep_groups['endpoint']],ep_groups['symbol']]
 
-    #full of dirty hacks dou to different time formats in different data sources. 'Deals' request returns Time instead of Timestamp =(
-    # WARNING! It has a bug with timezone and date shifting for 'hh:mm:ss' formatted input values
-    def _convert_timestamp_from_platform(self, timestamp):
-        if not timestamp:
-            return timestamp
-        if type(timestamp)==str and timestamp[2]==':' :
-            [hour,minute,sec]=map(lambda x: int(x), timestamp.split(':'))
-            #assuming that it's today transaction. no more info in data
-            timestamp=int(datetime.datetime.today().replace(hour=hour,minute=minute,second=sec).timestamp())
-        elif self.is_source_in_milliseconds:
-            timestamp = int(timestamp)/1000
-            # if int(timestamp) == timestamp:
-            #     timestamp = int(timestamp)
-        elif self.is_source_in_timestring:
-            timestamp = parser.parse(timestamp).timestamp()
-
-        if self.use_milliseconds:
-            timestamp = int(timestamp * 1000)
-        return timestamp
-
-        
 
 class OkexWSClient(WSClient):
     platform_id = Platform.OKEX
     version = "1"  # Default version
+    # (One socket can't keep up with deals of all symbols, so they are sharded)
+    max_subscriptions_per_connection = 50
+    # (Batches of commands are sent as a list in one message)
+    max_subscriptions_per_command = 20
+    commands_per_sec = 5
 
     _converter_class_by_version = {
         "1": OkexWSConverterV1,
     }
-        
+
+    def __init__(self, api_key=None, api_secret=None, version=None, **kwargs) -> None:
+        super().__init__(api_key, api_secret, version, **kwargs)
+        # (Each shard has its own, so metrics are per connection)
+        self.inflater = Inflater()
+
     def _on_message(self, message):
-        super()._on_message(inflate(message).decode('utf-8'))
+        # (Inflated bytes are decoded by codec as is)
+        super()._on_message(self.inflater.inflate(message))
         
     def _send_subscribe(self, subscriptions):
         self.logger.debug("_send_subscr: %s",subscriptions)
-        for subscription in subscriptions:
-            self.ws.send("{'event':'addChannel','channel':'"+subscription+"'}")
+        self._send_in_batches(lambda batch: self._make_commands("addChannel", batch), subscriptions)
 
     def _send_unsubscribe(self, subscriptions):
-        for subscription in subscriptions:
-            self.ws.send("{'event':'delChannel','channel':'"+subscription+"'}")
+        self._send_in_batches(lambda batch: self._make_commands("delChannel", batch), subscriptions)
+
+    def _make_commands(self, event, subscriptions):
+        return [{"event": event, "channel": subscription} for subscription in subscriptions]
+
+
+if AsyncWSClientMixin:
+    class AsyncOkexWSClient(AsyncWSClientMixin, OkexWSClient):
+        pass
+
+
+class Inflater:
+    """
+    Inflates WS messages, each of which is a complete raw deflate stream.
+
+    Messages are inflated in one call to zlib without creating a decompress object
+    and concatenating its output. The size of the largest inflated message is passed
+    to zlib as the initial output size (bufsize), so usually zlib doesn't have to grow
+    its output. It is only a hint: zlib allocates a new output for each message
+    (there is no buffer reused between calls) and grows it if the hint is too small.
+    Result is bytes which are passed to codec.loads() as is.
+    """
+
+    # Settings:
+    wbits = -zlib.MAX_WBITS
+    max_buffer_size = 4 * 1024 * 1024
+
+    def __init__(self) -> None:
+        super().__init__()
+        # State:
+        # (bufsize hint for zlib.decompress())
+        self._buffer_size = zlib.DEF_BUF_SIZE
+
+        # Metrics:
+        self.message_count = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.total_time_sec = 0
+
+    def inflate(self, data):
+        start = time.perf_counter()
+        inflated = zlib.decompress(data, self.wbits, self._buffer_size)
+        self.total_time_sec += time.perf_counter() - start
+
+        if len(inflated) >= self._buffer_size:
+            # (+1 byte lets zlib find the end of the stream without growing its output)
+            self._buffer_size = min(len(inflated) + 1, self.max_buffer_size)
+        self.message_count += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(inflated)
+        return inflated
+
+    def get_metrics(self):
+        return {
+            "message_count": self.message_count,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "total_time_sec": self.total_time_sec,
+        }
 
 
 def inflate(data):
-    decompress = zlib.decompressobj(
-            -zlib.MAX_WBITS  # see above
-    )
-    inflated = decompress.decompress(data)
-    inflated += decompress.flush()
-    return inflated
+    return zlib.decompress(data, -zlib.MAX_WBITS)
@@ -0,0 +1,241 @@
+import logging
+from threading import RLock, Thread
+
+from hyperquant.api import Endpoint, OrderBookDirection, Platform
+from hyperquant.clients import OrderBook, OrderBookSide, Error
+
+"""
+Local L2 order books maintained from WebSocket diffs and REST snapshots.
+
+    manager = OrderBookManager(ws_client, rest_client)
+    manager.subscribe(["ETHBTC", "BNBBTC"])
+    ...
+    order_book = manager.get_order_book("ETHBTC")
+    order_book.best_bid, order_book.best_ask, order_book.spread, order_book.get_depth(10)
+"""
+
+
+class LocalOrderBookSide(OrderBookSide):
+    """
+    Side of LocalOrderBook. Readers take the lock of the book, so that they never
+    see levels in the middle of applying a diff (from WS socket's thread).
+    """
+
+    def __init__(self, direction, lock, platform_id=None, symbol=None) -> None:
+        super().__init__(direction, platform_id=platform_id, symbol=symbol)
+        self.lock = lock
+
+    @property
+    def best(self):
+        with self.lock:
+            return super().best
+
+    @property
+    def best_price(self):
+        with self.lock:
+            return super().best_price
+
+    def top(self, count):
+        with self.lock:
+            return super().top(count)
+
+    def get_cumulative_amounts(self, count=None):
+        with self.lock:
+            return super().get_cumulative_amounts(count)
+
+    def get_cumulative_amount(self, price=None, count=None):
+        with self.lock:
+            return super().get_cumulative_amount(price, count)
+
+    def __getitem__(self, index):
+        with self.lock:
+            return super().__getitem__(index)
+
+    def __iter__(self):
+        # (Items are created under the lock, so all of them are from the same state of the book)
+        with self.lock:
+            items = [self._create_item(index) for index in range(len(self))]
+        return iter(items)
+
+
+class LocalOrderBook(OrderBook):
+    """
+    Order book which is updated in place, so readers can keep a reference to it
+    (and to its asks and bids) and get actual values without copying.
+    All readers take the lock which is held while a snapshot or a diff is applied.
+
+    Diffs received before the snapshot are buffered and applied after it
+    (skipping those which are already included in the snapshot by item_id).
+    """
+
+    # State:
+    is_synced = False
+
+    def __init__(self, platform_id=None, symbol=None, is_milliseconds=False) -> None:
+        lock = RLock()
+        super().__init__(platform_id, symbol, None, None, is_milliseconds,
+                         LocalOrderBookSide(OrderBookDirection.ASK, lock, platform_id, symbol),
+                         LocalOrderBookSide(OrderBookDirection.BID, lock, platform_id, symbol))
+        self.lock = lock
+        self._pending_diffs = []
+
+    @property
+    def best_ask(self):
+        with self.lock:
+            return super().best_ask
+
+    @property
+    def best_bid(self):
+        with self.lock:
+            return super().best_bid
+
+    @property
+    def spread(self):
+        # (Both sides from the same diff)
+        with self.lock:
+            return super().spread
+
+    def get_depth(self, count=None):
+        # (asks amount, bids amount) for count best levels
+        with self.lock:
+            return self.asks.get_cumulative_amount(count=count), self.bids.get_cumulative_amount(count=count)
+
+    def apply_snapshot(self, snapshot):
+        with self.lock:
+            self.asks.replace_levels(snapshot.asks)
+            self.bids.replace_levels(snapshot.bids)
+            self.item_id = snapshot.item_id
+            self._set_timestamp(snapshot.timestamp)
+            self.is_synced = True
+
+            # Apply diffs received while waiting for snapshot
+            pending_diffs, self._pending_diffs = self._pending_diffs, []
+            for diff in pending_diffs:
+                if not self._is_included_in_snapshot(diff):
+                    self._apply_diff(diff)
+
+    def apply_diff(self, diff):
+        with self.lock:
+            if not self.is_synced:
+                self._pending_diffs.append(diff)
+                return
+            self._apply_diff(diff)
+
+    def reset(self):
+        # Wait for a new snapshot
+        with self.lock:
+            self.is_synced = False
+            self._pending_diffs = []
+
+    def _apply_diff(self, diff):
+        for side, diff_side in ((self.asks, diff.asks), (self.bids, diff.bids)):
+            if diff_side:
+                for index in range(len(diff_side)):
+                    side.set_level(diff_side.get_price(index), diff_side.get_amount(index),
+                                   diff_side.order_counts[index] if diff_side.order_counts else None)
+        if diff.item_id is not None:
+            self.item_id = diff.item_id
+        self._set_timestamp(diff.timestamp)
+
+    def _set_timestamp(self, timestamp):
+        if timestamp:
+            self.timestamp = self.asks.timestamp = self.bids.timestamp = timestamp
+
+    def _is_included_in_snapshot(self, diff):
+        if diff.item_id is None or self.item_id is None:
+            return False
+        try:
+            return int(diff.item_id) <= int(self.item_id)
+        except ValueError:
+            return False
+
+
+class OrderBookManager:
+    """
+    Subscribes to order book diffs with WSClient and maintains LocalOrderBook
+    for each (platform_id, symbol). Each book is seeded with a REST snapshot.
+    """
+
+    # Settings:
+    snapshot_limit = None  # Levels in REST snapshot (None - platform's default)
+    is_use_max_limit = True
+
+    def __init__(self, ws_client, rest_client) -> None:
+        super().__init__()
+        self.ws_client = ws_client
+        self.rest_client = rest_client
+        self.platform_id = ws_client.platform_id
+
+        platform_name = Platform.get_platform_name_by_id(self.platform_id)
+        self.logger = logging.getLogger("%s.%s" % ("OrderBookManager", platform_name))
+
+        self._order_book_by_key = {}
+        self._lock = RLock()
+
+        # Chain callbacks
+        self._prev_on_data_item = ws_client.on_data_item
+        self._prev_on_connect = ws_client.on_connect
+        ws_client.on_data_item = self._on_data_item
+        ws_client.on_connect = self._on_connect
+
+    def subscribe(self, symbols):
+        for symbol in symbols:
+            self._get_or_create_order_book(symbol)
+        # (Subscribe first to buffer diffs received while snapshots are loading)
+        self.ws_client.subscribe([Endpoint.ORDER_BOOK_DIFF], symbols)
+        for symbol in symbols:
+            self.load_snapshot(symbol)
+
+    def unsubscribe(self, symbols):
+        self.ws_client.unsubscribe([Endpoint.ORDER_BOOK_DIFF], symbols)
+        with self._lock:
+            for symbol in symbols:
+                self._order_book_by_key.pop((self.platform_id, symbol), None)
+
+    def get_order_book(self, symbol, platform_id=None):
+        return self._order_book_by_key.get((platform_id or self.platform_id, symbol))
+
+    def load_snapshot(self, symbol):
+        order_book = self._get_or_create_order_book(symbol)
+        snapshot = self.rest_client.fetch_order_book(symbol, self.snapshot_limit, self.is_use_max_limit)
+        if not snapshot or isinstance(snapshot, Error):
+            self.logger.error("Cannot load order book snapshot for symbol: %s error: %s", symbol, snapshot)
+            return False
+        order_book.apply_snapshot(snapshot)
+        return True
+
+    def resync(self):
+        # Reload all snapshots (after reconnection some diffs could be lost)
+        for (platform_id, symbol), order_book in list(self._order_book_by_key.items()):
+            order_book.reset()
+        for (platform_id, symbol), order_book in list(self._order_book_by_key.items()):
+            self.load_snapshot(symbol)
+
+    def _get_or_create_order_book(self, symbol):
+        key = (self.platform_id, symbol)
+        with self._lock:
+            order_book = self._order_book_by_key.get(key)
+            if not order_book:
+                self._order_book_by_key[key] = order_book = LocalOrderBook(
+                    self.platform_id, symbol, self.ws_client.use_milliseconds)
+        return order_book
+
+    def _on_data_item(self, item):
+        if isinstance(item, OrderBook):
+            order_book = self._order_book_by_key.get((self.platform_id, item.symbol))
+            if order_book:
+                order_book.apply_diff(item)
+
+        if self._prev_on_data_item:
+            self._prev_on_data_item(item)
+
+    def _on_connect(self):
+        if self._prev_on_connect:
+            self._prev_on_connect()
+
+        # (Snapshots are loaded on subscribe(), so only reconnections are handled here)
+        if any(order_book.is_synced for order_book in self._order_book_by_key.values()):
+            # (Not in socket's thread to buffer diffs while loading snapshots)
+            thread = Thread(target=self.resync)
+            thread.daemon = True
+            thread.start()
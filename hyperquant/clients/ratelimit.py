@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from threading import Lock
+
+"""
+Token-bucket rate limiter shared by REST clients of a platform.
+
+Tokens are refilled with rate_per_sec up to capacity (burst). Each request takes
+its weight in tokens. If there is not enough tokens, the request is paced: it waits
+until the tokens are refilled. Waiting time is reserved under the lock and slept
+outside of it, so the limiter can be used both from threads and from asyncio tasks:
+
+    rate_limiter = RateLimiter(10, capacity=20)
+    rate_limiter.acquire(weight)  # in threads
+    await rate_limiter.acquire_async(weight)  # in coroutines
+
+After rate limit errors platform clients return a delay from _on_response(), which is
+applied with penalize(): all requests wait for the delay before continuing. Errors in
+a row are counted by add_error() (under the same lock, as responses come from many
+threads), so that the delay can grow with each next error.
+"""
+
+
+class RateLimiter:
+    # (rate_per_sec=None - no pacing, only penalize() delays are applied)
+
+    def __init__(self, rate_per_sec=None, capacity=None, name=None) -> None:
+        super().__init__()
+        self.rate_per_sec = rate_per_sec
+        self.capacity = capacity or rate_per_sec or 1
+        self.name = name
+
+        # State:
+        self._lock = Lock()
+        self._tokens = self.capacity
+        # (Time from which tokens are refilled. In future after penalize())
+        self._updated_at = time.monotonic()
+        # (Rate limit errors in a row, reset by reset_errors() on successful response)
+        self._error_in_row_count = 0
+
+        # Metrics:
+        self.request_count = 0
+        self.total_weight = 0
+        self.wait_count = 0
+        self.total_wait_sec = 0
+        self.max_wait_sec = 0
+        self.penalty_count = 0
+        self.error_count = 0
+
+        self.logger = logging.getLogger("%s.%s" % ("RateLimiter", name))
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def acquire(self, weight=1):
+        # Returns waited seconds
+        wait_sec = self.reserve(weight)
+        if wait_sec > 0:
+            time.sleep(wait_sec)
+        return wait_sec
+
+    async def acquire_async(self, weight=1):
+        wait_sec = self.reserve(weight)
+        if wait_sec > 0:
+            await asyncio.sleep(wait_sec)
+        return wait_sec
+
+    def reserve(self, weight=1):
+        # Take tokens (in advance if there is not enough) and return seconds to wait before the request
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait_sec = max(self._updated_at - now, 0)
+            if self.rate_per_sec:
+                self._tokens -= weight
+                if self._tokens < 0:
+                    wait_sec += -self._tokens / self.rate_per_sec
+
+            self.request_count += 1
+            self.total_weight += weight
+            if wait_sec > 0:
+                self.wait_count += 1
+                self.total_wait_sec += wait_sec
+                self.max_wait_sec = max(self.max_wait_sec, wait_sec)
+        return wait_sec
+
+    def penalize(self, delay_sec):
+        # No requests during delay_sec, and then start with empty bucket
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._updated_at = max(self._updated_at, now + delay_sec)
+            self._tokens = min(self._tokens, 0)
+            self.penalty_count += 1
+        self.logger.warning("Requests are delayed for %s sec", delay_sec)
+
+    def add_error(self):
+        # Returns the number of errors in a row including this one
+        with self._lock:
+            self._error_in_row_count += 1
+            self.error_count += 1
+            return self._error_in_row_count
+
+    def reset_errors(self):
+        with self._lock:
+            self._error_in_row_count = 0
+
+    def _refill(self, now):
+        if now <= self._updated_at:
+            return
+        if self.rate_per_sec:
+            self._tokens = min(self._tokens + (now - self._updated_at) * self.rate_per_sec, self.capacity)
+        self._updated_at = now
+
+    def get_metrics(self):
+        return {
+            "tokens": self.tokens,
+            "request_count": self.request_count,
+            "total_weight": self.total_weight,
+            "wait_count": self.wait_count,
+            "total_wait_sec": self.total_wait_sec,
+            "max_wait_sec": self.max_wait_sec,
+            "penalty_count": self.penalty_count,
+            "error_count": self.error_count,
+            "error_in_row_count": self._error_in_row_count,
+        }
+
+    def __repr__(self) -> str:
+        return "[%s-%s rate:%s/s capacity:%s]" % (self.__class__.__name__, self.name, self.rate_per_sec,
+                                                 self.capacity)
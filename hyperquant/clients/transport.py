@@ -0,0 +1,66 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+"""
+HTTP transport shared by REST clients.
+
+requests.Session with connection pools per host (HTTPAdapter), keep-alive and gzip.
+Sharing one transport between clients (public and private clients of a platform,
+clients of different platforms) lets them reuse connections instead of opening
+new ones and repeating TLS handshakes:
+
+    transport = HTTPTransport(pool_maxsize=32)
+    rest_client = OkexRESTClient(transport=transport)
+    private_rest_client = OkexRESTClient(api_key, api_secret, transport=transport)
+
+pool_maxsize should be not less than the number of threads sending requests to a host
+(see PlatformRESTClient.max_workers), otherwise connections over it are discarded after use.
+"""
+
+
+class HTTPTransport:
+    # Settings:
+    # Number of hosts to keep pools for
+    pool_connections = 10
+    # Connections kept per host
+    pool_maxsize = 32
+    # True - wait for a free connection instead of opening a new one over pool_maxsize
+    pool_block = False
+    max_retries = 0
+
+    default_headers = {
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    }
+
+    def __init__(self, pool_connections=None, pool_maxsize=None, pool_block=None, max_retries=None) -> None:
+        super().__init__()
+        if pool_connections is not None:
+            self.pool_connections = pool_connections
+        if pool_maxsize is not None:
+            self.pool_maxsize = pool_maxsize
+        if pool_block is not None:
+            self.pool_block = pool_block
+        if max_retries is not None:
+            self.max_retries = max_retries
+
+        self.session = self._create_session()
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              max_retries=self.max_retries, pool_block=self.pool_block)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.default_headers)
+        return session
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __repr__(self) -> str:
+        return "[%s pool_connections:%s pool_maxsize:%s]" % (self.__class__.__name__, self.pool_connections,
+                                                             self.pool_maxsize)
@@ -1,9 +1,13 @@
+from threading import Lock
+
 from django.conf import settings
 
 from hyperquant.api import Platform
 from hyperquant.clients.binance import BinanceRESTClient, BinanceWSClient
 from hyperquant.clients.bitfinex import BitfinexRESTClient, BitfinexWSClient
 from hyperquant.clients.bitmex import BitMEXRESTClient, BitMEXWSClient
+from hyperquant.clients.okex import OkexRESTClient, OkexWSClient
+from hyperquant.clients.transport import HTTPTransport
 
 # temp
 # if not settings.configured:
@@ -15,18 +19,26 @@ _rest_client_class_by_platform_id = {
     Platform.BINANCE: BinanceRESTClient,
     Platform.BITFINEX: BitfinexRESTClient,
     Platform.BITMEX: BitMEXRESTClient,
+    Platform.OKEX: OkexRESTClient,
 }
 
 _ws_client_class_by_platform_id = {
     Platform.BINANCE: BinanceWSClient,
     Platform.BITFINEX: BitfinexWSClient,
     Platform.BITMEX: BitMEXWSClient,
+    Platform.OKEX: OkexWSClient,
 }
 
 _rest_client_by_platform_id = {}
 _private_rest_client_by_platform_id = {}
 _ws_client_by_platform_id = {}
 _private_ws_client_by_platform_id = {}
+# (Rate limit is usually for IP, so it's shared by all REST clients of a platform)
+_rate_limiter_by_platform_id = {}
+# (Connection pools by host are inside, so one transport is enough for all platforms)
+_transport = None
+# (Clients can be created from many threads, and there should be only one limiter and transport)
+_lock = Lock()
 
 
 def create_rest_client(platform_id, is_private=False, version=None):
@@ -55,12 +67,14 @@ def _create_client(platform_id, is_rest, is_private=False, version=None):
     # Create
     class_lookup = _rest_client_class_by_platform_id if is_rest else _ws_client_class_by_platform_id
     client_class = class_lookup.get(platform_id)
+    kwargs = {"rate_limiter": get_or_create_rate_limiter(platform_id),
+              "transport": get_or_create_transport()} if is_rest else {}
     if is_private:
         api_key, api_secret = get_credentials_for(platform_id)
-        client = client_class(api_key, api_secret, version)
+        client = client_class(api_key, api_secret, version, **kwargs)
         client.platform_id = platform_id  # If not set in class
     else:
-        client = client_class(version=version)
+        client = client_class(version=version, **kwargs)
         client.platform_id = platform_id  # If not set in class
 
         # For Binance's "historicalTrades" endpoint
@@ -70,6 +84,23 @@ def _create_client(platform_id, is_rest, is_private=False, version=None):
     return client
 
 
+def get_or_create_rate_limiter(platform_id):
+    with _lock:
+        rate_limiter = _rate_limiter_by_platform_id.get(platform_id)
+        if not rate_limiter:
+            client_class = _rest_client_class_by_platform_id.get(platform_id)
+            _rate_limiter_by_platform_id[platform_id] = rate_limiter = client_class.create_rate_limiter()
+    return rate_limiter
+
+
+def get_or_create_transport():
+    global _transport
+    with _lock:
+        if not _transport:
+            _transport = HTTPTransport()
+    return _transport
+
+
 def _get_or_create_client(platform_id, is_rest, is_private=False):
     # Get
     if is_rest:
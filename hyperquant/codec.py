@@ -0,0 +1,123 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+"""
+JSON codec for decoding WS messages and REST responses and encoding API responses.
+
+The fastest installed backend is selected on import (orjson, ujson, stdlib json).
+Use set_default_codec() at configuration time to choose another one:
+
+    from hyperquant import codec
+    codec.set_default_codec("json")
+    data = codec.loads(b'{"a": 1}')  # str, bytes, bytearray and memoryview are accepted
+
+All backends raise ValueError (or its subclass) for wrong JSON.
+"""
+
+
+def _default(obj):
+    # Types which are not JSON serializable by default (same output as DjangoJSONEncoder)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    raise TypeError("Object of type %s is not JSON serializable" % obj.__class__.__name__)
+
+
+class JSONCodec:
+    # stdlib json (always available)
+    name = "json"
+
+    def loads(self, data):
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        # (json.loads() detects encoding of bytes by itself)
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=_default)
+
+    def dumps_bytes(self, obj):
+        return self.dumps(obj).encode("utf-8")
+
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    def loads(self, data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # (orjson doesn't support integers over 64 bit, so try stdlib before raising)
+            return super().loads(data)
+
+    def dumps(self, obj):
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class UjsonCodec(JSONCodec):
+    name = "ujson"
+
+    def loads(self, data):
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return ujson.loads(data)
+
+    def dumps(self, obj):
+        # (Falls back to stdlib for types ujson cannot serialize: Decimal, datetime, etc.)
+        try:
+            return ujson.dumps(obj)
+        except TypeError:
+            return super().dumps(obj)
+
+
+codec_class_by_name = {
+    JSONCodec.name: JSONCodec,
+}
+if ujson:
+    codec_class_by_name[UjsonCodec.name] = UjsonCodec
+if orjson:
+    codec_class_by_name[OrjsonCodec.name] = OrjsonCodec
+# (The first available is used by default)
+preferred_codec_names = [OrjsonCodec.name, UjsonCodec.name, JSONCodec.name]
+
+
+def create_codec(name=None):
+    # Returns the fastest available codec if name is None
+    if name is None:
+        name = next(name for name in preferred_codec_names if name in codec_class_by_name)
+    if name not in codec_class_by_name:
+        raise Exception("JSON codec %s is not available. Available: %s" % (name, list(codec_class_by_name)))
+    return codec_class_by_name[name]()
+
+
+def set_default_codec(name=None):
+    global default_codec, loads, dumps, dumps_bytes
+
+    default_codec = create_codec(name)
+    # (Module functions are bound to the default codec's methods to avoid extra call on hot paths)
+    loads = default_codec.loads
+    dumps = default_codec.dumps
+    dumps_bytes = default_codec.dumps_bytes
+    return default_codec
+
+
+default_codec = None
+loads = None
+dumps = None
+dumps_bytes = None
+set_default_codec()
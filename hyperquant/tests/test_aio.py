@@ -0,0 +1,309 @@
+import asyncio
+import json
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+from unittest import TestCase
+
+from aiohttp import web
+from urllib.parse import urlparse, parse_qs
+
+from hyperquant.api import ParamName, Interval, Endpoint
+from hyperquant.clients import Trade, Candle, Error, Order
+from hyperquant.clients.cache import ResponseCache
+from hyperquant.clients.okex import OkexRESTClient, AsyncOkexRESTClient, AsyncOkexWSClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # {path: response_data}
+    response_data_by_path = {
+        "/api/v1/trades.do": [
+            {"date": 1548374520, "date_ms": 1548374520123, "amount": "1.5", "price": "0.01", "type": "buy",
+             "tid": 123},
+            {"date": 1548374521, "date_ms": 1548374521456, "amount": "2", "price": "0.02", "type": "sell",
+             "tid": 124},
+        ],
+        "/api/v1/kline.do": [
+            [1548374520000, "0.00910763", "0.00911616", "0.00910763", "0.00911616", "98.904574"],
+        ],
+    }
+    requests = []
+    delay_sec = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        time.sleep(self.delay_sec)
+        self.requests.append((url.path, parse_qs(url.query)))
+        data = self.response_data_by_path.get(url.path) \
+            if parse_qs(url.query).get("symbol") != ["wrong_symbol"] else None
+        self.send_response(200 if data else 404)
+        self.send_header("Content-Type", "application/json" if data else "text/html")
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode("utf-8") if data else b"<html>Not found</html>")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncRESTClient(TestCase):
+    server = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(("127.0.0.1", 0), StubHandler)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def _create_client(self, client_class):
+        client = client_class()
+        client.converter.base_url = "http://127.0.0.1:%s/api/v{version}/" % self.server.server_port
+        return client
+
+    def test_same_result_as_sync(self):
+        StubHandler.requests = []
+        sync_client = self._create_client(OkexRESTClient)
+        expected_trades = sync_client.fetch_trades_history("eth_btc", limit=2)
+        expected_candles = sync_client.fetch_candles("eth_btc", Interval.MIN_1)
+        sync_client.close()
+
+        async def fetch():
+            async with self._create_client(AsyncOkexRESTClient) as client:
+                return await asyncio.gather(client.fetch_trades_history("eth_btc", limit=2),
+                                            client.fetch_candles("eth_btc", Interval.MIN_1))
+
+        trades, candles = asyncio.run(fetch())
+
+        self.assertIsInstance(trades[0], Trade)
+        self.assertEqual(expected_trades, trades)
+        self.assertEqual("eth_btc", trades[0].symbol)
+        self.assertIsInstance(candles[0], Candle)
+        self.assertEqual(expected_candles, candles)
+        # (Same requests are sent)
+        sync_requests, async_requests = StubHandler.requests[-4:-2], StubHandler.requests[-2:]
+        self.assertEqual(sorted(map(repr, sync_requests)), sorted(map(repr, async_requests)))
+
+    def test_error(self):
+        async def fetch():
+            async with self._create_client(AsyncOkexRESTClient) as client:
+                client.converter.endpoint_lookup = dict(client.converter.endpoint_lookup,
+                                                        **{ParamName.SYMBOLS: "unknown.do"})
+                return await client._send("GET", ParamName.SYMBOLS)
+
+        result = asyncio.run(fetch())
+
+        self.assertIsInstance(result, Error)
+        self.assertEqual(404, result.code)
+
+    def test_fan_out(self):
+        symbols = ["eth_btc", "ltc_btc", "wrong_symbol", "eth_btc"]
+        sync_client = self._create_client(OkexRESTClient)
+        expected = sync_client.fetch_candles_for_symbols(symbols, Interval.MIN_1, max_workers=2)
+        sync_client.close()
+
+        async def fetch():
+            async with self._create_client(AsyncOkexRESTClient) as client:
+                return await client.fetch_candles_for_symbols(symbols, Interval.MIN_1, max_workers=2)
+
+        result = asyncio.run(fetch())
+
+        for candles_by_symbol in (expected, result):
+            self.assertEqual(["eth_btc", "ltc_btc", "wrong_symbol"], list(candles_by_symbol))
+            self.assertEqual("ltc_btc", candles_by_symbol["ltc_btc"][0].symbol)
+            self.assertIsInstance(candles_by_symbol["wrong_symbol"], Error)
+        self.assertEqual(expected["eth_btc"], result["eth_btc"])
+
+    def test_iter_candles(self):
+        async def iterate():
+            async with self._create_client(AsyncOkexRESTClient) as client:
+                return [candle async for candle in client.iter_candles("eth_btc", Interval.MIN_1)]
+
+        result = asyncio.run(iterate())
+
+        # (Stub returns the same page for any from_time, so there is nothing new on the second page)
+        self.assertEqual(1, len(result))
+        self.assertIsInstance(result[0], Candle)
+
+    def test_cache(self):
+        StubHandler.requests = []
+        client = self._create_client(OkexRESTClient)
+        client.cache = ResponseCache()
+
+        candles = client.fetch_candles("eth_btc", Interval.MIN_1)
+        cached_candles = client.fetch_candles("eth_btc", Interval.MIN_1)
+        client.fetch_candles("ltc_btc", Interval.MIN_1)
+        client.close()
+
+        self.assertEqual(candles, cached_candles)
+        # (New objects for each call)
+        self.assertIsNot(candles[0], cached_candles[0])
+        self.assertEqual(2, len(StubHandler.requests))
+        self.assertEqual(1, client.cache.hit_count)
+
+    def test_coalescing(self):
+        StubHandler.requests = []
+        StubHandler.delay_sec = 0.2
+        client = self._create_client(OkexRESTClient)
+        async_client = self._create_client(AsyncOkexRESTClient)
+        client.is_coalescing = async_client.is_coalescing = True
+
+        async def fetch_all():
+            async with async_client:
+                return await asyncio.gather(*[async_client.fetch_candles("eth_btc", Interval.MIN_1)
+                                              for _ in range(5)])
+
+        try:
+            with ThreadPoolExecutor(5) as executor:
+                results = list(executor.map(lambda _: client.fetch_candles("eth_btc", Interval.MIN_1), range(5)))
+            async_results = asyncio.run(fetch_all())
+            # (Nothing is kept after the request is finished)
+            client.fetch_candles("eth_btc", Interval.MIN_1)
+        finally:
+            StubHandler.delay_sec = 0
+            client.close()
+
+        self.assertEqual(3, len(StubHandler.requests))
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertTrue(all(result is async_results[0] for result in async_results))
+        self.assertEqual(results[0], async_results[0])
+        self.assertEqual({"call_count": 2, "coalesced_count": 4}, client.coalescer.get_metrics())
+        self.assertEqual({"call_count": 1, "coalesced_count": 4}, async_client.coalescer.get_metrics())
+
+    def test_batch_orders(self):
+        class Client(AsyncOkexRESTClient):
+            async def cancel_order(self, order, symbol=None, version=None, **kwargs):
+                await asyncio.sleep(0.05 if order == "1" else 0.01)
+                return Order(symbol=symbol, item_id=order)
+
+            async def fetch_orders(self, symbol=None, limit=None, from_item=None, is_open=False, version=None,
+                                   **kwargs):
+                return [Order(symbol="eth_btc", item_id="1"), Order(symbol="ltc_btc", item_id="2")]
+
+        async def cancel():
+            async with Client() as client:
+                return await client.cancel_orders(["1", "2"], "eth_btc"), await client.cancel_all()
+
+        result, all_result = asyncio.run(cancel())
+
+        self.assertEqual(["1", "2"], [order.item_id for order in result])
+        self.assertEqual([("1", "eth_btc"), ("2", "ltc_btc")], [(order.item_id, order.symbol) for order in all_result])
+
+    def test_batch_orders_with_batch_hook(self):
+        class Client(AsyncOkexRESTClient):
+            async def cancel_order(self, order, symbol=None, version=None, **kwargs):
+                return Order(symbol=symbol, item_id=order)
+
+            async def _cancel_orders_batch(self, orders, symbol=None, version=None, **kwargs):
+                # (Not supported for other symbols)
+                if symbol != "ltc_btc":
+                    return None
+                await asyncio.sleep(0.01)
+                return [Order(symbol=symbol, item_id="b" + order) for order in orders]
+
+        async def cancel():
+            async with Client() as client:
+                return await client.cancel_orders(["1", "2"], "ltc_btc"), await client.cancel_orders(["3"], "eth_btc")
+
+        batch_result, result = asyncio.run(cancel())
+
+        self.assertEqual(["b1", "b2"], [order.item_id for order in batch_result])
+        self.assertEqual([("3", "eth_btc")], [(order.item_id, order.symbol) for order in result])
+
+
+class TestAsyncWSClient(TestCase):
+    # (Stub of OKEx WebSocket: sends a compressed trade for each added channel)
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connection_count += 1
+        async for message in ws:
+            commands = json.loads(message.data)
+            self.commands.append(commands)
+            data = []
+            for command in commands:
+                data.append({"channel": command["event"], "data": {"result": True, "channel": command["channel"]}})
+                if command["event"] == "addChannel":
+                    data.append({"channel": command["channel"],
+                                 "data": [["123", "0.031", "1.5", "12:00:01", "bid"]]})
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            await ws.send_bytes(compressor.compress(json.dumps(data).encode("utf-8")) + compressor.flush())
+        return ws
+
+    async def _start_server(self):
+        app = web.Application()
+        app.router.add_get("/", self._handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        return runner, "ws://127.0.0.1:%s/" % runner.addresses[0][1]
+
+    def test_subscribe(self):
+        self.commands = []
+        self.connection_count = 0
+
+        async def run():
+            runner, url = await self._start_server()
+            clients = [AsyncOkexWSClient(max_subscriptions_per_connection=None) for _ in range(2)]
+            received = []
+            try:
+                for client, symbol in zip(clients, ["eth_btc", "ltc_btc"]):
+                    client.converter.base_url = url
+                    client.on_data_item = received.append
+                    client.subscribe([Endpoint.TRADE], [symbol])
+                items = []
+                async for item in clients[0].iter_items():
+                    items.append(item)
+                    break
+                await asyncio.sleep(0.1)
+            finally:
+                for client in clients:
+                    await client.aclose()
+                await runner.cleanup()
+            return items, received, clients
+
+        items, received, clients = asyncio.run(run())
+
+        # (Both connections in one event loop)
+        self.assertEqual(2, self.connection_count)
+        self.assertIsInstance(items[0], Trade)
+        self.assertEqual("eth_btc", items[0].symbol)
+        self.assertEqual(["eth_btc", "ltc_btc"], sorted(item.symbol for item in received))
+        self.assertEqual(2, len(self.commands))
+        self.assertEqual({"ok_sub_spot_eth_btc_deals"}, clients[0].successful_subscriptions)
+        self.assertFalse(clients[0].is_started)
+        self.assertFalse(clients[0].is_connected)
+
+    def test_sharding(self):
+        self.commands = []
+        self.connection_count = 0
+
+        async def run():
+            runner, url = await self._start_server()
+            client = AsyncOkexWSClient(max_subscriptions_per_connection=1)
+            client.converter.base_url = url
+            try:
+                client.subscribe([Endpoint.TRADE], ["eth_btc", "ltc_btc"])
+                items = []
+                async for item in client.iter_items():
+                    items.append(item)
+                    if len(items) == 2:
+                        break
+            finally:
+                await client.aclose()
+                await runner.cleanup()
+            return items, client
+
+        items, client = asyncio.run(run())
+
+        self.assertEqual(2, self.connection_count)
+        self.assertEqual(["eth_btc", "ltc_btc"], sorted(item.symbol for item in items))
+        self.assertIsNone(client.shards)
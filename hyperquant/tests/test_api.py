@@ -1,8 +1,11 @@
+from decimal import Decimal
 from unittest import TestCase
 
 from hyperquant.api import item_format_by_endpoint, Endpoint, Direction, convert_items_obj_to_list, \
-    convert_items_dict_to_list, convert_items_list_to_dict, convert_items_obj_to_dict, ParamName
-from hyperquant.clients import Trade, ItemObject
+    convert_items_dict_to_list, convert_items_list_to_dict, convert_items_obj_to_dict, ParamName, \
+    FixedPointPrecision, to_fixed_point, from_fixed_point
+from hyperquant.api import OrderBookDirection
+from hyperquant.clients import Trade, ItemObject, OrderBookItem, OrderBookSide, TradeBatch
 
 
 class TestConverting(TestCase):
@@ -109,3 +112,83 @@ class TestConvertingTrade(TestConverting):
     list_item_short = [None, "ETHUSD", 143423531, "14121214"]
     dict_item_short = {ParamName.PLATFORM_ID: None, ParamName.SYMBOL: "ETHUSD",
                        ParamName.TIMESTAMP: 143423531, ParamName.ITEM_ID: "14121214"}
+
+
+class TestConvertingOrderBookSide(TestCase):
+    item_format = [ParamName.SYMBOL, ParamName.PRICE, ParamName.AMOUNT, ParamName.DIRECTION]
+
+    def test_convert_items_obj_to_list(self):
+        side = OrderBookSide(OrderBookDirection.ASK, [3601.5, 3600], [2, 1.5], symbol="ETHUSD")
+        items = [OrderBookItem(symbol="ETHUSD", price=3600, amount=1.5, direction=OrderBookDirection.ASK),
+                 OrderBookItem(symbol="ETHUSD", price=3601.5, amount=2, direction=OrderBookDirection.ASK)]
+
+        # (Side is converted as a list of its levels)
+        expected = [["ETHUSD", 3600, 1.5, OrderBookDirection.ASK], ["ETHUSD", 3601.5, 2, OrderBookDirection.ASK]]
+        self.assertEqual(expected, convert_items_obj_to_list(side, self.item_format))
+        self.assertEqual(convert_items_obj_to_list(items, self.item_format),
+                         convert_items_obj_to_list(side, self.item_format))
+        self.assertEqual(items, side)
+        result = convert_items_obj_to_list(OrderBookSide(OrderBookDirection.BID), self.item_format)
+        self.assertEqual([], result)
+        self.assertIsInstance(result, list)
+
+
+class TestConvertingItemBatch(TestCase):
+    item_format = [ParamName.SYMBOL, ParamName.ITEM_ID, ParamName.PRICE, ParamName.AMOUNT]
+
+    def test_convert_items_obj_to_list(self):
+        items = [Trade(symbol="eth_btc", timestamp=1000, item_id="1", price=0.03, amount=1.5),
+                 Trade(symbol="eth_btc", timestamp=1001, item_id="2", price=0.04, amount=2)]
+        batch = TradeBatch(symbol="eth_btc")
+        for item in items:
+            batch.append_item(item)
+
+        # (Batch is converted as a list of its rows)
+        expected = [["eth_btc", "1", 0.03, 1.5], ["eth_btc", "2", 0.04, 2]]
+        self.assertEqual(expected, convert_items_obj_to_list(batch, self.item_format))
+        self.assertEqual(convert_items_obj_to_dict(items, self.item_format),
+                         convert_items_obj_to_dict(batch, self.item_format))
+        self.assertEqual([], convert_items_obj_to_list(TradeBatch(symbol="eth_btc"), self.item_format))
+        with self.assertRaises(IndexError):
+            batch[2]
+
+
+class TestFixedPoint(TestCase):
+
+    def test_to_and_from_fixed_point(self):
+        self.assertEqual(3170250, to_fixed_point("0.0317025", 8))
+        self.assertEqual(3170250, to_fixed_point(0.0317025, 8))
+        self.assertEqual(1500, to_fixed_point(15, 2))
+        # (Rounded half to even)
+        self.assertEqual(2, to_fixed_point("0.025", 2))
+        self.assertIsNone(to_fixed_point(None, 8))
+
+        self.assertEqual(Decimal("0.0317025"), from_fixed_point(3170250, 8))
+        self.assertIsNone(from_fixed_point(None, 8))
+
+    def test_convert_items(self):
+        precision = FixedPointPrecision({"ETHUSD": (2, 4)})
+        item = Trade(symbol="ETHUSD", timestamp=143423531, item_id="1", price=23456, amount=11100034)
+        item_format = item_format_by_endpoint[Endpoint.TRADE]
+
+        result = convert_items_obj_to_dict(item, item_format, precision)
+        self.assertEqual(Decimal("234.56"), result[ParamName.PRICE])
+        self.assertEqual(Decimal("1110.0034"), result[ParamName.AMOUNT])
+        self.assertEqual("1", result[ParamName.ITEM_ID])
+
+        result = convert_items_obj_to_list([item], item_format, precision)
+        self.assertEqual([Decimal("234.56"), Decimal("1110.0034")], result[0][4:6])
+        # (Some properties are missing, so that list indexes differ from item_format)
+        dict_item = {ParamName.PLATFORM_ID: 1, ParamName.SYMBOL: "ETHUSD", ParamName.TIMESTAMP: 143423531,
+                     ParamName.PRICE: 23456, ParamName.AMOUNT: 11100034, ParamName.DIRECTION: Direction.BUY}
+        self.assertEqual([1, "ETHUSD", 143423531, Decimal("234.56"), Decimal("1110.0034"), Direction.BUY],
+                         convert_items_dict_to_list(dict_item, item_format, precision))
+        self.assertEqual([["ETHUSD", Decimal("234.56")]],
+                         convert_items_dict_to_list([{ParamName.SYMBOL: "ETHUSD", ParamName.PRICE: 23456}],
+                                                    item_format, precision))
+        short_item = ItemObject(symbol="ETHUSD", timestamp=143423531)
+        self.assertEqual([[None, "ETHUSD", 143423531, None]],
+                         convert_items_obj_to_list([short_item], item_format, precision))
+
+        # (Default precision for unknown symbols)
+        self.assertEqual(8, FixedPointPrecision().get_precision_for("ETHBTC", ParamName.PRICE))
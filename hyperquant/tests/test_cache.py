@@ -0,0 +1,57 @@
+import time
+from unittest import TestCase
+
+from hyperquant.api import Endpoint, Interval, ParamName
+from hyperquant.clients import Candle
+from hyperquant.clients.cache import ResponseCache
+from hyperquant.clients.okex import OkexRESTClient
+
+
+class TestResponseCache(TestCase):
+
+    def test_lru(self):
+        cache = ResponseCache(max_size_bytes=10)
+        cache.put("a", b"1234")
+        cache.put("b", b"1234")
+        self.assertEqual(b"1234", cache.get("a"))
+        # ("b" is least recently used)
+        cache.put("c", b"1234")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(b"1234", cache.get("a"))
+        self.assertEqual(b"1234", cache.get("c"))
+        # (Bigger than the cache)
+        cache.put("d", b"12345678901")
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual({"count": 2, "size_bytes": 8, "hit_count": 3, "miss_count": 2, "eviction_count": 1},
+                         cache.get_metrics())
+
+    def test_ttl(self):
+        cache = ResponseCache()
+        cache.put("a", b"1", ttl_sec=0.01)
+        cache.put("b", b"2")
+        self.assertEqual(b"1", cache.get("a"))
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(b"2", cache.get("b"))
+        self.assertEqual(1, cache.get_ttl(Endpoint.ORDER_BOOK))
+        self.assertFalse(cache.is_cached_endpoint(Endpoint.TRADE))
+
+    def test_closed_candles(self):
+        client = OkexRESTClient()
+        now = int(time.time())
+        closed_candles = [Candle(timestamp=now - 180, interval=Interval.MIN_1),
+                          Candle(timestamp=now - 120, interval=Interval.MIN_1)]
+        open_candles = closed_candles + [Candle(timestamp=now - 30, interval=Interval.MIN_1)]
+
+        params = {ParamName.TO_TIME: now - 60}
+
+        self.assertTrue(client._is_closed_candles(closed_candles, params))
+        self.assertTrue(client._is_closed_candles(list(reversed(closed_candles)), params))
+        self.assertTrue(client._is_closed_candles(closed_candles, {ParamName.TO_TIME: (now - 60) * 1000}, True))
+        self.assertFalse(client._is_closed_candles(open_candles, params))
+        self.assertFalse(client._is_closed_candles([], params))
+        # (Without end time or with end time in the future next requests can return more candles)
+        self.assertFalse(client._is_closed_candles(closed_candles, {}))
+        self.assertFalse(client._is_closed_candles(closed_candles, {ParamName.TO_TIME: now + 60}))
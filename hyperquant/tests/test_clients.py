@@ -0,0 +1,862 @@
+import json
+import time
+import zlib
+from threading import Thread, current_thread
+from unittest import TestCase
+from urllib.parse import urljoin
+
+from django.conf import settings
+
+from hyperquant.api import ParamName, Interval, Endpoint, OrderBookDirection, FixedPointPrecision, Sorting, \
+    OrderType, Direction, ErrorCode, item_format_by_endpoint, make_data_response
+from hyperquant.clients import Trade, Candle, TradeBatch, CandleBatch, OrderBook, OrderBookItem, OrderBookSide, \
+    RESTConverter, Error, Order, WSClient
+from hyperquant.clients.backfill import HistoryBackfill
+from hyperquant.clients.candles import CandleBuilder, get_interval_start, get_interval_end
+from hyperquant.clients.okex import OkexRESTConverterV1, OkexRESTClient, OkexWSClient, Inflater, inflate
+from hyperquant.clients.orderbook import LocalOrderBook
+from hyperquant.clients.ratelimit import RateLimiter
+
+
+class TestColumnarParsing(TestCase):
+    converter_class = OkexRESTConverterV1
+
+    candles_data = [
+        [1548374520000, "0.00910763", "0.00911616", "0.00910763", "0.00911616", "98.904574"],
+        [1548374580000, "0.00911616", "0.00911616", "0.00911000", "0.00911000", "1.5"],
+    ]
+    trades_data = [
+        {"date": 1548374520, "date_ms": 1548374520123, "amount": "1.5", "price": "0.01", "type": "buy", "tid": 123},
+        {"date": 1548374521, "date_ms": 1548374521456, "amount": "2", "price": "0.02", "type": "sell", "tid": 124},
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.converter = self.converter_class()
+
+    def test_parse_candles(self):
+        params = {ParamName.SYMBOL: "eth_btc", ParamName.INTERVAL: Interval.MIN_1}
+        items = self._parse("kline.do", self.candles_data, params)
+        self.converter.is_columnar = True
+        batch = self._parse("kline.do", self.candles_data, params)
+
+        self.assertIsInstance(batch, CandleBatch)
+        self.assertEqual(len(items), len(batch))
+        self.assertEqual("eth_btc", batch.symbol)
+        self.assertEqual(Interval.MIN_1, batch.interval)
+        self.assertEqual([float(item.amount) for item in items], list(batch.column(ParamName.AMOUNT)))
+        for item, row in zip(items, batch):
+            self.assertIsInstance(row, Candle)
+            self.assertEqual(item, row)
+            self.assertEqual(item.interval, row.interval)
+            self.assertEqual(float(item.price_close), row.price_close)
+        self.assertEqual(items[-1], batch[-1])
+
+    def test_parse_trades(self):
+        params = {ParamName.SYMBOL: "eth_btc"}
+        items = self._parse("trades.do", self.trades_data, params)
+        self.converter.is_columnar = True
+        batch = self._parse("trades.do", self.trades_data, params)
+
+        self.assertIsInstance(batch, TradeBatch)
+        self.assertEqual(items, batch.to_items())
+        self.assertEqual(["123", "124"], batch.column(ParamName.ITEM_ID))
+        for item, row in zip(items, batch):
+            self.assertIsInstance(row, Trade)
+            self.assertEqual(float(item.price), row.price)
+            self.assertEqual(item.direction, row.direction)
+
+    def test_parse_fixed_point(self):
+        params = {ParamName.SYMBOL: "eth_btc"}
+        self.converter.fixed_point_precision = FixedPointPrecision({"eth_btc": (8, 3)})
+        # (Precision is by symbol, so params are passed to parse() as BaseRESTClient does)
+        items = self._parse("trades.do", self.trades_data, params, True)
+        self.assertEqual([1000000, 2000000], [item.price for item in items])
+        self.assertEqual([1500, 2000], [item.amount for item in items])
+
+        self.converter.is_columnar = True
+        batch = self._parse("trades.do", self.trades_data, params, True)
+        self.assertEqual("q", batch.column(ParamName.PRICE).typecode)
+        self.assertEqual([1000000, 2000000], list(batch.column(ParamName.PRICE)))
+        self.assertEqual(items, batch.to_items())
+        self.assertEqual(1500, batch[0].amount)
+
+    def test_make_data_response_fixed_point(self):
+        if not settings.configured:
+            settings.configure()
+        params = {ParamName.SYMBOL: "eth_btc"}
+        precision = FixedPointPrecision({"eth_btc": (8, 3)})
+        self.converter.fixed_point_precision = precision
+        self.converter.is_columnar = True
+        batch = self._parse("trades.do", self.trades_data, params, True)
+        item_format = item_format_by_endpoint[Endpoint.TRADE]
+
+        # (Batch rows are converted back to decimals at the edge)
+        response = make_data_response(batch, item_format, fixed_point_precision=precision)
+        data = json.loads(response.content)["data"]
+        self.assertEqual(2, len(data))
+        self.assertEqual(["0.01000000", "1.500"], data[0][4:6])
+        self.assertEqual(["0.02000000", "2.000"], data[1][4:6])
+
+        response = make_data_response(batch, item_format, False, precision)
+        data = json.loads(response.content)["data"]
+        self.assertEqual(["124", "0.02000000", "2.000"],
+                         [data[1][ParamName.ITEM_ID], data[1][ParamName.PRICE], data[1][ParamName.AMOUNT]])
+        # (Single item is wrapped to a list)
+        response = make_data_response(batch[0], item_format, False, precision)
+        self.assertEqual("0.01000000", json.loads(response.content)["data"][0][ParamName.PRICE])
+
+    def test_parse_with_overridden_post_process_item(self):
+        class Converter(self.converter_class):
+            def _post_process_item(self, item, context=None):
+                item = super()._post_process_item(item, context)
+                item.item_id = "t" + item.item_id
+                return item
+
+        self.converter = Converter()
+        items = self._parse("trades.do", self.trades_data, {ParamName.SYMBOL: "eth_btc"}, True)
+        self.assertEqual(["t123", "t124"], [item.item_id for item in items])
+        self.assertEqual(["eth_btc", "eth_btc"], [item.symbol for item in items])
+
+    def test_parse_with_lookup_of_instance(self):
+        # (Objects are created by lookups of each converter, not of the first one of the class)
+        other_converter = self.converter_class()
+        other_converter.param_lookup_by_class = dict(other_converter.param_lookup_by_class)
+        other_converter.param_lookup_by_class[Trade] = dict(other_converter.param_lookup_by_class[Trade],
+                                                            tid=None, date_ms=ParamName.ITEM_ID)
+        params = {ParamName.SYMBOL: "eth_btc"}
+        items = self._parse("trades.do", self.trades_data, params, True)
+        self.converter = other_converter
+        other_items = self._parse("trades.do", self.trades_data, params, True)
+
+        self.assertEqual(["123", "124"], [item.item_id for item in items])
+        self.assertEqual(["1548374520123", "1548374521456"], [item.item_id for item in other_items])
+
+    def test_parse_with_timestamp_attr_of_instance(self):
+        # (Items are post-processed by settings of each converter, not of the first one of the class)
+        other_converter = self.converter_class()
+        other_converter.ITEM_TIMESTAMP_ATTR = "time"
+        params = {ParamName.SYMBOL: "eth_btc"}
+        items = self._parse("trades.do", self.trades_data, params, True)
+        self.converter = other_converter
+        other_items = self._parse("trades.do", self.trades_data, params, True)
+
+        self.assertEqual([1548374520.123, 1548374521.456], [item.timestamp for item in items])
+        # (Trade has no "time", so timestamps are not converted)
+        self.assertEqual([1548374520123, 1548374521456], [item.timestamp for item in other_items])
+
+    def _parse(self, endpoint, data, params, is_context=False):
+        result = self.converter.parse(endpoint, data, params if is_context else None)
+        return self.converter.post_process_result("GET", endpoint, params, result)
+
+
+class TestRequestBuilder(TestCase):
+
+    class Converter(RESTConverter):
+        base_url = "https://api.example.com/v{version}/"
+        version = "2"
+        endpoint_lookup = {
+            Endpoint.TRADE: "trades/{symbol}",
+            Endpoint.CANDLE: "candles",
+            Endpoint.TICKER: lambda params: "ticker/all" if not params.get(ParamName.SYMBOL) else "ticker",
+        }
+        param_name_lookup = {
+            ParamName.SYMBOL: "pair",
+            ParamName.FROM_TIME: "start",
+            ParamName.IS_USE_MAX_LIMIT: None,
+        }
+        param_value_lookup = {
+            Interval.MIN_1: "1m",
+            ParamName.SORTING: {Sorting.ASCENDING: 1},
+        }
+        is_source_in_milliseconds = True
+        timestamp_platform_names = ["start"]
+
+    def _make_url_and_platform_params_by_prepare_params(self, converter, endpoint, params):
+        # (As without request builders)
+        url = converter.base_url.format(version=converter.version)
+        url_resources, platform_params = converter.prepare_params(endpoint, params)
+        return (urljoin(url + "/", "/".join(url_resources)) if url_resources else url), platform_params
+
+    def test_make_url_and_platform_params(self):
+        converter = self.Converter()
+        requests = [
+            (Endpoint.TRADE, {ParamName.SYMBOL: "ETHBTC", ParamName.LIMIT: 10, ParamName.TO_TIME: None}),
+            (Endpoint.TRADE, {ParamName.SYMBOL: "LTCBTC", ParamName.SORTING: Sorting.ASCENDING}),
+            (Endpoint.CANDLE, {ParamName.SYMBOL: "ETHBTC", ParamName.INTERVAL: Interval.MIN_1,
+                               ParamName.FROM_TIME: 1548374520.5, ParamName.IS_USE_MAX_LIMIT: True}),
+            (Endpoint.TICKER, {}),
+            (Endpoint.TICKER, {ParamName.SYMBOL: "ETHBTC"}),
+        ]
+
+        for endpoint, params in requests * 2:
+            self.assertEqual(self._make_url_and_platform_params_by_prepare_params(converter, endpoint, params),
+                             converter.make_url_and_platform_params(endpoint, params))
+        self.assertEqual(("https://api.example.com/v2/candles", {"pair": "ETHBTC", "interval": "1m",
+                                                               "start": 1548374520500}),
+                         converter.make_url_and_platform_params(Endpoint.CANDLE, requests[2][1]))
+        self.assertEqual(3, len(converter._request_builder_by_key))
+
+        # (base_url of an instance can be changed)
+        converter.base_url = "http://127.0.0.1/v{version}/"
+        self.assertEqual("http://127.0.0.1/v2/candles?pair=ETHBTC",
+                         converter.make_url_and_platform_params(Endpoint.CANDLE, {ParamName.SYMBOL: "ETHBTC"},
+                                                                is_join_get_params=True)[0])
+
+    def test_overridden_methods(self):
+        # (OKEx converts FROM_ITEM with _process_param_value())
+        converter = OkexRESTConverterV1()
+        params = {ParamName.SYMBOL: "eth_btc", ParamName.FROM_ITEM: Trade(item_id="123")}
+
+        self.assertEqual(("https://www.okex.com/api/v1/trades.do", {"symbol": "eth_btc", "since": "123"}),
+                         converter.make_url_and_platform_params("trades.do", params, version="1"))
+
+
+class TestInflater(TestCase):
+
+    def _deflate(self, data):
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def test_inflate(self):
+        inflater = Inflater()
+        small, big = b'[{"channel": "addChannel"}]', b"[" + b", ".join([b'["123", "0.031", "1.5"]'] * 5000) + b"]"
+
+        results = [inflater.inflate(self._deflate(data)) for data in (small, big, small, big)]
+
+        self.assertEqual([small, big, small, big], results)
+        self.assertEqual(big, inflate(self._deflate(big)))
+        # (Buffer is preallocated for the biggest message)
+        self.assertEqual(len(big) + 1, inflater._buffer_size)
+        metrics = inflater.get_metrics()
+        self.assertEqual(4, metrics["message_count"])
+        self.assertEqual(2 * (len(self._deflate(small)) + len(self._deflate(big))), metrics["bytes_in"])
+        self.assertEqual(2 * (len(small) + len(big)), metrics["bytes_out"])
+        self.assertGreater(metrics["total_time_sec"], 0)
+
+    def test_inflater_per_connection(self):
+        client = OkexWSClient()
+        received = []
+        client.on_item_received = received.append
+
+        client._on_message(self._deflate(b'[{"channel": "ok_sub_spot_eth_btc_deals", '
+                                         b'"data": [["123", "0.031", "1.5", "12:00:01", "bid"]]}]'))
+
+        self.assertEqual("eth_btc", received[0].symbol)
+        self.assertEqual(1, client.inflater.message_count)
+        self.assertIsNot(client.inflater, OkexWSClient().inflater)
+
+
+class TestOrderBookSide(TestCase):
+
+    def test_asks(self):
+        asks = OrderBookSide(OrderBookDirection.ASK, [3.0, 1.0, 2.0], [30.0, 10.0, 20.0], symbol="eth_btc")
+
+        self.assertEqual((1.0, 10.0), asks.best)
+        self.assertEqual([(1.0, 10.0), (2.0, 20.0)], asks.top(2))
+        self.assertEqual([10.0, 30.0, 60.0], asks.get_cumulative_amounts())
+        self.assertEqual(30.0, asks.get_cumulative_amount(price=2.5))
+        self.assertEqual(30.0, asks.get_cumulative_amount(count=2))
+        self.assertEqual(3, len(asks))
+
+        items = list(asks)
+        self.assertIsInstance(items[0], OrderBookItem)
+        self.assertEqual([1.0, 2.0, 3.0], [item.price for item in items])
+        self.assertEqual(OrderBookDirection.ASK, items[0].direction)
+        self.assertEqual("eth_btc", items[0].symbol)
+        self.assertEqual(3.0, asks[-1].price)
+
+    def test_bids(self):
+        bids = OrderBookSide(OrderBookDirection.BID, [1.0, 3.0, 2.0], [10.0, 30.0, 20.0])
+
+        self.assertEqual((3.0, 30.0), bids.best)
+        self.assertEqual([(3.0, 30.0), (2.0, 20.0)], bids.top(2))
+        self.assertEqual(50.0, bids.get_cumulative_amount(price=2.0))
+        self.assertEqual([3.0, 2.0, 1.0], [item.price for item in bids])
+
+    def test_parse(self):
+        class Converter(RESTConverter):
+            param_lookup_by_class = {
+                OrderBook: {"asks": ParamName.ASKS, "bids": ParamName.BIDS},
+                OrderBookItem: [ParamName.PRICE, ParamName.AMOUNT],
+            }
+
+        order_book = Converter().parse(Endpoint.ORDER_BOOK, {"asks": [["1.5", "2"], ["1.6", "3"]],
+                                                             "bids": [["1.4", "1"], ["1.3", "5"]]},
+                                       {ParamName.SYMBOL: "eth_btc"})
+
+        self.assertIsInstance(order_book.asks, OrderBookSide)
+        self.assertEqual((1.5, 2.0), order_book.best_ask)
+        self.assertEqual((1.4, 1.0), order_book.best_bid)
+        self.assertAlmostEqual(0.1, order_book.spread)
+        self.assertEqual("eth_btc", order_book.bids[0].symbol)
+
+
+class TestLocalOrderBook(TestCase):
+
+    def test_apply_snapshot_and_diffs(self):
+        order_book = LocalOrderBook(symbol="eth_btc")
+        # (Received before snapshot)
+        order_book.apply_diff(self._make_order_book("10", [(1.5, 0)], []))
+        order_book.apply_diff(self._make_order_book("12", [(1.55, 4)], [(1.45, 2)]))
+        self.assertFalse(order_book.is_synced)
+
+        order_book.apply_snapshot(self._make_order_book("11", [(1.6, 3)], [(1.4, 1)]))
+        self.assertTrue(order_book.is_synced)
+        self.assertEqual((1.55, 4), order_book.best_ask)
+        self.assertEqual((1.45, 2), order_book.best_bid)
+
+        order_book.apply_diff(self._make_order_book("13", [(1.55, 0)], [(1.4, 5)]))
+        self.assertEqual((1.6, 3), order_book.best_ask)
+        self.assertEqual([(1.45, 2), (1.4, 5)], order_book.bids.top(5))
+        self.assertEqual((3, 7), order_book.get_depth())
+        self.assertEqual("13", order_book.item_id)
+
+    def test_readers_wait_for_diff(self):
+        order_book = LocalOrderBook(symbol="eth_btc")
+        order_book.apply_snapshot(self._make_order_book("1", [(1.6, 3)], [(1.4, 1)]))
+        result = []
+        thread = Thread(target=lambda: result.append((order_book.spread, order_book.asks.top(5))))
+
+        # (As if a diff is being applied in another thread)
+        with order_book.lock:
+            thread.start()
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+            order_book.asks.set_level(1.5, 2)
+            order_book.bids.set_level(1.45, 1)
+        thread.join(1)
+
+        self.assertEqual(1, len(result))
+        self.assertAlmostEqual(0.05, result[0][0])
+        self.assertEqual([(1.5, 2), (1.6, 3)], result[0][1])
+
+    def _make_order_book(self, item_id, asks, bids):
+        return OrderBook(symbol="eth_btc", item_id=item_id,
+                         asks=OrderBookSide(OrderBookDirection.ASK, *self._split_levels(asks)),
+                         bids=OrderBookSide(OrderBookDirection.BID, *self._split_levels(bids)))
+
+    def _split_levels(self, levels):
+        return [price for price, amount in levels], [amount for price, amount in levels]
+
+
+class TestCandleBuilder(TestCase):
+    # 2019-01-25T00:00:00Z
+    start = 1548374400
+
+    def test_build_candles(self):
+        closed_candles = []
+        builder = CandleBuilder([Interval.MIN_1, Interval.MIN_5, Interval.HRS_1], closed_candles.append)
+
+        for seconds, price, amount in [(1, "10", "1"), (30, "12", "2"), (59, "9", "1"),
+                                       (61, "11", "1"), (250, "13", "3"), (301, "8", "1")]:
+            builder.add_trade(Trade(1, "eth_btc", self.start + seconds, None, price, amount))
+
+        self.assertEqual([(Interval.MIN_1, self.start), (Interval.MIN_1, self.start + 60),
+                          (Interval.MIN_1, self.start + 240), (Interval.MIN_5, self.start)],
+                         [(candle.interval, candle.timestamp) for candle in closed_candles])
+        candle = closed_candles[-1]
+        self.assertEqual((10, 9, 13, 13, 8, 5),
+                         (candle.price_open, candle.price_low, candle.price_high, candle.price_close,
+                          candle.amount, candle.trades_count))
+
+        # Current 1 minute candle is included in open candles
+        candle = builder.get_open_candle("eth_btc", Interval.HRS_1)
+        self.assertEqual((self.start, 10, 8, 13, 8, 9, 6),
+                         (candle.timestamp, candle.price_open, candle.price_low, candle.price_high,
+                          candle.price_close, candle.amount, candle.trades_count))
+        self.assertEqual(self.start + 300, builder.get_open_candle("eth_btc", Interval.MIN_5).timestamp)
+
+        builder.flush(self.start + 3600)
+        self.assertEqual([(Interval.MIN_1, self.start + 300), (Interval.MIN_5, self.start + 300),
+                          (Interval.HRS_1, self.start)],
+                         [(candle.interval, candle.timestamp) for candle in closed_candles[-3:]])
+        self.assertIsNone(builder.get_open_candle("eth_btc", Interval.HRS_1))
+
+    def test_interval_start(self):
+        # 2019-01-25 is Friday
+        self.assertEqual(self.start - 4 * 86400, get_interval_start(self.start + 100, Interval.WEEK_1))
+        self.assertEqual(1546300800, get_interval_start(self.start, Interval.MONTH_1))
+        self.assertEqual(1548979200, get_interval_end(1546300800, Interval.MONTH_1))
+
+
+class StubHistoryRESTClient(OkexRESTClient):
+    # Returns history pages from memory: from_item (or from_time) including, not more than page_limit items
+    trades = None
+    candles = None
+    page_limit = 3
+    requested_pages = None
+    # Fail first request for these from_time values
+    failing_from_times = None
+
+    def fetch_candles(self, symbol, interval, limit=None, from_time=None, to_time=None,
+                      is_use_max_limit=False, version=None, **kwargs):
+        self.requested_pages.append((None, from_time))
+        if self.failing_from_times and from_time in self.failing_from_times:
+            self.failing_from_times.remove(from_time)
+            raise Exception("Connection error")
+        return [candle for candle in self.candles if from_time <= candle.timestamp <= to_time][:self.page_limit]
+
+    def fetch_trades_history(self, symbol, limit=None, from_item=None, to_item=None,
+                             sorting=None, is_use_max_limit=False, from_time=None, to_time=None,
+                             version=None, **kwargs):
+        self.requested_pages.append((from_item, from_time))
+        if from_item:
+            result = self.trades[self.trades.index(from_item):]
+        else:
+            result = [trade for trade in self.trades if from_time is None or trade.timestamp >= from_time]
+        # (Descending order to check sorting)
+        return list(reversed(result[:self.page_limit]))
+
+
+class TestHistoryIteration(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = StubHistoryRESTClient()
+        # (2 trades for each timestamp)
+        self.client.trades = [Trade(symbol="eth_btc", timestamp=1000 + i // 2, item_id=str(i), price=1, amount=1)
+                              for i in range(20)]
+        self.client.requested_pages = []
+
+    def test_iter_trades_history(self):
+        result = list(self.client.iter_trades_history("eth_btc"))
+
+        self.assertEqual(self.client.trades, result)
+        # (Paging by item as OKEx supports from_item, each page has 1 duplicate)
+        self.assertEqual(1 + 20 // 2, len(self.client.requested_pages))
+        self.assertEqual((self.client.trades[2], None), self.client.requested_pages[1])
+
+    def test_iter_trades_history_by_time(self):
+        # (Stub can page trades by time, unlike OKEx)
+        self.client.converter.endpoints_without_time_params = None
+        result = list(self.client.iter_trades_history("eth_btc", 1002, 1005))
+
+        self.assertEqual(self.client.trades[4:12], result)
+        self.assertEqual((None, 1002), self.client.requested_pages[0])
+
+    def test_iter_trades_history_stuck_by_time(self):
+        # (4 trades for each timestamp, while only 3 fit in a page)
+        self.client.trades = [Trade(symbol="eth_btc", timestamp=1000 + i // 4, item_id=str(i), price=1, amount=1)
+                              for i in range(20)]
+        self.client._is_from_item_supported = lambda version=None: False
+        self.client.converter.max_limit_by_endpoint = {Endpoint.TRADE_HISTORY: 3}
+        self.client.converter.endpoints_without_time_params = None
+
+        result = list(self.client.iter_trades_history("eth_btc", 1000))
+
+        # (Order of the same timestamp trades is kept as on platform)
+        self.assertEqual(["0", "1", "2"], sorted(trade.item_id for trade in result[:3]))
+        self.assertEqual(4, len(result))
+        self.assertIsInstance(result[-1], Error)
+
+        # (Not stuck if there are only 2 trades for each timestamp)
+        self.client.trades = [Trade(symbol="eth_btc", timestamp=1000 + i // 2, item_id=str(i), price=1, amount=1)
+                              for i in range(20)]
+        self.assertEqual(self.client.trades, list(self.client.iter_trades_history("eth_btc", 1000)))
+
+    def test_iter_trades_history_without_time_params(self):
+        # (Real OKEx converter: "since" of trades.do is trade id, not a timestamp)
+        requests = []
+
+        class Client(OkexRESTClient):
+            def _send_request(self, converter, method, endpoint, params, url, request_kwargs, cache_key=None):
+                requests.append((url, request_kwargs["params"]))
+                return []
+
+        client = Client()
+        with self.assertRaises(Exception):
+            client.iter_trades_history("eth_btc", 1000, 2000)
+        self.assertEqual([], requests)
+
+        # (By item, to_time is checked only for received trades)
+        self.assertEqual([], list(client.iter_trades_history("eth_btc", 1000, 2000, from_item="123")))
+        self.assertEqual([("https://www.okex.com/api/v1/trades.do", {"symbol": "eth_btc", "since": "123",
+                                                                     "size": 1000})], requests)
+
+    def test_backfill_candles(self):
+        self.client.candles = [Candle(symbol="eth_btc", timestamp=i * 60, interval=Interval.MIN_1)
+                               for i in range(100)]
+        self.client.failing_from_times = {25 * 60}
+        backfill = HistoryBackfill(self.client, max_workers=4)
+        backfill.max_limit = 3
+        backfill.retry_delay_sec = 0
+
+        result = list(backfill.iter_candles("eth_btc", Interval.MIN_1, 10 * 60, 89 * 60))
+
+        self.assertEqual(self.client.candles[10:90], result)
+        # (1 request for each shard of 3 candles (27 shards) and 1 retry)
+        self.assertEqual(27 + 1, len(self.client.requested_pages))
+
+    def test_backfill_trades(self):
+        # (Timestamps are fractional seconds: trades between shards are not lost)
+        self.client.trades = [Trade(symbol="eth_btc", timestamp=timestamp, item_id=str(i), price=1, amount=1)
+                              for i, timestamp in enumerate([10.2, 3599.5, 3600.1, 7199.9, 7200.0, 7200.5])]
+        backfill = HistoryBackfill(self.client, max_workers=2)
+
+        # (OKEx "since" for trades is trade id)
+        with self.assertRaises(Exception):
+            backfill.iter_trades("eth_btc", 0, 7200)
+        self.client.converter.endpoints_without_time_params = None
+        result = list(backfill.iter_trades("eth_btc", 0, 7200, shard_duration_sec=3600))
+
+        self.assertEqual(self.client.trades[:5], result)
+        self.assertEqual([(0, 3600, False), (3600, 7200, True)], list(backfill._split_to_shards(0, 7200, 3600)))
+        self.assertEqual([(0, 3600, False), (3600, 7200, False), (7200, 7200.5, True)],
+                         list(backfill._split_to_shards(0, 7200.5, 3600)))
+
+    def test_backfill_error(self):
+        self.client.candles = [Candle(symbol="eth_btc", timestamp=i * 60) for i in range(100)]
+        self.client.fetch_candles = lambda *args, **kwargs: Error()
+        backfill = HistoryBackfill(self.client, retry_count=1)
+        backfill.retry_delay_sec = 0
+
+        result = list(backfill.iter_candles("eth_btc", Interval.MIN_1, 0, 99 * 60))
+
+        self.assertEqual(1, len(result))
+        self.assertIsInstance(result[0], Error)
+
+    def test_iter_error(self):
+        error = Error()
+        self.client.fetch_trades_history = lambda *args, **kwargs: error
+
+        self.assertEqual([error], list(self.client.iter_trades_history("eth_btc")))
+
+
+class StubOrderRESTClient(OkexRESTClient):
+    # (Orders are "sent" with delay, so results are returned not in order of sending)
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.requests = []
+
+    def create_order(self, symbol, order_type, direction, price=None, amount=None, is_test=False,
+                     version=None, **kwargs):
+        self.requests.append(("create", symbol))
+        time.sleep(0.05 if price > 1 else 0.01)
+        if not amount:
+            return self._create_error(ErrorCode.WRONG_PARAM)
+        return Order(symbol=symbol, item_id=str(price), order_type=order_type, direction=direction, price=price,
+                     amount_original=amount)
+
+    def cancel_order(self, order, symbol=None, version=None, **kwargs):
+        self.requests.append(("cancel", symbol))
+        if order == "wrong":
+            raise Exception("Some error")
+        return Order(symbol=symbol, item_id=order)
+
+    def fetch_orders(self, symbol=None, limit=None, from_item=None, is_open=False, version=None, **kwargs):
+        return [Order(symbol="eth_btc", item_id="1"), Order(symbol="ltc_btc", item_id="2")]
+
+    def _create_error(self, code):
+        error = Error()
+        error.code = code
+        return error
+
+
+class TestBatchOrders(TestCase):
+
+    def test_create_orders(self):
+        client = StubOrderRESTClient()
+        orders = [Order(symbol="eth_btc", order_type=OrderType.LIMIT, direction=Direction.BUY, price=price,
+                        amount_original=amount) for price, amount in [(2, 1), (1, 1), (3, None)]]
+
+        result = client.create_orders(orders, max_workers=3)
+
+        self.assertEqual(["2", "1"], [order.item_id for order in result[:2]])
+        self.assertEqual(OrderType.LIMIT, result[0].order_type)
+        self.assertIsInstance(result[2], Error)
+        self.assertEqual(3, len(client.requests))
+
+    def test_create_orders_with_batch_hook(self):
+        class Client(StubOrderRESTClient):
+            batches = []
+
+            def _create_orders_batch(self, orders, is_test=False, version=None, **kwargs):
+                # (Not supported for test orders)
+                if is_test:
+                    return None
+                self.batches.append(orders)
+                return [Order(symbol=order.symbol, item_id="b" + str(order.price)) for order in orders]
+
+        client = Client()
+        orders = [Order(symbol="eth_btc", order_type=OrderType.LIMIT, direction=Direction.BUY, price=price,
+                        amount_original=1) for price in [2, 1]]
+
+        result = client.create_orders(iter(orders))
+
+        self.assertEqual(["b2", "b1"], [order.item_id for order in result])
+        self.assertEqual([orders], client.batches)
+        self.assertEqual(0, len(client.requests))
+
+        # (Fallback to orders one by one)
+        result = client.create_orders(orders, is_test=True)
+
+        self.assertEqual(["2", "1"], [order.item_id for order in result])
+        self.assertEqual(2, len(client.requests))
+
+    def test_cancel_orders(self):
+        client = StubOrderRESTClient()
+
+        result = client.cancel_orders([Order(symbol="eth_btc", item_id="1"), "2", "wrong"], symbol="ltc_btc")
+
+        # (Symbol is for order ids, and orders are canceled with their own symbols)
+        self.assertEqual([("1", "eth_btc"), ("2", "ltc_btc")], [(order.item_id, order.symbol) for order in result[:2]])
+        self.assertIsInstance(result[2], Error)
+        self.assertEqual(ErrorCode.APP_ERROR, result[2].code)
+
+        # (Symbols of orders are used if symbol is not given)
+        result = client.cancel_all()
+
+        self.assertEqual([("1", "eth_btc"), ("2", "ltc_btc")], [(order.item_id, order.symbol) for order in result])
+
+
+class StubShardedWSClient(OkexWSClient):
+    # (Shards "connect" without network)
+    max_subscriptions_per_connection = 3
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.commands = []
+
+    def reconnect(self):
+        self.is_started = True
+        self.commands.append(("connect", self.current_subscriptions))
+
+    def _send_subscribe(self, subscriptions):
+        self.commands.append(("subscribe", subscriptions))
+
+    def _send_unsubscribe(self, subscriptions):
+        self.commands.append(("unsubscribe", subscriptions))
+
+
+class TestWSSharding(TestCase):
+    symbols = ["bch_btc", "etc_btc", "eth_btc", "ltc_btc"]
+
+    def _get_symbols_by_shard(self, client):
+        return [sorted(subscription.split("_")[3] for subscription in shard.current_subscriptions)
+                for shard in client.shards]
+
+    def test_subscribe(self):
+        client = StubShardedWSClient()
+        client.subscribe([Endpoint.TRADE], self.symbols)
+
+        self.assertEqual([["bch", "etc", "eth"], ["ltc"]], self._get_symbols_by_shard(client))
+        self.assertEqual(["connect"], [command for command, _ in client.shards[1].commands])
+        self.assertEqual(4, len(client.current_subscriptions))
+
+        # (Added to the least loaded shard)
+        client.subscribe([Endpoint.TRADE], ["neo_btc"])
+
+        self.assertEqual([["bch", "etc", "eth"], ["ltc", "neo"]], self._get_symbols_by_shard(client))
+        self.assertEqual(("subscribe", {"ok_sub_spot_neo_btc_deals"}), client.shards[1].commands[-1])
+
+    def test_unsubscribe_and_rebalance(self):
+        client = StubShardedWSClient()
+        client.subscribe([Endpoint.TRADE], self.symbols)
+        first_shard, second_shard = client.shards
+
+        client.unsubscribe(symbols=["etc_btc"])
+
+        self.assertEqual(("unsubscribe", {"ok_sub_spot_etc_btc_deals"}), first_shard.commands[-1])
+        # (Second shard fits into the first one now, so it's moved and closed)
+        self.assertEqual([first_shard], client.shards)
+        self.assertEqual([["bch", "eth", "ltc"]], self._get_symbols_by_shard(client))
+        self.assertEqual(("subscribe", {"ok_sub_spot_ltc_btc_deals"}), first_shard.commands[-2])
+        self.assertFalse(second_shard.is_started)
+
+        client.close()
+        self.assertIsNone(client.shards)
+
+    def test_merged_items(self):
+        client = StubShardedWSClient()
+        items = []
+        client.on_data_item = items.append
+        client.subscribe([Endpoint.TRADE], self.symbols)
+
+        for shard, symbol in zip(client.shards, ["bch_btc", "ltc_btc"]):
+            WSClient._on_message(shard, '[{"channel": "ok_sub_spot_%s_deals", '
+                                        '"data": [["1", "0.03", "1.5", "12:00:01", "bid"]]}]' % symbol)
+
+        self.assertEqual(["bch_btc", "ltc_btc"], [item.symbol for item in items])
+
+    def test_shard_converters(self):
+        client = StubShardedWSClient()
+        client.is_columnar = True
+        client.subscribe([Endpoint.TRADE], self.symbols)
+
+        # (Own converter for each shard's thread, but with the same settings)
+        first_shard, second_shard = client.shards
+        self.assertIsNot(client.converter, first_shard.converter)
+        self.assertIsNot(first_shard.converter, second_shard.converter)
+        self.assertIsNot(client.converter._time_of_day_parser, first_shard.converter._time_of_day_parser)
+        self.assertTrue(first_shard.is_columnar)
+        self.assertTrue(second_shard.is_columnar)
+
+    def test_callbacks_serialized(self):
+        client = StubShardedWSClient()
+        items = []
+        client.on_data_item = items.append
+        client.subscribe([Endpoint.TRADE], self.symbols)
+        thread = Thread(target=WSClient._on_message, args=(
+            client.shards[1], '[{"channel": "ok_sub_spot_ltc_btc_deals", '
+                              '"data": [["1", "0.03", "1.5", "12:00:01", "bid"]]}]'))
+
+        # (As if another shard is calling a callback)
+        with client._shard_lock:
+            thread.start()
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+            self.assertEqual([], items)
+        thread.join(1)
+
+        self.assertEqual(["ltc_btc"], [item.symbol for item in items])
+
+
+class StubWS:
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(json.loads(message))
+
+
+class TestWSSubscriptionCommands(TestCase):
+
+    def _create_client(self):
+        client = OkexWSClient(max_subscriptions_per_connection=None, max_subscriptions_per_command=2,
+                              commands_per_sec=None)
+        client.ws = StubWS()
+        # ("Connected")
+        client.is_started = True
+        return client
+
+    def _confirm(self, client, event, channel, result=True):
+        data = {"result": result, "channel": channel} if result else \
+            {"result": result, "channel": channel, "error_code": 10000}
+        WSClient._on_message(client, json.dumps([{"channel": event, "data": data}]))
+
+    def test_batches(self):
+        client = self._create_client()
+
+        client.subscribe([Endpoint.TRADE], ["eth_btc", "ltc_btc", "etc_btc"])
+
+        self.assertEqual([[{"event": "addChannel", "channel": "ok_sub_spot_etc_btc_deals"},
+                           {"event": "addChannel", "channel": "ok_sub_spot_eth_btc_deals"}],
+                          [{"event": "addChannel", "channel": "ok_sub_spot_ltc_btc_deals"}]], client.ws.messages)
+        self.assertEqual(3, len(client.pending_subscriptions))
+
+    def test_diff(self):
+        client = self._create_client()
+        client.subscribe([Endpoint.TRADE], ["eth_btc", "ltc_btc"])
+        self._confirm(client, "addChannel", "ok_sub_spot_eth_btc_deals")
+        self._confirm(client, "addChannel", "ok_sub_spot_ltc_btc_deals", result=False)
+        self.assertEqual({"ok_sub_spot_eth_btc_deals"}, client.successful_subscriptions)
+        self.assertEqual({"ok_sub_spot_ltc_btc_deals"}, client.failed_subscriptions)
+        client.ws.messages.clear()
+
+        # (Subscribed channels are not sent again)
+        client.subscribe([Endpoint.TRADE], ["eth_btc"])
+        self.assertEqual([], client.ws.messages)
+
+        # (Only failed one is sent)
+        client.resubscribe()
+        self.assertEqual([[{"event": "addChannel", "channel": "ok_sub_spot_ltc_btc_deals"}]], client.ws.messages)
+        client.ws.messages.clear()
+
+        client.unsubscribe(symbols=["eth_btc"])
+        self.assertEqual([[{"event": "delChannel", "channel": "ok_sub_spot_eth_btc_deals"}]], client.ws.messages)
+        self.assertEqual({"ok_sub_spot_ltc_btc_deals"}, client.current_subscriptions)
+
+    def test_throttled_commands(self):
+        client = self._create_client()
+        client.max_subscriptions_per_command = 1
+        client.command_rate_limiter = RateLimiter(20, capacity=1)
+
+        client.subscribe([Endpoint.TRADE], ["eth_btc", "ltc_btc", "etc_btc"])
+
+        # (Caller is not blocked, commands are sent by sender thread)
+        self.assertLess(len(client.ws.messages), 3)
+        for _ in range(100):
+            if len(client.ws.messages) == 3 and not client._command_thread:
+                break
+            time.sleep(0.01)
+        self.assertEqual(["ok_sub_spot_etc_btc_deals", "ok_sub_spot_eth_btc_deals", "ok_sub_spot_ltc_btc_deals"],
+                         [message[0]["channel"] for message in client.ws.messages])
+        self.assertIsNone(client._command_thread)
+
+
+class TestWSDispatching(TestCase):
+
+    def test_dispatching(self):
+        client = OkexWSClient(max_subscriptions_per_connection=None, dispatch_worker_count=2)
+        client.current_subscriptions = {"ok_sub_spot_eth_btc_deals"}
+        client.dispatcher.start()
+        socket_thread = current_thread()
+        threads = set()
+        items = []
+        batches = []
+
+        def on_data_item(item):
+            threads.add(current_thread())
+            items.append(item)
+
+        client.on_data_item = on_data_item
+        client.on_data = batches.append
+        for index in range(10):
+            for symbol in ("eth_btc", "ltc_btc"):
+                WSClient._on_message(client, json.dumps([
+                    {"channel": "ok_sub_spot_%s_deals" % symbol,
+                     "data": [[str(index), "0.031", "1.5", "12:00:01", "bid"]]},
+                    # (Confirmations are handled in socket thread)
+                    {"channel": "addChannel", "data": {"result": True, "channel": "ok_sub_spot_%s_deals" % symbol}},
+                ]))
+        client.close()
+        for _ in range(100):
+            if client.dispatcher.handled_count == 20:
+                break
+            time.sleep(0.01)
+
+        self.assertNotIn(socket_thread, threads)
+        self.assertEqual(20, len(items))
+        # (on_data is called for the same items, by the same workers)
+        self.assertEqual(sorted((item.symbol, item.item_id) for item in items),
+                         sorted((item.symbol, item.item_id) for batch in batches for item in batch))
+        for symbol in ("eth_btc", "ltc_btc"):
+            self.assertEqual([str(index) for index in range(10)],
+                             [item.item_id for item in items if item.symbol == symbol])
+        self.assertEqual({"ok_sub_spot_eth_btc_deals", "ok_sub_spot_ltc_btc_deals"}, client.successful_subscriptions)
+        self.assertEqual(20, client.dispatcher.get_metrics()["put_count"])
+
+    def test_dispatching_with_shards(self):
+        # (Not connected explicitly: subscribe() creates and connects shards)
+        client = StubShardedWSClient(dispatch_worker_count=2)
+        items = []
+        client.on_data_item = items.append
+        client.subscribe([Endpoint.TRADE], ["bch_btc", "etc_btc", "eth_btc", "ltc_btc"])
+
+        self.assertTrue(client.dispatcher.is_started)
+        for shard, symbol in zip(client.shards, ["bch_btc", "ltc_btc"]):
+            WSClient._on_message(shard, '[{"channel": "ok_sub_spot_%s_deals", '
+                                        '"data": [["1", "0.03", "1.5", "12:00:01", "bid"]]}]' % symbol)
+        client.close()
+        for _ in range(100):
+            if client.dispatcher.handled_count == 2:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(["bch_btc", "ltc_btc"], sorted(item.symbol for item in items))
+        self.assertFalse(client.dispatcher.is_started)
+        self.assertEqual(0, client.dispatcher.dropped_count)
+
+    def test_conflation_key(self):
+        client = OkexWSClient()
+
+        self.assertIsNone(client.dispatcher)
+        self.assertIsNone(client._get_conflation_key(Trade(symbol="eth_btc")))
+        self.assertEqual(client._get_conflation_key(Candle(symbol="eth_btc", interval=Interval.MIN_1, timestamp=1)),
+                         client._get_conflation_key(Candle(symbol="eth_btc", interval=Interval.MIN_1, timestamp=1)))
+        self.assertNotEqual(client._get_conflation_key(Candle(symbol="eth_btc", interval=Interval.MIN_1, timestamp=1)),
+                            client._get_conflation_key(Candle(symbol="eth_btc", interval=Interval.MIN_1, timestamp=2)))
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from hyperquant.clients.coalescing import RequestCoalescer
+
+
+class TestRequestCoalescer(TestCase):
+
+    def test_call(self):
+        coalescer = RequestCoalescer()
+        calls = []
+
+        def fun(value):
+            calls.append(value)
+            time.sleep(0.1)
+            return [value]
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(lambda key: coalescer.call(key, fun, key), ["a", "a", "a", "b"]))
+
+        self.assertEqual(["a", "b"], sorted(calls))
+        self.assertEqual([["a"], ["a"], ["a"], ["b"]], results)
+        self.assertIs(results[0], results[1])
+        self.assertEqual({"call_count": 2, "coalesced_count": 2}, coalescer.get_metrics())
+        # (Not in flight anymore)
+        self.assertEqual(["c"], coalescer.call("a", fun, "c"))
+
+    def test_call_error(self):
+        coalescer = RequestCoalescer()
+
+        def fun():
+            time.sleep(0.1)
+            raise ValueError("Some error")
+
+        with ThreadPoolExecutor(2) as executor:
+            futures = [executor.submit(coalescer.call, "a", fun) for _ in range(2)]
+
+        for future in futures:
+            self.assertIsInstance(future.exception(), ValueError)
+        self.assertEqual(1, coalescer.call_count)
+
+    def test_call_async(self):
+        coalescer = RequestCoalescer()
+        calls = []
+
+        async def fun(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            if value == "error":
+                raise ValueError("Some error")
+            return [value]
+
+        async def call_all():
+            return await asyncio.gather(*[coalescer.call_async(key, fun, key)
+                                          for key in ["a", "a", "b", "error", "error"]], return_exceptions=True)
+
+        results = asyncio.run(call_all())
+
+        self.assertEqual(["a", "b", "error"], calls)
+        self.assertEqual([["a"], ["a"], ["b"]], results[:3])
+        self.assertIs(results[0], results[1])
+        self.assertIsInstance(results[3], ValueError)
+        self.assertIsInstance(results[4], ValueError)
+        self.assertEqual({"call_count": 3, "coalesced_count": 2}, coalescer.get_metrics())
+
+    def test_call_async_cancel(self):
+        coalescer = RequestCoalescer()
+
+        async def fun():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def call_all():
+            first = asyncio.ensure_future(coalescer.call_async("a", fun))
+            second = asyncio.ensure_future(coalescer.call_async("a", fun))
+            await asyncio.sleep(0.01)
+            # (The first caller runs the call, but cancelling it doesn't cancel the call for the second one)
+            first.cancel()
+            return await asyncio.gather(first, second, return_exceptions=True)
+
+        results = asyncio.run(call_all())
+
+        self.assertIsInstance(results[0], asyncio.CancelledError)
+        self.assertEqual("result", results[1])
+        self.assertEqual({"call_count": 1, "coalesced_count": 1}, coalescer.get_metrics())
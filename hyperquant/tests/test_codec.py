@@ -0,0 +1,33 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from hyperquant import codec
+
+
+class TestCodec(TestCase):
+
+    def test_codecs(self):
+        for name in codec.codec_class_by_name:
+            json_codec = codec.create_codec(name)
+            data = {"a": [1, 2.5, "x", None, True], "b": {"c": "é"}}
+
+            self.assertEqual(data, json_codec.loads(json_codec.dumps(data)), name)
+            self.assertEqual(data, json_codec.loads(json_codec.dumps_bytes(data)), name)
+            self.assertEqual(data, json_codec.loads(bytearray(json_codec.dumps_bytes(data))), name)
+            self.assertEqual(data, json_codec.loads(memoryview(json_codec.dumps_bytes(data))), name)
+            self.assertEqual({"price": "0.031702"}, json_codec.loads(json_codec.dumps({"price": Decimal("0.031702")})))
+            self.assertEqual([2 ** 70], json_codec.loads(b"[1180591620717411303424]"), name)
+            with self.assertRaises(ValueError):
+                json_codec.loads(b"{'event':'addChannel'}")
+
+    def test_set_default_codec(self):
+        default_name = codec.default_codec.name
+        try:
+            codec.set_default_codec("json")
+            self.assertEqual("json", codec.default_codec.name)
+            self.assertEqual([1], codec.loads(b"[1]"))
+        finally:
+            codec.set_default_codec(default_name)
+
+        with self.assertRaises(Exception):
+            codec.set_default_codec("unknown")
@@ -0,0 +1,160 @@
+import time
+from threading import Event, Thread
+from unittest import TestCase
+
+from hyperquant.clients.dispatch import Dispatcher, OverflowPolicy
+
+
+class TestDispatcher(TestCase):
+
+    def _wait_handled(self, dispatcher, count):
+        for _ in range(100):
+            if dispatcher.handled_count >= count:
+                return
+            time.sleep(0.01)
+
+    def test_partitioning(self):
+        handled = []
+
+        def handler(items):
+            time.sleep(0.01)
+            handled.append(items)
+
+        dispatcher = Dispatcher(handler, worker_count=3, partition_key_fun=lambda item: item[0])
+        dispatcher.start()
+        items = [(symbol, index) for index in range(20) for symbol in ("a", "b", "c", "d")]
+        for item in items:
+            dispatcher.put(item)
+        dispatcher.stop()
+        self._wait_handled(dispatcher, len(items))
+
+        self.assertEqual(len(items), dispatcher.handled_count)
+        self.assertEqual(sorted(items), sorted(item for batch in handled for item in batch))
+        for symbol in ("a", "b", "c", "d"):
+            # (Items of a symbol are handled in order)
+            indexes = [index for batch in handled for item_symbol, index in batch if item_symbol == symbol]
+            self.assertEqual(list(range(20)), indexes)
+        # (All workers exited)
+        for _ in range(100):
+            if not any(partition.thread for partition in dispatcher._partitions):
+                break
+            time.sleep(0.01)
+        self.assertEqual(0, dispatcher.queue_size)
+        self.assertFalse(any(partition.thread for partition in dispatcher._partitions))
+
+    def _create_stalled_dispatcher(self, overflow_policy, conflation_key_fun=None):
+        # (Worker is stalled by the first item until the event is set)
+        event = Event()
+        handled = []
+
+        def handler(items):
+            event.wait(1)
+            handled.extend(items)
+
+        dispatcher = Dispatcher(handler, max_queue_size=3, overflow_policy=overflow_policy,
+                                conflation_key_fun=conflation_key_fun)
+        dispatcher.start()
+        dispatcher.put("first")
+        for _ in range(100):
+            if not dispatcher.queue_size:
+                break
+            time.sleep(0.01)
+        return dispatcher, event, handled
+
+    def test_drop_oldest(self):
+        dispatcher, event, handled = self._create_stalled_dispatcher(OverflowPolicy.DROP_OLDEST)
+
+        for item in range(5):
+            dispatcher.put(item)
+        self.assertEqual(3, dispatcher.queue_size)
+        self.assertGreater(dispatcher.lag_sec, 0)
+        event.set()
+        dispatcher.stop()
+        self._wait_handled(dispatcher, 4)
+
+        self.assertEqual(["first", 2, 3, 4], handled)
+        metrics = dispatcher.get_metrics()
+        self.assertEqual(2, metrics["dropped_count"])
+        self.assertEqual(6, metrics["put_count"])
+        self.assertEqual(0, metrics["queue_size"])
+        self.assertEqual(0, metrics["lag_sec"])
+        self.assertGreater(metrics["max_lag_sec"], 0)
+
+    def test_conflate(self):
+        dispatcher, event, handled = self._create_stalled_dispatcher(
+            OverflowPolicy.CONFLATE, lambda item: item[0] if item[0] != "trade" else None)
+
+        for item in [("ticker", 1), ("trade", 1), ("ticker", 2), ("trade", 2), ("ticker", 3)]:
+            dispatcher.put(item)
+        self.assertEqual([("ticker", 3), ("trade", 1), ("trade", 2)],
+                         [entry[0] for entry in dispatcher._partitions[0].queue])
+        dispatcher.put(("candle", 1))
+        event.set()
+        dispatcher.stop()
+        self._wait_handled(dispatcher, 4)
+
+        # (Newest ticker replaced the first one in place, trades are not conflated, and
+        # the oldest (ticker) is dropped for the candle as the queue is full)
+        self.assertEqual(["first", ("trade", 1), ("trade", 2), ("candle", 1)], handled)
+        self.assertEqual(2, dispatcher.conflated_count)
+        self.assertEqual(1, dispatcher.dropped_count)
+
+    def test_block(self):
+        dispatcher, event, handled = self._create_stalled_dispatcher(OverflowPolicy.BLOCK)
+
+        thread = Thread(target=lambda: [dispatcher.put(item) for item in range(5)])
+        thread.start()
+        thread.join(0.1)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(3, dispatcher.queue_size)
+        event.set()
+        thread.join(1)
+        dispatcher.stop()
+        self._wait_handled(dispatcher, 6)
+
+        self.assertEqual(["first", 0, 1, 2, 3, 4], handled)
+        self.assertEqual(1, dispatcher.blocked_count)
+        self.assertEqual(0, dispatcher.dropped_count)
+
+    def test_put_when_stopped(self):
+        dispatcher, event, handled = self._create_stalled_dispatcher(OverflowPolicy.BLOCK)
+
+        thread = Thread(target=lambda: [dispatcher.put(item) for item in range(5)])
+        thread.start()
+        thread.join(0.1)
+        self.assertTrue(thread.is_alive())
+        # (Blocked put() doesn't wait for workers anymore, and all the next items are dropped)
+        dispatcher.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        event.set()
+        self._wait_handled(dispatcher, 4)
+
+        self.assertEqual(["first", 0, 1, 2], handled)
+        self.assertEqual(2, dispatcher.dropped_count)
+
+        # (Never started)
+        dispatcher = Dispatcher(handled.append, max_queue_size=1)
+        dispatcher.put("item")
+        dispatcher.put("item")
+        self.assertEqual(0, dispatcher.queue_size)
+        self.assertEqual(2, dispatcher.dropped_count)
+
+    def test_handler_error(self):
+        handled = []
+
+        def handler(items):
+            if "error" in items:
+                raise Exception("Test error")
+            handled.extend(items)
+
+        dispatcher = Dispatcher(handler)
+        dispatcher.start()
+        dispatcher.put("error")
+        self._wait_handled(dispatcher, 1)
+        dispatcher.put("item")
+        dispatcher.stop()
+        self._wait_handled(dispatcher, 2)
+
+        self.assertEqual(["item"], handled)
+        self.assertEqual(1, dispatcher.error_count)
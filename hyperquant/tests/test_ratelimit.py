@@ -0,0 +1,87 @@
+import asyncio
+from threading import Thread
+from unittest import TestCase
+
+from requests import Response
+
+from hyperquant.api import ErrorCode
+from hyperquant.clients import Error
+from hyperquant.clients.okex import OkexRESTClient
+from hyperquant.clients.ratelimit import RateLimiter
+
+
+class TestRateLimiter(TestCase):
+
+    def test_reserve(self):
+        rate_limiter = RateLimiter(10, capacity=2)
+
+        # (Burst)
+        self.assertEqual(0, rate_limiter.reserve())
+        self.assertEqual(0, rate_limiter.reserve())
+        # (Paced)
+        self.assertAlmostEqual(0.1, rate_limiter.reserve(), delta=0.01)
+        self.assertAlmostEqual(0.3, rate_limiter.reserve(weight=2), delta=0.01)
+
+        metrics = rate_limiter.get_metrics()
+        self.assertEqual(4, metrics["request_count"])
+        self.assertEqual(5, metrics["total_weight"])
+        self.assertEqual(2, metrics["wait_count"])
+        self.assertAlmostEqual(0.4, metrics["total_wait_sec"], delta=0.02)
+        self.assertLess(metrics["tokens"], 0)
+
+    def test_penalize(self):
+        rate_limiter = RateLimiter(10, capacity=2)
+        rate_limiter.penalize(5)
+
+        # (Delay and then empty bucket)
+        self.assertAlmostEqual(5.1, rate_limiter.reserve(), delta=0.01)
+        self.assertEqual(1, rate_limiter.get_metrics()["penalty_count"])
+
+        # (Without rate, only penalty is applied)
+        rate_limiter = RateLimiter()
+        self.assertEqual(0, rate_limiter.reserve(weight=100))
+        rate_limiter.penalize(5)
+        self.assertAlmostEqual(5, rate_limiter.reserve(), delta=0.01)
+
+    def test_add_error(self):
+        rate_limiter = RateLimiter()
+        threads = [Thread(target=lambda: [rate_limiter.add_error() for _ in range(1000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(4001, rate_limiter.add_error())
+        rate_limiter.reset_errors()
+        self.assertEqual(1, rate_limiter.add_error())
+        self.assertEqual(4002, rate_limiter.get_metrics()["error_count"])
+        self.assertEqual(1, rate_limiter.get_metrics()["error_in_row_count"])
+
+    def test_acquire(self):
+        rate_limiter = RateLimiter(100, capacity=1)
+
+        self.assertEqual(0, rate_limiter.acquire())
+        self.assertGreater(rate_limiter.acquire(), 0)
+        self.assertGreater(asyncio.run(rate_limiter.acquire_async()), 0)
+
+    def test_client_penalized_on_rate_limit_error(self):
+        rate_limiter = RateLimiter()
+        client = OkexRESTClient(rate_limiter=rate_limiter)
+        response = Response()
+        response.status_code = 429
+        response.headers["Content-Type"] = "text/html"
+        response._content = b"Too many requests"
+
+        result = client._parse_response(client.converter, "GET", "trades.do", {}, response)
+
+        self.assertIsInstance(result, Error)
+        self.assertEqual(ErrorCode.RATE_LIMIT, result.code)
+        self.assertIs(rate_limiter, client.rate_limiter)
+        self.assertAlmostEqual(120, rate_limiter.reserve(), delta=0.01)
+        # (Delay grows with errors in a row, also for other clients with the same limiter)
+        self.assertEqual(240, OkexRESTClient(rate_limiter=rate_limiter)._on_response(response, result))
+        # (No delay after a successful response)
+        self.assertEqual(0, client._on_response(None, []))
+        self.assertEqual(120, client._on_response(response, result))
+        # (Own limiter with platform's rate by default)
+        self.assertEqual(10, OkexRESTClient().rate_limiter.rate_per_sec)
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from dateutil import parser
+
+from hyperquant.timestamps import parse_timestring, parse_iso_8601, TimeOfDayParser, \
+    convert_timestamps_from_platform
+
+
+class TestParseTimestring(TestCase):
+
+    def test_parse_iso_8601(self):
+        for timestring in ["2019-01-25", "2019-01-25T00:02:00", "2019-01-25 00:02:00.123",
+                           "2019-01-25T00:02:00.123456Z", "2019-01-25T08:02:00+08:00", "2019-01-24T20:02-0400"]:
+            self.assertEqual(parser.parse(timestring).timestamp(), parse_iso_8601(timestring), timestring)
+
+    def test_parse_timestring(self):
+        # Fast path
+        self.assertEqual(1548374520, parse_timestring("2019-01-25T00:02:00Z"))
+        # Fallback to dateutil
+        self.assertIsNone(parse_iso_8601("Fri, 25 Jan 2019 00:02:00 GMT"))
+        self.assertEqual(1548374520, parse_timestring("Fri, 25 Jan 2019 00:02:00 GMT"))
+        self.assertIsNone(parse_iso_8601("2019-13-25T00:02:00Z"))
+
+
+class TestTimeOfDayParser(TestCase):
+    # 2019-01-25T07:59:00+08:00
+    now = 1548374340
+
+    def test_parse(self):
+        time_of_day_parser = TimeOfDayParser(8 * 3600)
+
+        self.assertEqual(self.now + 34, time_of_day_parser.parse("07:59:34", self.now))
+        self.assertEqual(self.now - 60, time_of_day_parser.parse("07:58:00", self.now))
+
+    def test_midnight_rollover(self):
+        time_of_day_parser = TimeOfDayParser(0)
+        midnight = 1548374400  # 2019-01-25T00:00:00Z
+
+        # Made before midnight, received after
+        self.assertEqual(midnight - 2, time_of_day_parser.parse("23:59:58", midnight + 1))
+        # Made after midnight, received before (clocks differ)
+        self.assertEqual(midnight + 1, time_of_day_parser.parse("00:00:01", midnight - 2))
+        # Cached day is changed
+        self.assertEqual(midnight + 86400 + 5, time_of_day_parser.parse("00:00:05", midnight + 86400 + 3))
+
+
+class TestConvertTimestampsFromPlatform(TestCase):
+
+    def test_milliseconds(self):
+        timestamps = [1548374520123, "1548374520000", None]
+
+        self.assertEqual([1548374520.123, 1548374520.0, None],
+                         convert_timestamps_from_platform(timestamps, is_source_in_milliseconds=True))
+        self.assertEqual([1548374520123, 1548374520000, None],
+                         convert_timestamps_from_platform(timestamps, is_source_in_milliseconds=True,
+                                                          use_milliseconds=True))
+
+    def test_seconds_and_timestrings(self):
+        self.assertEqual([1548374520000, 0],
+                         convert_timestamps_from_platform([1548374520, 0], use_milliseconds=True))
+        self.assertEqual([1548374520.5],
+                         convert_timestamps_from_platform(["2019-01-25T00:02:00.5Z"], is_source_in_timestring=True))
@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+from hyperquant.clients.okex import OkexRESTClient
+from hyperquant.clients.transport import HTTPTransport
+
+
+class TestHTTPTransport(TestCase):
+
+    def test_pool_sizes(self):
+        transport = HTTPTransport(pool_maxsize=64)
+        adapter = transport.session.get_adapter("https://www.okex.com/api/v1/")
+
+        self.assertEqual(64, adapter._pool_maxsize)
+        self.assertEqual(HTTPTransport.pool_connections, adapter._pool_connections)
+        self.assertIn("gzip", transport.session.headers["Accept-Encoding"])
+        transport.close()
+
+    def test_shared_by_clients(self):
+        transport = HTTPTransport()
+        client1 = OkexRESTClient(transport=transport)
+        client2 = OkexRESTClient(transport=transport)
+
+        self.assertIs(client1.session, client2.session)
+        # (Shared transport is closed by its owner, not by clients)
+        self.assertFalse(client1._is_own_transport)
+
+        # (Own transport is created if not set)
+        client3 = OkexRESTClient()
+        self.assertIsNot(transport, client3.transport)
+        self.assertTrue(client3._is_own_transport)
+        client3.close()
@@ -0,0 +1,133 @@
+import re
+import time
+from datetime import datetime, timezone, timedelta
+
+from dateutil import parser
+
+"""
+Timestamp conversion used by clients' converters and by our REST API.
+
+All functions work with Unix timestamps in seconds (float or int) or
+milliseconds (int) and process lists of values to convert a whole page at once.
+"""
+
+SECONDS_IN_DAY = 24 * 60 * 60
+
+# Only strict ISO 8601 formats are parsed without dateutil:
+# "2019-01-25", "2019-01-25T00:02:00", "2019-01-25 00:02:00.123456Z", "2019-01-25T00:02:00+08:00"
+_iso_8601_regex = re.compile(r"(\d{4})-(\d\d)-(\d\d)(?:[T ](\d\d):(\d\d)(?::(\d\d)(?:\.(\d{1,6})\d*)?)?)?"
+                             r"(Z|[+-]\d\d:?\d\d)?$")
+_timezone_by_name = {"Z": timezone.utc}
+
+
+def parse_timestring(timestring):
+    # Any date and time string to Unix timestamp in seconds
+    # (Note: timezone is local if not specified, as in dateutil)
+    timestamp = parse_iso_8601(timestring)
+    if timestamp is None:
+        timestamp = parser.parse(timestring).timestamp()
+    return timestamp
+
+
+def parse_iso_8601(timestring):
+    # Returns None if timestring is not in strict ISO 8601 format
+    match = _iso_8601_regex.match(timestring)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction, timezone_name = match.groups()
+    microsecond = int(fraction.ljust(6, "0")) if fraction else 0
+    try:
+        return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                        microsecond, _get_timezone(timezone_name) if timezone_name else None).timestamp()
+    except ValueError:
+        # (Wrong values, like month 13)
+        return None
+
+
+def _get_timezone(name):
+    result = _timezone_by_name.get(name)
+    if not result:
+        sign = -1 if name[0] == "-" else 1
+        hours, minutes = int(name[1:3]), int(name[-2:])
+        _timezone_by_name[name] = result = timezone(sign * timedelta(hours=hours, minutes=minutes))
+    return result
+
+
+def is_time_of_day(value):
+    # "hh:mm:ss"
+    return isinstance(value, str) and len(value) == 8 and value[2] == ":" and value[5] == ":"
+
+
+class TimeOfDayParser:
+    """
+    Converts time of day ("hh:mm:ss") without date to Unix timestamp in seconds.
+
+    Some platforms (OKEx WS deals) send only time of day in their own timezone.
+    We assume that the time is the nearest to the current time, so that values
+    received right after midnight, but made before it, get the previous day.
+    The start of the current day is cached and updated only when the day changes.
+    """
+
+    # Settings:
+    # Time of day is considered as belonging to the next or previous day
+    # if it differs from current time more than that
+    max_difference_sec = SECONDS_IN_DAY / 2
+
+    # State:
+    _day_start = None
+    _day_end = None
+
+    def __init__(self, utc_offset_sec=0) -> None:
+        super().__init__()
+        # Timezone of platform
+        self.utc_offset_sec = utc_offset_sec
+
+    def parse(self, timestring, now=None):
+        if now is None:
+            now = time.time()
+        if self._day_start is None or not self._day_start <= now < self._day_end:
+            self._update_day(now)
+
+        timestamp = self._day_start + \
+            int(timestring[0:2]) * 3600 + int(timestring[3:5]) * 60 + int(timestring[6:8])
+        # (Midnight rollover)
+        if timestamp - now > self.max_difference_sec:
+            timestamp -= SECONDS_IN_DAY
+        elif now - timestamp > self.max_difference_sec:
+            timestamp += SECONDS_IN_DAY
+        return timestamp
+
+    def _update_day(self, now):
+        self._day_start = int(now + self.utc_offset_sec) // SECONDS_IN_DAY * SECONDS_IN_DAY - self.utc_offset_sec
+        self._day_end = self._day_start + SECONDS_IN_DAY
+
+
+def convert_timestamps_from_platform(timestamps, is_source_in_milliseconds=False, is_source_in_timestring=False,
+                                     use_milliseconds=False, time_of_day_parser=None):
+    # Convert platform's timestamps to Unix timestamps in seconds (or in milliseconds if use_milliseconds)
+    # (Empty values are returned as is)
+    first_timestamp = next((timestamp for timestamp in timestamps if timestamp), None)
+    if first_timestamp is None:
+        return list(timestamps)
+
+    if time_of_day_parser and is_time_of_day(first_timestamp):
+        now = time.time()
+        result = [time_of_day_parser.parse(timestamp, now) if timestamp else timestamp
+                  for timestamp in timestamps]
+    elif is_source_in_milliseconds:
+        if use_milliseconds:
+            # (Without converting to seconds and back)
+            return [_to_int(timestamp) if timestamp else timestamp for timestamp in timestamps]
+        return [float(timestamp) / 1000 if timestamp else timestamp for timestamp in timestamps]
+    elif is_source_in_timestring:
+        result = [parse_timestring(timestamp) if timestamp else timestamp for timestamp in timestamps]
+    else:
+        result = timestamps
+
+    if use_milliseconds:
+        return [int(timestamp * 1000) if timestamp else timestamp for timestamp in result]
+    return result if result is not timestamps else list(timestamps)
+
+
+def _to_int(value):
+    return value if isinstance(value, int) else int(float(value))